@@ -0,0 +1,105 @@
+"""
+Timing and result helpers shared by the benchmarks.
+
+Results are written as JSON so runs can be compared with `python -m benchmarks.compare`:
+
+    {"benchmark": ..., "created_at": ..., "environment": {...}, "params": {...},
+     "results": {"<measurement>": {"runs": n, "min_ms": ..., "median_ms": ..., "p95_ms": ..., ...}},
+     "summary": {...}}
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.datasets import REPO_ROOT, generate, parse_scale
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    """Statistics of a list of durations in seconds, reported in milliseconds"""
+    ordered = sorted(timings)
+    return {
+        'runs': len(ordered),
+        'min_ms': ordered[0] * 1000,
+        'median_ms': statistics.median(ordered) * 1000,
+        'mean_ms': statistics.fmean(ordered) * 1000,
+        'p95_ms': ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))] * 1000,
+        'max_ms': ordered[-1] * 1000
+    }
+
+def measure(run: Callable[[], object], repeat: int, setup: Optional[Callable[[], object]] = None) -> Dict[str, float]:
+    """Time `repeat` runs (each after an untimed setup() if given)"""
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+def prepare_environment(engine: str, poller: bool = False):
+    """Settings the application reads on import - must run before the storage package is imported"""
+    os.environ['STORAGE_ENGINE'] = engine
+    # The routers create OpenAI clients on import
+    os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ['BACKGROUND_POLLER_ENABLED'] = 'true' if poller else 'false'
+    if engine == 'sqlite':
+        os.environ.setdefault('STORAGE_SQLITE_PATH', 'leviathan.db')
+        from storage.migrate import DEFAULT_FILES, migrate
+        migrate(os.environ['STORAGE_SQLITE_PATH'], DEFAULT_FILES)
+
+def resolve_data_dir(scale: str, data_dir: Optional[str] = None) -> str:
+    """The data set to run against, generating it first when it doesn't exist"""
+    data_dir = data_dir or os.path.join(REPO_ROOT, 'benchmarks', 'data', scale)
+    if not os.path.exists(os.path.join(data_dir, 'entities.txt')):
+        print(f"Generating {scale} data set in {data_dir}")
+        generate(data_dir, parse_scale(scale))
+    return data_dir
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def environment() -> Dict[str, Any]:
+    """What a result depends on besides its parameters"""
+    return {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'git_commit': _git_commit(),
+        'settings': {name: os.environ[name] for name in sorted(os.environ)
+                     if name.startswith(('STORAGE_', 'FAST_JSON', 'OPENAI_MAX', 'OPENAI_HTTP2', 'DRAFT_'))}
+    }
+
+def write_results(path: str, benchmark: str, params: Dict[str, Any], results: Dict[str, Any],
+                  summary: Optional[Dict[str, Any]] = None):
+    """Write one benchmark run as JSON - `summary` holds counts and rates that aren't timings"""
+    document = {
+        'benchmark': benchmark,
+        'created_at': datetime.utcnow().isoformat(),
+        'environment': environment(),
+        'params': params,
+        'results': results,
+        'summary': summary or {}
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+def print_results(results: Dict[str, Dict[str, float]]):
+    width = max((len(name) for name in results), default=0)
+    for name, stats in results.items():
+        print(f"  {name:<{width}}  median {stats['median_ms']:9.2f} ms  p95 {stats['p95_ms']:9.2f} ms"
+              f"  ({stats['runs']} runs)")
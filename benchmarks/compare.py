@@ -0,0 +1,62 @@
+"""
+Compare two benchmark result files written with --output.
+
+Prints every measurement both runs have, with the change of the chosen statistic, and marks
+the ones slower than --threshold as regressions. Exits with status 1 when there are any, so it
+can gate a CI job.
+
+Usage: python -m benchmarks.compare baseline.json current.json [--stat median_ms] [--threshold 0.1]
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Tuple
+
+STATS = ['min_ms', 'median_ms', 'mean_ms', 'p95_ms', 'max_ms']
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], stat: str,
+            threshold: float) -> List[Tuple[str, float, float, float, bool]]:
+    """(measurement, baseline, current, relative change, regressed) for every shared measurement"""
+    rows = []
+    for name, before in baseline['results'].items():
+        after = current['results'].get(name)
+        if after is None or stat not in before or stat not in after:
+            continue
+        change = (after[stat] - before[stat]) / before[stat] if before[stat] else 0.0
+        rows.append((name, before[stat], after[stat], change, change > threshold))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline', help="Result file of the reference run")
+    parser.add_argument('current', help="Result file of the run to check")
+    parser.add_argument('--stat', default='median_ms', choices=STATS, help="Statistic to compare")
+    parser.add_argument('--threshold', type=float, default=0.1, help="Relative slowdown reported as a regression")
+    args = parser.parse_args()
+
+    baseline, current = load_results(args.baseline), load_results(args.current)
+    if baseline['benchmark'] != current['benchmark']:
+        sys.exit(f"Can't compare a {baseline['benchmark']} run with a {current['benchmark']} run")
+    for key in sorted(set(baseline['params']) | set(current['params'])):
+        if key != 'data' and baseline['params'].get(key) != current['params'].get(key):
+            print(f"warning: {key} differs ({baseline['params'].get(key)} -> {current['params'].get(key)})")
+
+    rows = compare(baseline, current, args.stat, args.threshold)
+    width = max((len(row[0]) for row in rows), default=0)
+    print(f"{'':<{width}}  {'baseline':>12}  {'current':>12}  {'change':>8}")
+    for name, before, after, change, regressed in rows:
+        print(f"{name:<{width}}  {before:9.2f} ms  {after:9.2f} ms  {change:+7.1%}{'  REGRESSION' if regressed else ''}")
+    for name in sorted(set(baseline['results']) ^ set(current['results'])):
+        print(f"{name:<{width}}  only in {'baseline' if name in baseline['results'] else 'current'}")
+
+    regressions = sum(1 for row in rows if row[4])
+    print(f"\n{regressions} of {len(rows)} measurements more than {args.threshold:.0%} slower ({args.stat})")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
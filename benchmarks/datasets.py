@@ -0,0 +1,125 @@
+"""
+Generate synthetic entities.txt, notability.txt, drafts.txt and articles.txt data sets.
+
+Records are copies of the records in the repository's own store files with new IDs, so field
+sizes match real data. Every scale has `--scale` entities. The first entities are fully
+drafted: status drafted_sections, a notability evaluation that meets the bar, a draft with all
+research results and a drafted article. The next ones are researched, with sources and a
+notability evaluation, and the rest keep the status of the entity they were copied from.
+
+Usage: python -m benchmarks.datasets --scale 10k [--out benchmarks/data/10k]
+"""
+
+import argparse
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_FILES = ["entities.txt", "notability.txt", "drafts.txt", "articles.txt"]
+SCALES = {"1k": 1000, "10k": 10000, "100k": 100000}
+# Statuses that only make sense with a notability record - other copies of them become backlog
+NOTABILITY_STATUSES = {"queue", "researching", "researched", "drafting_sections", "drafted_sections", "failed"}
+
+def parse_scale(scale: str) -> int:
+    """Entity count for a named scale (1k, 10k, 100k) or a plain number"""
+    return SCALES[scale] if scale in SCALES else int(scale)
+
+def read_header(filename: str) -> str:
+    with open(filename, 'r') as f:
+        first_line = f.readline().rstrip('\n')
+    return first_line if first_line.startswith('#') else ""
+
+def template_records(filename: str) -> List[dict]:
+    with open(filename, 'r') as f:
+        return [json.loads(line) for line in f if line.startswith('{')]
+
+def synthetic_records(templates: List[dict], count: int) -> List[dict]:
+    records = []
+    for i in range(count):
+        record = json.loads(json.dumps(templates[i % len(templates)]))
+        record['id'] = f"{record['id']}-{i}"
+        records.append(record)
+    return records
+
+def generate(out_dir: str, entities: int, notability_ratio: float = 0.25, drafts_ratio: float = 0.1,
+             templates_dir: str = REPO_ROOT) -> Dict[str, int]:
+    """Write the four store files to out_dir, returning the record count of each"""
+    templates = {filename: template_records(os.path.join(templates_dir, filename)) for filename in STORE_FILES}
+    headers = {filename: read_header(os.path.join(templates_dir, filename)) for filename in STORE_FILES}
+    drafted_templates = {record['id'] for record in templates["drafts.txt"]} & \
+        {record['id'] for record in templates["articles.txt"]}
+    notability_templates = [record for record in templates["notability.txt"] if record['id'] not in drafted_templates]
+    notability_by_id = {record['id']: record for record in templates["notability.txt"]}
+    drafts_by_id = {record['id']: record for record in templates["drafts.txt"]}
+    articles_by_id = {record['id']: record for record in templates["articles.txt"]}
+    drafted_ids = sorted(drafted_templates & set(notability_by_id))
+
+    drafted_count = min(entities, int(entities * drafts_ratio))
+    researched_count = max(0, min(entities, int(entities * notability_ratio)) - drafted_count)
+
+    records = {filename: [] for filename in STORE_FILES}
+    for i, entity in enumerate(synthetic_records(templates["entities.txt"], entities)):
+        if i < drafted_count:
+            template_id = drafted_ids[i % len(drafted_ids)]
+            entity['status'] = 'drafted_sections'
+            for filename, by_id in (("notability.txt", notability_by_id), ("drafts.txt", drafts_by_id),
+                                    ("articles.txt", articles_by_id)):
+                record = json.loads(json.dumps(by_id[template_id]))
+                record['id'] = entity['id']
+                records[filename].append(record)
+        elif i < drafted_count + researched_count:
+            record = json.loads(json.dumps(notability_templates[i % len(notability_templates)]))
+            record['id'] = entity['id']
+            records["notability.txt"].append(record)
+            entity['status'] = 'researched'
+        elif entity['status'] in NOTABILITY_STATUSES:
+            entity['status'] = 'backlog'
+        records["entities.txt"].append(entity)
+
+    os.makedirs(out_dir, exist_ok=True)
+    for filename in STORE_FILES:
+        with open(os.path.join(out_dir, filename), 'w') as f:
+            if headers[filename]:
+                f.write(headers[filename] + '\n')
+            for record in records[filename]:
+                f.write(json.dumps(record) + '\n')
+    return {filename: len(records[filename]) for filename in STORE_FILES}
+
+@contextmanager
+def working_copy(data_dir: str, work_dir: str) -> Iterator[str]:
+    """Copy a data set's store files into work_dir and run the with-block inside it.
+
+    The stores and routers open their files relative to the working directory, so the
+    benchmarks must enter it before importing them. Benchmarks write to the copy, never to
+    the data set.
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    for filename in STORE_FILES:
+        shutil.copyfile(os.path.join(data_dir, filename), os.path.join(work_dir, filename))
+    previous = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        yield work_dir
+    finally:
+        os.chdir(previous)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='1k', help="Entities to generate: 1k, 10k, 100k or a number")
+    parser.add_argument('--out', help="Output directory (default benchmarks/data/<scale>)")
+    parser.add_argument('--notability-ratio', type=float, default=0.25, help="Share of entities with notability data")
+    parser.add_argument('--drafts-ratio', type=float, default=0.1, help="Share of entities with a draft and an article")
+    args = parser.parse_args()
+
+    out_dir = args.out or os.path.join(REPO_ROOT, 'benchmarks', 'data', args.scale)
+    counts = generate(out_dir, parse_scale(args.scale), args.notability_ratio, args.drafts_ratio)
+    for filename, count in counts.items():
+        size = os.path.getsize(os.path.join(out_dir, filename))
+        print(f"{filename:<16} {count:>8} records {size / 1024 / 1024:9.1f} MiB")
+    print(f"Written to {out_dir}")
+
+if __name__ == "__main__":
+    main()
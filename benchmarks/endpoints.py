@@ -0,0 +1,255 @@
+"""
+Measure the list and status endpoints through the ASGI app, and load-test the full
+research -> notability -> draft pipeline against the local fake OpenAI API.
+
+Runs the application in-process on a copy of a generated data set (see benchmarks.datasets),
+with its OpenAI clients pointed at benchmarks.fake_openai on a local port. Requests go through
+the whole middleware stack over an ASGI transport, so no uvicorn worker is involved on the
+application side.
+
+1. Read endpoints - every list, summary, lookup and health endpoint is requested --repeat times.
+2. Pipeline - --pipelines new entities are taken from creation to a drafted article, at most
+   --concurrency at a time, polling the status endpoints every --poll-interval seconds like a
+   client would. Each endpoint's latency is reported per route, plus the end-to-end time.
+
+Usage: python -m benchmarks.endpoints --scale 10k [--engine wal] [--pipelines 20] [--latency 2]
+       [--output results.json]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.common import prepare_environment, print_results, resolve_data_dir, summarize, write_results
+from benchmarks.datasets import working_copy
+from benchmarks.fake_openai import FakeServer, add_api_arguments, api_from_arguments
+
+NDJSON = {'Accept': 'application/x-ndjson'}
+
+class PipelineError(Exception):
+    """A pipeline step answered with an error or a failed job"""
+
+def read_endpoints(entity_id: str, drafted_id: Optional[str]) -> List[Tuple[str, str, Optional[dict]]]:
+    """(name, path, headers) of every read endpoint worth measuring"""
+    endpoints = [
+        ("GET /entities/", "/entities/", None),
+        ("GET /entities/ (ndjson)", "/entities/", NDJSON),
+        ("GET /entities/?limit=100", "/entities/?limit=100", None),
+        ("GET /entities/?status=backlog", "/entities/?status=backlog", None),
+        ("GET /entities/?fields=id,status", "/entities/?fields=id,status", None),
+        ("GET /entities/status/researched", "/entities/status/researched", None),
+        ("GET /entities/status/backlog", "/entities/status/backlog", None),
+        ("GET /entities/queue", "/entities/queue", None),
+        ("GET /entities/{entity_id}", f"/entities/{entity_id}", None),
+        ("GET /notability/", "/notability/", None),
+        ("GET /notability/ (ndjson)", "/notability/", NDJSON),
+        ("GET /notability/?limit=100", "/notability/?limit=100", None),
+        ("GET /notability/?status=meets", "/notability/?status=meets", None),
+        ("GET /drafts/", "/drafts/", None),
+        ("GET /drafts/ (ndjson)", "/drafts/", NDJSON),
+        ("GET /drafts/?limit=100", "/drafts/?limit=100", None),
+        ("GET /drafts/?fields=id,type,updated_at", "/drafts/?fields=id,type,updated_at", None),
+        ("GET /drafts/summaries", "/drafts/summaries", None),
+        ("GET /drafts/articles/", "/drafts/articles/", None),
+        ("GET /drafts/articles/ (ndjson)", "/drafts/articles/", NDJSON),
+        ("GET /drafts/articles/?limit=100", "/drafts/articles/?limit=100", None),
+        ("GET /drafts/articles/?fields=id,status,updated_at", "/drafts/articles/?fields=id,status,updated_at", None),
+        ("GET /drafts/articles/summaries", "/drafts/articles/summaries", None),
+        ("GET /responses/?entity_id={entity_id}", f"/responses/?entity_id={entity_id}", None),
+        ("GET /health/storage", "/health/storage", None),
+        ("GET /metrics", "/metrics", None),
+    ]
+    if drafted_id is not None:
+        endpoints += [
+            ("GET /notability/{entity_id}", f"/notability/{drafted_id}", None),
+            ("GET /drafts/{draft_id}", f"/drafts/{drafted_id}", None),
+            # Every section is complete, so this never calls OpenAI
+            ("GET /drafts/{draft_id}/check-progress (complete)", f"/drafts/{drafted_id}/check-progress", None),
+            ("GET /drafts/articles/{article_id}", f"/drafts/articles/{drafted_id}", None),
+        ]
+    return endpoints
+
+async def benchmark_reads(client: httpx.AsyncClient, endpoints, repeat: int) -> Tuple[Dict[str, dict], Dict[str, int]]:
+    results = {}
+    response_bytes = {}
+    for name, path, headers in endpoints:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            timings.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError(f"{name} answered {response.status_code}: {response.text[:200]}")
+        results[name] = summarize(timings)
+        response_bytes[name] = len(response.content)
+    return results, response_bytes
+
+class Pipeline:
+    """Takes new entities through every step of the pipeline, timing each request per route"""
+
+    def __init__(self, client: httpx.AsyncClient, poll_interval: float, timeout: float):
+        self.client = client
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+        self.polls: Dict[str, int] = defaultdict(int)
+
+    async def request(self, route: str, method: str, path: str, **kwargs) -> dict:
+        start = time.perf_counter()
+        response = await self.client.request(method, path, **kwargs)
+        self.timings[f"{method} {route}"].append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise PipelineError(f"{method} {route} answered {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    async def poll(self, route: str, method: str, path: str, done, **kwargs) -> dict:
+        """Repeat a status request until done(body) - raising PipelineError on a failed job"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            body = await self.request(route, method, path, **kwargs)
+            self.polls[f"{method} {route}"] += 1
+            if body.get('status') == 'failed' or body.get('failed_sections'):
+                raise PipelineError(f"{method} {route} reported a failed job")
+            if done(body):
+                return body
+            if time.monotonic() > deadline:
+                raise PipelineError(f"{method} {route} still pending after {self.timeout}s")
+            await asyncio.sleep(self.poll_interval)
+
+    async def run(self, name: str) -> float:
+        """One entity from creation to a drafted article, returning the elapsed seconds"""
+        start = time.perf_counter()
+        entity = await self.request("/entities/", "POST", "/entities/", json={
+            'entity_name': name,
+            'entity_context': f"{name} is a partner at a venture capital firm, investing in early-stage startups.",
+            'status': 'queue'
+        })
+        entity_id = entity['id']
+        await self.request("/notability/{entity_id}", "POST", f"/notability/{entity_id}")
+        await self.poll("/notability/research/status", "POST", "/notability/research/status",
+                        lambda body: body['status'] == 'completed', json={'id': entity_id})
+        evaluation = await self.poll("/notability/notability/status", "POST", "/notability/notability/status",
+                                     lambda body: body['status'] == 'completed', json={'id': entity_id})
+        if evaluation.get('notability_status') not in ('meets', 'exceeds'):
+            raise PipelineError(f"{entity_id} evaluated as {evaluation.get('notability_status')}")
+        await self.request("/drafts/", "POST", "/drafts/", json={'id': entity_id, 'type': 'venture_capitalist'})
+        await self.poll("/drafts/{draft_id}/check-progress", "GET", f"/drafts/{entity_id}/check-progress",
+                        lambda body: body['is_complete'])
+        await self.request("/drafts/{draft_id}/draft-document", "POST", f"/drafts/{entity_id}/draft-document")
+        return time.perf_counter() - start
+
+async def benchmark_pipeline(client: httpx.AsyncClient, count: int, concurrency: int, poll_interval: float,
+                             timeout: float) -> Tuple[Dict[str, dict], dict]:
+    pipeline = Pipeline(client, poll_interval, timeout)
+    semaphore = asyncio.Semaphore(concurrency)
+    run_id = uuid.uuid4().hex[:8]
+    errors: Dict[str, int] = defaultdict(int)
+
+    async def run_one(index: int) -> Optional[float]:
+        async with semaphore:
+            try:
+                return await pipeline.run(f"Benchmark Investor {run_id} {index}")
+            except PipelineError as e:
+                errors[str(e).split(':')[0]] += 1
+                return None
+
+    start = time.perf_counter()
+    durations = await asyncio.gather(*(run_one(index) for index in range(count)))
+    elapsed = time.perf_counter() - start
+    completed = [duration for duration in durations if duration is not None]
+
+    results = {f"pipeline {route}": summarize(timings) for route, timings in sorted(pipeline.timings.items())}
+    if completed:
+        results["pipeline end-to-end"] = summarize(completed)
+    summary = {
+        'pipelines': count,
+        'completed': len(completed),
+        'failed': count - len(completed),
+        'errors': dict(errors),
+        'elapsed_seconds': elapsed,
+        'completed_per_minute': len(completed) / elapsed * 60 if elapsed else 0.0,
+        'status_polls': dict(pipeline.polls)
+    }
+    return results, summary
+
+async def run_benchmarks(args, fake_api) -> Tuple[Dict[str, dict], dict]:
+    # Imported only now - the application reads its settings and opens its stores on import
+    import main
+    from routers import entities, drafts
+
+    entity_id = sorted(entities.entities_store)[len(entities.entities_store) // 2]
+    drafted_id = sorted(drafts.drafts_store)[0] if drafts.drafts_store else None
+
+    summary = {}
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            results, summary['response_bytes'] = await benchmark_reads(
+                client, read_endpoints(entity_id, drafted_id), args.repeat)
+            if args.pipelines:
+                pipeline_results, summary['pipeline'] = await benchmark_pipeline(
+                    client, args.pipelines, args.concurrency, args.poll_interval, args.timeout)
+                results.update(pipeline_results)
+    summary['fake_openai'] = dict(fake_api.stats)
+    return results, summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='1k', help="Data set scale: 1k, 10k, 100k or an entity count")
+    parser.add_argument('--data', help="Data set directory (default benchmarks/data/<scale>, generated if missing)")
+    parser.add_argument('--engine', default=os.getenv('STORAGE_ENGINE', 'wal'), choices=['wal', 'jsonl', 'sqlite'])
+    parser.add_argument('--repeat', type=int, default=5, help="Requests per read endpoint")
+    parser.add_argument('--pipelines', type=int, default=20, help="Entities taken through the pipeline (0 to skip)")
+    parser.add_argument('--concurrency', type=int, default=10, help="Pipelines in flight at once")
+    parser.add_argument('--poll-interval', type=float, default=0.5, help="Seconds between status requests")
+    parser.add_argument('--timeout', type=float, default=300, help="Seconds a pipeline step may stay pending")
+    parser.add_argument('--poller', action='store_true', help="Also run the background poller")
+    parser.add_argument('--port', type=int, default=8100, help="Port of the fake OpenAI API")
+    add_api_arguments(parser)
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--keep', action='store_true', help="Keep the working copy of the data set")
+    args = parser.parse_args()
+
+    data_dir = resolve_data_dir(args.scale, args.data)
+    output = os.path.abspath(args.output) if args.output else None
+    work_dir = tempfile.mkdtemp(prefix='leviathan-bench-')
+    try:
+        with working_copy(data_dir, work_dir):
+            os.environ['OPENAI_BASE_URL'] = f"http://127.0.0.1:{args.port}/v1"
+            prepare_environment(args.engine, poller=args.poller)
+            fake = FakeServer(api_from_arguments(args), port=args.port)
+            fake.start()
+            try:
+                results, summary = asyncio.run(run_benchmarks(args, fake.api))
+            finally:
+                fake.stop()
+    finally:
+        if args.keep:
+            print(f"Working copy kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{args.engine} engine, {data_dir}")
+    print_results(results)
+    if 'pipeline' in summary:
+        pipeline = summary['pipeline']
+        print(f"  pipelines: {pipeline['completed']}/{pipeline['pipelines']} completed in "
+              f"{pipeline['elapsed_seconds']:.1f}s ({pipeline['completed_per_minute']:.1f}/min)")
+        for error, count in pipeline['errors'].items():
+            print(f"    {count} failed: {error}")
+    if output:
+        params = {key: value for key, value in vars(args).items() if key not in ('output', 'keep')}
+        params['data'] = data_dir
+        write_results(output, 'endpoints', params, results, summary)
+        print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
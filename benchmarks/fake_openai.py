@@ -0,0 +1,264 @@
+"""
+Local stand-in for the OpenAI Responses API, for load-testing the pipeline offline.
+
+Serves the three calls the application makes - POST /v1/responses, GET /v1/responses/{id} and
+POST /v1/responses/{id}/cancel. Background responses are queued, in progress and then completed
+(or failed, with --failure-rate) once their latency has passed; foreground responses complete
+after --sync-latency. Outputs are canned per registered prompt (see prompts.py), taken from the
+repository's own store files: research sources and the notability evaluation of a notable
+entity, its draft's research sections and its article's sections. So a request the application
+sends here is answered with realistically sized results that its parsers accept.
+
+Start it and point the application at it:
+
+    python -m benchmarks.fake_openai --port 8100 --latency 2
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=fake uvicorn main:app
+
+GET /stats reports how many responses were created, retrieved and cancelled.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+
+from benchmarks.datasets import REPO_ROOT, template_records
+
+class FakeResponsesAPI:
+    """In-memory background responses whose status follows the clock"""
+
+    def __init__(self, latency: float = 2.0, sync_latency: float = 0.2, jitter: float = 0.2,
+                 failure_rate: float = 0.0, prompt_latencies: Optional[Dict[str, float]] = None,
+                 templates_dir: str = REPO_ROOT):
+        self.latency = latency
+        self.sync_latency = sync_latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        # Background latency per prompt name, overriding `latency`
+        self.prompt_latencies = prompt_latencies or {}
+        self.responses: Dict[str, dict] = {}
+        self.stats = {'created': 0, 'created_background': 0, 'retrieved': 0, 'cancelled': 0, 'not_found': 0}
+        # Imported here so the endpoint benchmark can configure the application before its modules load
+        from prompts import PROMPTS
+        self._prompt_names = {prompt.id: prompt.name for prompt in PROMPTS.values()}
+        self._outputs = self._load_outputs(templates_dir)
+
+    @staticmethod
+    def _load_outputs(templates_dir: str) -> Dict[str, Any]:
+        def records(filename):
+            return {record['id']: record for record in template_records(os.path.join(templates_dir, filename))}
+        notability, drafts, articles = records('notability.txt'), records('drafts.txt'), records('articles.txt')
+        entities = template_records(os.path.join(templates_dir, 'entities.txt'))
+        # An entity that went through the whole pipeline
+        entity_id = sorted(entity_id for entity_id in set(drafts) & set(articles) & set(notability)
+                           if notability[entity_id].get('notability_status') in ('meets', 'exceeds'))[0]
+        evaluation = notability[entity_id]
+        outputs = {
+            'ner': {'entities': [{'type': 'PERSON', 'value': entity['name']} for entity in entities[:10]]},
+            'research': {'sources': evaluation['sources']},
+            'notability': {'notability_status': evaluation['notability_status'],
+                           'rationale': evaluation.get('notability_rationale') or ''},
+            'article_draft': articles[entity_id]['sections'].get('lead', {})
+        }
+        for section, result in drafts[entity_id]['results'].items():
+            outputs[f'research_{section}'] = result
+        for section, result in articles[entity_id]['sections'].items():
+            outputs[f'section_{section}'] = result
+        return outputs
+
+    def output_text(self, prompt_name: str, variables: Dict[str, Any]) -> str:
+        if prompt_name == 'section_generic':
+            # One prompt drafts several sections, named in the variables ("Early Life", "Career")
+            prompt_name = 'section_' + str(variables.get('section', '')).lower().replace(' ', '_')
+        return json.dumps(self._outputs.get(prompt_name, {}))
+
+    def _duration(self, prompt_name: str) -> float:
+        latency = self.prompt_latencies.get(prompt_name, self.latency)
+        return max(0.0, latency * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def create(self, body: Dict[str, Any]) -> Tuple[dict, float]:
+        """Record a new response, returning it and how long the create call itself should take"""
+        prompt = body.get('prompt') or {}
+        prompt_name = self._prompt_names.get(prompt.get('id'), 'unknown')
+        background = bool(body.get('background'))
+        now = time.time()
+        response = {
+            'id': f"resp_{uuid.uuid4().hex}",
+            'prompt_name': prompt_name,
+            'prompt': {'id': prompt.get('id'), 'version': prompt.get('version'), 'variables': None},
+            'variables': prompt.get('variables') or {},
+            'background': background,
+            'created_at': now,
+            'completed_at': now + (self._duration(prompt_name) if background else 0.0),
+            'failed': random.random() < self.failure_rate,
+            'cancelled': False
+        }
+        self.responses[response['id']] = response
+        self.stats['created'] += 1
+        if background:
+            self.stats['created_background'] += 1
+            return response, 0.0
+        return response, self.sync_latency
+
+    def status(self, response: dict) -> str:
+        if response['cancelled']:
+            return 'cancelled'
+        if time.time() < response['completed_at']:
+            return 'queued' if time.time() - response['created_at'] < 0.1 else 'in_progress'
+        return 'failed' if response['failed'] else 'completed'
+
+    def render(self, response: dict) -> dict:
+        """The response in the Responses API format"""
+        status = self.status(response)
+        body = {
+            'id': response['id'],
+            'object': 'response',
+            'created_at': int(response['created_at']),
+            'status': status,
+            'background': response['background'],
+            'model': 'fake-model',
+            'prompt': response['prompt'],
+            'output': [],
+            'usage': None,
+            'error': None,
+            'incomplete_details': None,
+            'instructions': None,
+            'metadata': {},
+            'parallel_tool_calls': True,
+            'temperature': 1.0,
+            'tool_choice': 'auto',
+            'tools': [],
+            'top_p': 1.0
+        }
+        if status == 'completed':
+            text = self.output_text(response['prompt_name'], response['variables'])
+            input_tokens = len(json.dumps(response['variables'])) // 4
+            output_tokens = len(text) // 4
+            body['output'] = [{
+                'id': f"msg_{response['id'][5:]}",
+                'type': 'message',
+                'status': 'completed',
+                'role': 'assistant',
+                'content': [{'type': 'output_text', 'text': text, 'annotations': []}]
+            }]
+            body['usage'] = {
+                'input_tokens': input_tokens,
+                'input_tokens_details': {'cached_tokens': 0},
+                'output_tokens': output_tokens,
+                'output_tokens_details': {'reasoning_tokens': 0},
+                'total_tokens': input_tokens + output_tokens
+            }
+        elif status == 'failed':
+            body['error'] = {'code': 'server_error', 'message': 'Simulated failure'}
+        return body
+
+    def get(self, response_id: str) -> dict:
+        response = self.responses.get(response_id)
+        if response is None:
+            self.stats['not_found'] += 1
+            raise HTTPException(status_code=404, detail=f"No response found with id '{response_id}'.")
+        return response
+
+def create_app(api: FakeResponsesAPI) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI Responses API")
+
+    @app.exception_handler(HTTPException)
+    async def openai_error(request: Request, exc: HTTPException):
+        # The error shape the OpenAI client parses
+        return JSONResponse(status_code=exc.status_code, content={
+            'error': {'message': exc.detail, 'type': 'invalid_request_error', 'param': None, 'code': None}
+        })
+
+    @app.post("/v1/responses")
+    async def create_response(request: Request):
+        response, delay = api.create(await request.json())
+        if delay:
+            await asyncio.sleep(delay)
+        return api.render(response)
+
+    @app.get("/v1/responses/{response_id}")
+    async def retrieve_response(response_id: str):
+        api.stats['retrieved'] += 1
+        return api.render(api.get(response_id))
+
+    @app.post("/v1/responses/{response_id}/cancel")
+    async def cancel_response(response_id: str):
+        response = api.get(response_id)
+        if api.status(response) in ('queued', 'in_progress'):
+            response['cancelled'] = True
+            api.stats['cancelled'] += 1
+        return api.render(response)
+
+    @app.get("/stats")
+    async def stats():
+        return {**api.stats, 'pending': sum(1 for response in api.responses.values()
+                                            if api.status(response) in ('queued', 'in_progress'))}
+
+    return app
+
+class FakeServer:
+    """Runs the fake API with uvicorn in a background thread, for benchmarks in the same process"""
+
+    def __init__(self, api: FakeResponsesAPI, host: str = '127.0.0.1', port: int = 8100):
+        self.api = api
+        self.base_url = f"http://{host}:{port}/v1"
+        self.server = uvicorn.Server(uvicorn.Config(create_app(api), host=host, port=port, log_level='warning'))
+        self.thread = threading.Thread(target=self.server.run, name='fake-openai', daemon=True)
+
+    def start(self, timeout: float = 10.0):
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError(f"Fake OpenAI server didn't start on {self.base_url}")
+            time.sleep(0.01)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+def parse_prompt_latencies(pairs) -> Dict[str, float]:
+    from prompts import PROMPTS
+    latencies = {}
+    for pair in pairs or []:
+        name, seconds = pair.split('=', 1)
+        if name not in PROMPTS:
+            raise SystemExit(f"Unknown prompt '{name}' - registered prompts: {', '.join(PROMPTS)}")
+        latencies[name] = float(seconds)
+    return latencies
+
+def add_api_arguments(parser: argparse.ArgumentParser):
+    """The fake API's latency options, shared with the endpoint benchmark"""
+    parser.add_argument('--latency', type=float, default=2.0, help="Seconds until a background response completes")
+    parser.add_argument('--sync-latency', type=float, default=0.2, help="Seconds a foreground create takes")
+    parser.add_argument('--jitter', type=float, default=0.2, help="Relative spread of the background latency")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="Share of responses that fail")
+    parser.add_argument('--prompt-latency', action='append', metavar='PROMPT=SECONDS',
+                        help="Background latency of one prompt, e.g. research=10 (repeatable)")
+
+def api_from_arguments(args) -> FakeResponsesAPI:
+    return FakeResponsesAPI(latency=args.latency, sync_latency=args.sync_latency, jitter=args.jitter,
+                            failure_rate=args.failure_rate,
+                            prompt_latencies=parse_prompt_latencies(args.prompt_latency))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8100)
+    add_api_arguments(parser)
+    args = parser.parse_args()
+
+    print(f"Fake OpenAI API - set OPENAI_BASE_URL=http://{args.host}:{args.port}/v1")
+    uvicorn.run(create_app(api_from_arguments(args)), host=args.host, port=args.port, log_level='info')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Compare the standard JSON path with the fast path for store persistence and list responses.
+
+Records are copies of the drafts.txt/articles.txt records with new IDs, so payload sizes match
+real drafts and articles.
+
+Usage: python -m benchmarks.json_paths [--records 500] [--repeat 5] [--output results.json]
+"""
+
+import argparse
+import json
+import os
+from typing import Dict, List
+
+# The routers create an OpenAI client on import - the benchmark never calls it
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+
+from storage import codec
+from serialization import trusted_dump
+from routers.drafts import DraftStatus, ArticleStatus
+from benchmarks.common import measure, write_results
+from benchmarks.datasets import synthetic_records, template_records
+
+def benchmark_store(records: List[dict], model, repeat: int) -> Dict[str, dict]:
+    lines = [json.dumps(record) for record in records]
+    results = {
+        'encode json': measure(lambda: [json.dumps(record) for record in records], repeat),
+        'decode json': measure(lambda: [json.loads(line) for line in lines], repeat),
+        'response validated': measure(
+            lambda: json.dumps([model(**record).model_dump(mode='json') for record in records]).encode('utf-8'), repeat),
+        'response trusted': measure(
+            lambda: codec.dumps_bytes([trusted_dump(record, model) for record in records]), repeat),
+    }
+    if codec.orjson is not None:
+        orjson = codec.orjson
+        results['encode orjson'] = measure(lambda: [orjson.dumps(record) for record in records], repeat)
+        results['decode orjson'] = measure(lambda: [orjson.loads(line) for line in lines], repeat)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=500, help="Records per store")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement (best is reported)")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    print(f"orjson: {'available' if codec.orjson is not None else 'not installed'}, "
+          f"fast path {'on' if codec.FAST_JSON else 'off'}")
+    results = {}
+    for name, filename, model in (('drafts', 'drafts.txt', DraftStatus), ('articles', 'articles.txt', ArticleStatus)):
+        records = synthetic_records(template_records(filename), args.records)
+        size = sum(len(json.dumps(record)) for record in records)
+        print(f"\n{name}: {len(records)} records, {size / 1024 / 1024:.1f} MiB")
+        for label, stats in benchmark_store(records, model, args.repeat).items():
+            print(f"  {label:<20} {stats['min_ms']:9.1f} ms")
+            results[f"{name} {label}"] = stats
+
+    if args.output:
+        params = {'records': args.records, 'repeat': args.repeat, 'orjson': codec.orjson is not None}
+        write_results(args.output, 'json_paths', params, results)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Measure the load_*/save_* functions of the entity, notability, draft and article stores.
+
+Runs against a copy of a generated data set (see benchmarks.datasets) with the storage engine
+chosen by --engine. For each store it times:
+
+- load (changed) - a full re-read, as after a compaction or with the jsonl engine
+- load (changed elsewhere) - catching up after another worker wrote one record, through the
+  engine's change feed where it has one
+- load (unchanged) - the fingerprint check that skips the re-read
+- save one - persisting a single record, as the handlers do
+- save all - persisting every record
+
+Usage: python -m benchmarks.stores --scale 10k [--engine wal] [--repeat 5] [--output results.json]
+"""
+
+import argparse
+import itertools
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks.common import measure, prepare_environment, print_results, resolve_data_dir, summarize, write_results
+from benchmarks.datasets import working_copy
+
+def open_worker(db):
+    """A second Store on the same files, standing in for another worker process"""
+    from storage import AppendLogEngine, JsonLinesEngine, SQLiteEngine, Store
+    engine = db.engine
+    if engine.name == 'wal':
+        other = AppendLogEngine(engine.filename, engine.header, compact_min_bytes=engine.compact_min_bytes)
+    elif engine.name == 'jsonl':
+        other = JsonLinesEngine(engine.filename, engine.header)
+    else:
+        other = SQLiteEngine(engine.path, db.name, change_retention=engine.change_retention)
+    return Store(db.name, other, defaults=db.defaults)
+
+def benchmark_stores(repeat: int) -> dict:
+    start = time.perf_counter()
+    from routers import entities, notability, drafts
+    startup = time.perf_counter() - start
+
+    stores = {
+        'entities': (entities.entities_db, entities.load_entities, entities.save_entities),
+        'notability': (notability.notability_db, notability.load_notability_data, notability.save_notability_data),
+        'drafts': (drafts.drafts_db, drafts.load_drafts, drafts.save_drafts),
+        'articles': (drafts.articles_db, drafts.load_articles, drafts.save_articles),
+    }
+    results = {'startup (import routers)': summarize([startup])}
+    for name, (db, load, save) in stores.items():
+        load()
+        record_ids = sorted(db.data.keys())
+        if not record_ids:
+            continue
+        record_id = record_ids[len(record_ids) // 2]
+        results[f'{name} load (changed)'] = measure(load, repeat, setup=db.invalidate)
+        results[f'{name} load (unchanged)'] = measure(load, repeat)
+        worker, touches = open_worker(db), itertools.count()
+        results[f'{name} load (changed elsewhere)'] = measure(
+            load, repeat, setup=lambda: worker.patch(record_id, {'benchmark_touch': next(touches)}))
+        results[f'{name} save one'] = measure(lambda: save(record_id), repeat)
+        results[f'{name} save all'] = measure(save, repeat)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='1k', help="Data set scale: 1k, 10k, 100k or an entity count")
+    parser.add_argument('--data', help="Data set directory (default benchmarks/data/<scale>, generated if missing)")
+    parser.add_argument('--engine', default=os.getenv('STORAGE_ENGINE', 'wal'), choices=['wal', 'jsonl', 'sqlite'])
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--keep', action='store_true', help="Keep the working copy of the data set")
+    args = parser.parse_args()
+
+    data_dir = resolve_data_dir(args.scale, args.data)
+    output = os.path.abspath(args.output) if args.output else None
+    work_dir = tempfile.mkdtemp(prefix='leviathan-bench-')
+    try:
+        with working_copy(data_dir, work_dir):
+            prepare_environment(args.engine)
+            results = benchmark_stores(args.repeat)
+    finally:
+        if args.keep:
+            print(f"Working copy kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{args.engine} engine, {data_dir}")
+    print_results(results)
+    if output:
+        params = {'scale': args.scale, 'data': data_dir, 'engine': args.engine, 'repeat': args.repeat}
+        write_results(output, 'stores', params, results)
+        print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
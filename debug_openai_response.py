@@ -8,7 +8,8 @@ import sys
 import json
 import os
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai_client import get_client
+from routers.responses import lookup_response
 
 # Load environment variables from .env file
 load_dotenv()
@@ -16,12 +17,20 @@ load_dotenv()
 def debug_openai_response(response_id):
     """Retrieve and debug an OpenAI background response"""
     
-    # Initialize OpenAI client
-    client = OpenAI()
+    # Use the application's shared OpenAI client settings
+    client = get_client()
     
     try:
         print(f"[DEBUG] Retrieving response for ID: {response_id}")
         
+        # Show which entity/draft section created the response
+        owner = lookup_response(response_id)
+        if owner:
+            print(f"[DEBUG] Response owner: {owner['store']} / {owner['entity_id']} "
+                  f"(phase: {owner['phase']}, section: {owner['section']}, created: {owner['created_at']})")
+        else:
+            print(f"[DEBUG] Response ID not found in the response index")
+        
         # Retrieve the response from OpenAI
         response = client.responses.retrieve(response_id)
         
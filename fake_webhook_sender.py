@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Send a signed OpenAI-style webhook event to a local server, for testing POST /webhooks/openai.
+Usage: python fake_webhook_sender.py <response_id> [event_type] [url]
+
+Signs with OPENAI_WEBHOOK_SECRET, so the server must be running with the same secret.
+"""
+
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+from dotenv import load_dotenv
+
+from webhook_signing import sign
+
+# Load environment variables from .env file
+load_dotenv()
+
+DEFAULT_URL = "http://localhost:8000/webhooks/openai"
+
+def send_webhook(response_id, event_type="response.completed", url=DEFAULT_URL):
+    """Build, sign and POST a background response event"""
+    secret = os.getenv('OPENAI_WEBHOOK_SECRET')
+    if not secret:
+        print("[ERROR] OPENAI_WEBHOOK_SECRET is not set")
+        sys.exit(1)
+    
+    webhook_id = f"wh_{uuid.uuid4().hex}"
+    timestamp = int(time.time())
+    body = json.dumps({
+        "id": f"evt_{uuid.uuid4().hex}",
+        "object": "event",
+        "type": event_type,
+        "created_at": timestamp,
+        "data": {"id": response_id}
+    }).encode("utf-8")
+    
+    request = urllib.request.Request(url, data=body, method="POST", headers={
+        "Content-Type": "application/json",
+        "webhook-id": webhook_id,
+        "webhook-timestamp": str(timestamp),
+        "webhook-signature": sign(secret, webhook_id, timestamp, body)
+    })
+    
+    try:
+        with urllib.request.urlopen(request) as response:
+            print(f"[DEBUG] {response.status}: {response.read().decode('utf-8')}")
+    except urllib.error.HTTPError as e:
+        print(f"[ERROR] {e.code}: {e.read().decode('utf-8')}")
+
+def main():
+    if len(sys.argv) < 2 or len(sys.argv) > 4:
+        print("Usage: python fake_webhook_sender.py <response_id> [event_type] [url]")
+        print("Example: python fake_webhook_sender.py resp_6883bc604ad0819a94ac84e445bc74c70e2b5963dc91916d response.completed")
+        sys.exit(1)
+    
+    response_id = sys.argv[1]
+    event_type = sys.argv[2] if len(sys.argv) > 2 else "response.completed"
+    url = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_URL
+    send_webhook(response_id, event_type, url)
+
+if __name__ == "__main__":
+    main()
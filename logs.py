@@ -0,0 +1,198 @@
+"""
+Application logging.
+
+Handlers and stores log through get_logger(). Records are put on an in-memory queue and written
+to stdout by a listener thread, so a request only pays for formatting its message, never for the
+write itself. Messages below LOG_LEVEL are dropped before they are formatted.
+
+Every record carries the correlation IDs bound for the current request or task (entity_id,
+response_id - see bind() and context()) and the route being served. Verbose payload logs (request
+bodies, OpenAI response objects, whole records) go through log_payload(): they are DEBUG records
+that are only written for a sample of requests per route, so even with LOG_LEVEL=DEBUG a busy
+route doesn't dump every payload.
+
+main.py calls configure() at startup and shutdown() when the app stops.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')  # "text" or "json" (one JSON object per line)
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv('LOG_PAYLOAD_SAMPLE_RATE', '0.01'))  # Fraction of requests whose payloads are logged
+# Per-route overrides as "route=rate" pairs, e.g. "/notability/research/status=0.1,/ner/=0"
+LOG_PAYLOAD_SAMPLE_RATES = os.getenv('LOG_PAYLOAD_SAMPLE_RATES', '')
+
+# Parent of every application logger - third-party loggers are left alone
+ROOT_LOGGER_NAME = "leviathan"
+
+# Correlation IDs bound to the current request or task
+_entity_id: ContextVar[Optional[str]] = ContextVar('log_entity_id', default=None)
+_response_id: ContextVar[Optional[str]] = ContextVar('log_response_id', default=None)
+# State of the request being served: its ASGI scope and whether its payloads are sampled
+_request: ContextVar[Optional[dict]] = ContextVar('log_request', default=None)
+
+def _parse_rates(rates: str) -> Dict[str, float]:
+    parsed = {}
+    for pair in rates.split(','):
+        if '=' in pair:
+            route, rate = pair.rsplit('=', 1)
+            parsed[route.strip()] = float(rate)
+    return parsed
+
+payload_sample_rates = _parse_rates(LOG_PAYLOAD_SAMPLE_RATES)
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for a module - pass __name__"""
+    return logging.getLogger(ROOT_LOGGER_NAME).getChild(name)
+
+def bind(entity_id: Optional[str] = None, response_id: Optional[str] = None):
+    """Attach correlation IDs to every record logged for the rest of the current request or task"""
+    if entity_id is not None:
+        _entity_id.set(entity_id)
+    if response_id is not None:
+        _response_id.set(response_id)
+
+@contextmanager
+def context(entity_id: Optional[str] = None, response_id: Optional[str] = None):
+    """Attach correlation IDs to the records logged inside the with-block only"""
+    tokens = []
+    if entity_id is not None:
+        tokens.append((_entity_id, _entity_id.set(entity_id)))
+    if response_id is not None:
+        tokens.append((_response_id, _response_id.set(response_id)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+def _current_route() -> Optional[str]:
+    request = _request.get()
+    if request is None:
+        return None
+    route = request['scope'].get('route')
+    return getattr(route, 'path', None)
+
+def payload_sampled() -> bool:
+    """Whether verbose payloads are logged for the current request (decided once per request)"""
+    request = _request.get()
+    if request is None:
+        # Background work (poller, startup) - sample every call independently
+        return random.random() < LOG_PAYLOAD_SAMPLE_RATE
+    if request['sampled'] is None:
+        rate = payload_sample_rates.get(_current_route(), LOG_PAYLOAD_SAMPLE_RATE)
+        request['sampled'] = random.random() < rate
+    return request['sampled']
+
+def payload_enabled(logger: logging.Logger) -> bool:
+    """Whether log_payload() would write anything - check it before building an expensive payload"""
+    return logger.isEnabledFor(logging.DEBUG) and payload_sampled()
+
+def log_payload(logger: logging.Logger, message: str, *args):
+    """Log a verbose payload at DEBUG level, for the sampled share of requests on this route"""
+    if payload_enabled(logger):
+        logger.debug(message, *args)
+
+class RequestContextMiddleware:
+    """ASGI middleware giving every request fresh correlation IDs and its own payload sampling decision"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        tokens = [
+            (_request, _request.set({'scope': scope, 'sampled': None})),
+            (_entity_id, _entity_id.set(None)),
+            (_response_id, _response_id.set(None))
+        ]
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            for var, token in reversed(tokens):
+                var.reset(token)
+
+class ContextFilter(logging.Filter):
+    """Copies the correlation IDs onto the record - runs in the caller's thread, before the record is queued"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.entity_id = _entity_id.get()
+        record.response_id = _response_id.get()
+        record.route = _current_route()
+        return True
+
+class TextFormatter(logging.Formatter):
+    """`time level logger: message key=value ...` with the bound correlation IDs"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = [f"{key}={getattr(record, key)}" for key in ('route', 'entity_id', 'response_id')
+                  if getattr(record, key, None) is not None]
+        return line + (" " + " ".join(fields) if fields else "")
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key in ('route', 'entity_id', 'response_id'):
+            if getattr(record, key, None) is not None:
+                entry[key] = getattr(record, key)
+        return json.dumps(entry, default=str)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_configure_lock = threading.Lock()
+
+def configure(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT):
+    """Route application logs through a queue to a stdout writer thread (safe to call more than once)"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(ContextFilter())
+
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(JSONFormatter() if log_format == 'json' else TextFormatter())
+
+        root = logging.getLogger(ROOT_LOGGER_NAME)
+        root.handlers = [queue_handler]
+        root.setLevel(level)
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+        _listener.start()
+
+def shutdown():
+    """Write out everything still queued and stop the writer thread"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
@@ -1,26 +1,53 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import os
 from dotenv import load_dotenv
-from models import HealthResponse, HelloResponse
-from routers import entities, ner, notability, drafts
+from models import HealthResponse, HelloResponse, StorageStatsResponse, StoreStats, LockStats
+import openai_client
+import metrics
+import logs
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Start the log writer and configure the shared OpenAI clients before the routers import them
+logs.configure()
+openai_client.configure()
+logger = logs.get_logger(__name__)
+
+from routers import entities, ner, notability, drafts, webhooks, responses
+from storage import LockTimeout, UpdateConflict, lock_stats, store_stats
+from poller import BackgroundPoller, BACKGROUND_POLLER_ENABLED
+
 # Debug: Check if API key is loaded (remove this in production)
 api_key = os.getenv('OPENAI_API_KEY')
 if api_key:
-    print(f"✅ OpenAI API key loaded: {api_key[:10]}...")
+    logger.info("OpenAI API key loaded: %s...", api_key[:10])
 else:
-    print("❌ OpenAI API key not found in environment variables")
+    logger.warning("OpenAI API key not found in environment variables")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the background job poller for the lifetime of the app, and close the OpenAI connection pools and flush the logs on shutdown"""
+    # Index responses created before the response index existed
+    if not responses.responses_store:
+        logger.info("Indexed %d existing response IDs", responses.rebuild_response_index())
+    poller = BackgroundPoller()
+    if BACKGROUND_POLLER_ENABLED:
+        poller.start()
+    yield
+    await poller.stop()
+    await openai_client.close()
+    logs.shutdown()
 
 app = FastAPI(
     title="My FastAPI App",
     description="A simple FastAPI application with Named Entity Recognition",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -32,37 +59,53 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Give every request its own log correlation IDs, and time it per route (outermost, so CORS handling is included)
+app.add_middleware(logs.RequestContextMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Include routers
 app.include_router(entities.router)
 app.include_router(ner.router)
 app.include_router(notability.router)
 app.include_router(drafts.router)
+app.include_router(webhooks.router)
+app.include_router(responses.router)
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Handle validation errors and log the details"""
-    print(f"[DEBUG] Validation error occurred!")
-    print(f"[DEBUG] Request URL: {request.url}")
-    print(f"[DEBUG] Request method: {request.method}")
-    print(f"[DEBUG] Validation errors: {exc.errors()}")
+    logger.info("Validation error on %s %s: %s", request.method, request.url, exc.errors())
     
-    # Try to read the request body
-    try:
-        body = await request.body()
-        print(f"[DEBUG] Request body: {body}")
-        if body:
-            print(f"[DEBUG] Request body (decoded): {body.decode('utf-8')}")
-    except Exception as e:
-        print(f"[DEBUG] Could not read request body: {e}")
-    
-    # Also log headers to see if Content-Type is correct
-    print(f"[DEBUG] Content-Type header: {request.headers.get('content-type')}")
+    # The body is only read (and logged) for the sampled share of requests
+    if logs.payload_enabled(logger):
+        try:
+            body = await request.body()
+            logger.debug("Request body (Content-Type %s): %s", request.headers.get('content-type'),
+                         body.decode('utf-8', errors='replace'))
+        except Exception as e:
+            logger.debug("Could not read request body: %s", e)
     
     return JSONResponse(
         status_code=400,
         content={"detail": "Validation error", "errors": exc.errors()}
     )
 
+@app.exception_handler(LockTimeout)
+async def lock_timeout_handler(request: Request, exc: LockTimeout):
+    """A store stayed locked longer than STORAGE_LOCK_TIMEOUT - tell the client to retry"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Storage busy: {str(exc)}"}
+    )
+
+@app.exception_handler(UpdateConflict)
+async def update_conflict_handler(request: Request, exc: UpdateConflict):
+    """Other workers kept changing a record while this request tried to update it - tell the client to retry"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Storage busy: {str(exc)}"}
+    )
+
 @app.get("/", response_model=HelloResponse)
 def read_root():
     return HelloResponse()
@@ -71,4 +114,15 @@ def read_root():
 def health_check():
     return HealthResponse()
 
- 
\ No newline at end of file
+@app.get("/health/storage", response_model=StorageStatsResponse)
+def storage_stats():
+    """Record counts, reload cache hit/miss counters and lock wait times for every store"""
+    return StorageStatsResponse(
+        stores=[StoreStats(**stats) for stats in store_stats()],
+        locks=[LockStats(**stats) for stats in lock_stats()]
+    )
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Route, OpenAI, store and lock metrics of this worker in the Prometheus text format"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,230 @@
+"""
+In-process metrics in the Prometheus text exposition format, served at GET /metrics.
+
+Covers the hot paths of a request: route latency (MetricsMiddleware), OpenAI calls per prompt
+(recorded by prompts.py), store loads/saves (storage.store) and file lock waits
+(storage.locking). Metrics are kept per process - with several uvicorn workers, each one reports
+its own numbers, so scrape them individually or aggregate by instance.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+OPENAI_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+LOCK_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+_registry: List["Metric"] = []
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Metric:
+    """A named metric with a fixed set of label names, registered for exposition on creation"""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], object] = {}
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = list(self._series.items())
+        for key, value in sorted(series):
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key, value) -> List[str]:
+        raise NotImplementedError
+
+class Counter(Metric):
+    """Monotonically increasing total"""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def _render_series(self, key, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, plus their sum and count"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (not cumulative), sum, count
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str):
+        """Observe the duration of the with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_series(self, key, value) -> List[str]:
+        counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+def render() -> str:
+    """Every registered metric in the Prometheus text format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# Routes
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time from receiving a request to sending the last byte of the response",
+    ("method", "route", "status")
+)
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request until its response body is fully sent.
+
+    Requests are labelled with the matched route's path template (e.g. /drafts/{draft_id}) so
+    the number of series stays bounded; requests no route matched are labelled "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status["code"])
+            )
+
+# OpenAI
+
+OPENAI_REQUEST_DURATION = Histogram(
+    "openai_request_duration_seconds", "Latency of individual OpenAI API calls (each retry attempt separately)",
+    ("prompt", "prompt_id", "version", "operation"), buckets=OPENAI_BUCKETS
+)
+OPENAI_ERRORS = Counter(
+    "openai_errors_total", "Failed OpenAI API calls by exception type",
+    ("prompt", "prompt_id", "version", "operation", "error")
+)
+OPENAI_TOKENS = Counter(
+    "openai_tokens_total", "Tokens used by completed responses",
+    ("prompt", "prompt_id", "version", "kind")
+)
+
+# Responses whose usage was already counted - background responses are retrieved repeatedly
+_counted_responses: "OrderedDict[str, None]" = OrderedDict()
+_counted_responses_lock = threading.Lock()
+_COUNTED_RESPONSES_MAX = 10000
+
+def record_openai_usage(response, prompt: str, prompt_id: str, version: str):
+    """Count the tokens of a completed response once, however often it is retrieved"""
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return
+    response_id = getattr(response, 'id', None)
+    if response_id is not None:
+        with _counted_responses_lock:
+            if response_id in _counted_responses:
+                return
+            _counted_responses[response_id] = None
+            if len(_counted_responses) > _COUNTED_RESPONSES_MAX:
+                _counted_responses.popitem(last=False)
+    for kind in ("input", "output"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if tokens:
+            OPENAI_TOKENS.inc(tokens, prompt=prompt, prompt_id=prompt_id, version=version, kind=kind)
+
+# Storage
+
+STORE_LOAD_DURATION = Histogram(
+    "store_load_duration_seconds", "Time spent in Store.load(), by whether the persisted state had changed",
+    ("store", "engine", "result")
+)
+STORE_LOAD_BYTES = Counter(
+    "store_load_bytes_total", "Bytes read from disk by Store.load()", ("store", "engine")
+)
+STORE_SAVE_DURATION = Histogram(
+    "store_save_duration_seconds", "Time spent in Store.save()", ("store", "engine")
+)
+STORE_SAVE_BYTES = Counter(
+    "store_save_bytes_total", "Bytes written to disk by Store.save()", ("store", "engine")
+)
+LOCK_WAIT = Histogram(
+    "storage_lock_wait_seconds", "Time spent waiting for file locks", ("file", "mode"), buckets=LOCK_WAIT_BUCKETS
+)
+LOCK_TIMEOUTS = Counter(
+    "storage_lock_timeouts_total", "File lock acquisitions that hit STORAGE_LOCK_TIMEOUT", ("file", "mode")
+)
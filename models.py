@@ -14,6 +14,17 @@ class NERRequest(BaseModel):
 class NERResponse(BaseModel):
     entities: List[Entity]
 
+class NERBatchRequest(BaseModel):
+    texts: List[str] = Field(..., description="Documents to extract entities from - long documents are split into chunks")
+
+class NERBatchResult(BaseModel):
+    entities: List[Entity] = Field(default_factory=list)
+    chunks: int = Field(..., description="Number of chunks the document was split into")
+    error: Optional[str] = Field(None, description="Error if any chunk of the document failed")
+
+class NERBatchResponse(BaseModel):
+    results: List[NERBatchResult] = Field(..., description="One result per document, in request order")
+
 # Entity Store Models
 class EntityStatus(str, Enum):
     ignore = "ignore"
@@ -103,6 +114,43 @@ class NotabilityStatusResponse(BaseModel):
     notability_status: Optional[str] = Field(None, description="Notability evaluation result (exceeds, meets, fails)")
     notability_rationale: Optional[str] = Field(None, description="Rationale for the notability evaluation")
 
+# Response Index Models
+class ResponseOwner(BaseModel):
+    id: str = Field(..., description="OpenAI response ID (resp_...)")
+    store: Literal["notability", "drafts"] = Field(..., description="Store holding the job that created the response")
+    entity_id: str = Field(..., description="Entity (or draft) ID owning the response")
+    phase: Literal["research", "notability", "draft"] = Field(..., description="Pipeline phase of the job")
+    section: Optional[str] = Field(None, description="Draft research section, for draft jobs (e.g., 'early_life')")
+    created_at: Optional[str] = Field(None, description="ISO timestamp when the response was created")
+
+# Webhook Models
+class WebhookResponse(BaseModel):
+    status: Literal["processed", "already_processed", "ignored"] = Field(..., description="What was done with the event")
+    event_type: Optional[str] = Field(None, description="Type of the received event (e.g., 'response.completed')")
+    response_id: Optional[str] = Field(None, description="OpenAI response ID the event refers to")
+    phase: Optional[str] = Field(None, description="Job phase owning the response (research, notability, draft)")
+    owner_id: Optional[str] = Field(None, description="Entity or draft ID owning the response")
+
+# Storage Models
+class StoreStats(BaseModel):
+    name: str = Field(..., description="Store file name (e.g., 'entities.txt')")
+    engine: str = Field(..., description="Storage engine backing the store (wal, jsonl, sqlite)")
+    records: int = Field(..., description="Number of records currently held in memory")
+    cache_hits: int = Field(..., description="Reloads skipped because the persisted data was unchanged")
+    cache_misses: int = Field(..., description="Reloads that re-read the persisted data")
+
+class LockStats(BaseModel):
+    name: str = Field(..., description="Locked file name")
+    mode: Literal["shared", "exclusive"] = Field(..., description="Lock mode")
+    acquisitions: int = Field(..., description="Number of times the lock was acquired")
+    timeouts: int = Field(..., description="Number of times waiting for the lock timed out")
+    total_wait_seconds: float = Field(..., description="Total time spent waiting for the lock")
+    max_wait_seconds: float = Field(..., description="Longest single wait for the lock")
+
+class StorageStatsResponse(BaseModel):
+    stores: List[StoreStats] = Field(default=[], description="Statistics for every open store")
+    locks: List[LockStats] = Field(default=[], description="Wait-time statistics for every file lock")
+
 # Basic API Response Models
 class HealthResponse(BaseModel):
     status: str = Field(default="healthy", description="API health status")
@@ -112,4 +160,8 @@ class HelloResponse(BaseModel):
 
 # Constants for timeout handling
 TIMEOUT_SECONDS = 600  # 10 minutes
-MAX_RETRIES = 2  # Maximum number of retries before marking as failed 
\ No newline at end of file
+MAX_RETRIES = 2  # Maximum number of retries before marking as failed
+
+# Retry policy for individual OpenAI calls
+OPENAI_RETRY_ATTEMPTS = 3  # Total attempts per call, including the first
+OPENAI_RETRY_BACKOFF_SECONDS = 1.0  # Base delay, doubled after every failed attempt
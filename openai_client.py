@@ -0,0 +1,190 @@
+"""
+Application-wide OpenAI clients.
+
+Every router and script gets its client from here, so the whole process shares one keep-alive
+connection pool per client type (a sync client for the threadpool handlers in notability.py and
+an async client for the event-loop handlers), the same timeouts, and one limit on how many
+OpenAI requests are in flight at once. The clients themselves never retry - prompts.py owns the
+retry policy. main.py calls configure() once at startup, before the routers are imported;
+otherwise the environment defaults below are used.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Optional
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, OpenAI
+
+# Load environment variables
+load_dotenv()
+
+OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', '20'))  # Open connections per client
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('OPENAI_MAX_KEEPALIVE_CONNECTIONS', '10'))  # Idle connections kept for reuse
+OPENAI_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY_SECONDS', '30'))
+# Per call (read/write/pool) - the SDK's own default, since foreground prompts with large outputs
+# (draft sections, article drafts, NER on long texts) can take several minutes
+OPENAI_TIMEOUT_SECONDS = float(os.getenv('OPENAI_TIMEOUT_SECONDS', '600'))
+OPENAI_CONNECT_TIMEOUT_SECONDS = float(os.getenv('OPENAI_CONNECT_TIMEOUT_SECONDS', '10'))
+OPENAI_MAX_CONCURRENCY = int(os.getenv('OPENAI_MAX_CONCURRENCY', '16'))  # In-flight requests across the whole process
+OPENAI_HTTP2 = os.getenv('OPENAI_HTTP2', 'true').lower() in ('1', 'true', 'yes')
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (pip install 'httpx[http2]')"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+class ConcurrencyLimit:
+    """Caps in-flight requests across sync and async clients alike.
+
+    Threads block on the semaphore; coroutines poll it so they never block the event loop.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit)
+        self._in_flight = 0
+        self._guard = threading.Lock()
+
+    def _acquired(self):
+        with self._guard:
+            self._in_flight += 1
+
+    def acquire(self):
+        self._semaphore.acquire()
+        self._acquired()
+
+    async def acquire_async(self):
+        delay = 0.005
+        while not self._semaphore.acquire(blocking=False):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+        self._acquired()
+
+    def release(self):
+        with self._guard:
+            self._in_flight -= 1
+        self._semaphore.release()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+class LimitedTransport(httpx.BaseTransport):
+    """Sync transport that holds a concurrency slot until the response body has been read"""
+
+    def __init__(self, transport: httpx.BaseTransport, limit: ConcurrencyLimit):
+        self.transport = transport
+        self.limit = limit
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.limit.acquire()
+        try:
+            response = self.transport.handle_request(request)
+            response.read()
+            return response
+        finally:
+            self.limit.release()
+
+    def close(self):
+        self.transport.close()
+
+class AsyncLimitedTransport(httpx.AsyncBaseTransport):
+    """Async transport that holds a concurrency slot until the response body has been read"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limit: ConcurrencyLimit):
+        self.transport = transport
+        self.limit = limit
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self.limit.acquire_async()
+        try:
+            response = await self.transport.handle_async_request(request)
+            await response.aread()
+            return response
+        finally:
+            self.limit.release()
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+_settings = {}
+_limit: Optional[ConcurrencyLimit] = None
+_client: Optional[OpenAI] = None
+_async_client: Optional[AsyncOpenAI] = None
+_lock = threading.Lock()
+
+def configure(max_connections: int = OPENAI_MAX_CONNECTIONS,
+              max_keepalive_connections: int = OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+              keepalive_expiry: float = OPENAI_KEEPALIVE_EXPIRY_SECONDS,
+              timeout: float = OPENAI_TIMEOUT_SECONDS,
+              connect_timeout: float = OPENAI_CONNECT_TIMEOUT_SECONDS,
+              max_concurrency: int = OPENAI_MAX_CONCURRENCY,
+              http2: bool = OPENAI_HTTP2):
+    """Set the pool, timeout and concurrency settings - must run before the first client is created"""
+    global _limit
+    with _lock:
+        if _client is not None or _async_client is not None:
+            raise RuntimeError("OpenAI clients already created - call configure() before importing the routers")
+        _settings.update(
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_keepalive_connections,
+                                keepalive_expiry=keepalive_expiry),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            http2=http2 and http2_available()
+        )
+        _limit = ConcurrencyLimit(max_concurrency)
+
+def _ensure_configured():
+    if not _settings:
+        configure()
+
+def get_client() -> OpenAI:
+    """The shared sync client (for handlers running in the threadpool and scripts)"""
+    global _client
+    _ensure_configured()
+    with _lock:
+        if _client is None:
+            transport = httpx.HTTPTransport(limits=_settings['limits'], http2=_settings['http2'])
+            _client = OpenAI(
+                timeout=_settings['timeout'],
+                # prompts.py retries failed calls itself - SDK retries on top would multiply the attempts
+                max_retries=0,
+                http_client=httpx.Client(transport=LimitedTransport(transport, _limit), timeout=_settings['timeout'])
+            )
+        return _client
+
+def get_async_client() -> AsyncOpenAI:
+    """The shared async client (for handlers running on the event loop)"""
+    global _async_client
+    _ensure_configured()
+    with _lock:
+        if _async_client is None:
+            transport = httpx.AsyncHTTPTransport(limits=_settings['limits'], http2=_settings['http2'])
+            _async_client = AsyncOpenAI(
+                timeout=_settings['timeout'],
+                # prompts.py retries failed calls itself - SDK retries on top would multiply the attempts
+                max_retries=0,
+                http_client=httpx.AsyncClient(transport=AsyncLimitedTransport(transport, _limit),
+                                              timeout=_settings['timeout'])
+            )
+        return _async_client
+
+async def close():
+    """Close both clients' connection pools - called on application shutdown"""
+    global _client, _async_client
+    with _lock:
+        client, async_client = _client, _async_client
+        _client = _async_client = None
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.close()
+
+def in_flight() -> int:
+    """OpenAI requests currently in flight across the process"""
+    return _limit.in_flight if _limit is not None else 0
@@ -0,0 +1,155 @@
+"""
+Server-side background poller for OpenAI background jobs.
+
+Advances research, notability and draft section jobs without waiting for a client to call
+POST /notability/research/status, POST /notability/notability/status or
+GET /drafts/{id}/check-progress. Each job goes through the same function those endpoints use,
+so the state transitions are identical. Jobs that are still pending are polled with
+exponential backoff, and only one uvicorn worker (the one holding the poller lock) polls at a time.
+"""
+
+import asyncio
+import fcntl
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from models import ResearchStatusRequest, NotabilityStatusRequest
+from routers.entities import entities_store, load_entities
+from routers.notability import notability_store, load_notability_data, check_research_status, check_notability_status
+from routers.drafts import draft_summaries_db, draft_summaries_store, update_draft_progress
+import logs
+
+# Load environment variables
+load_dotenv()
+
+BACKGROUND_POLLER_ENABLED = os.getenv('BACKGROUND_POLLER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+POLLER_TICK_SECONDS = float(os.getenv('POLLER_TICK_SECONDS', '2'))  # How often due jobs are looked for
+POLLER_MIN_INTERVAL_SECONDS = float(os.getenv('POLLER_MIN_INTERVAL_SECONDS', '5'))  # First poll delay for a new job
+POLLER_MAX_INTERVAL_SECONDS = float(os.getenv('POLLER_MAX_INTERVAL_SECONDS', '120'))  # Backoff ceiling
+POLLER_CONCURRENCY = int(os.getenv('POLLER_CONCURRENCY', '4'))  # Jobs advanced at the same time
+POLLER_LOCK_FILE = os.getenv('POLLER_LOCK_FILE', 'poller.lock')
+
+JobKey = Tuple[str, str, str]  # (phase, entity/draft ID, OpenAI response ID)
+
+logger = logs.get_logger(__name__)
+
+class BackgroundPoller:
+    """Periodically advances every outstanding background job, backing off while a job stays pending"""
+
+    def __init__(self, tick_seconds: float = POLLER_TICK_SECONDS, min_interval: float = POLLER_MIN_INTERVAL_SECONDS,
+                 max_interval: float = POLLER_MAX_INTERVAL_SECONDS, concurrency: int = POLLER_CONCURRENCY,
+                 lock_file: str = POLLER_LOCK_FILE):
+        self.tick_seconds = tick_seconds
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.concurrency = concurrency
+        self.lock_file = lock_file
+        # Job key -> (monotonic time of next poll, interval to wait after that poll)
+        self._schedule: Dict[JobKey, Tuple[float, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._lock_handle = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._lock_handle:
+            self._lock_handle.close()
+            self._lock_handle = None
+
+    def _is_leader(self) -> bool:
+        """Hold an exclusive lock so only one worker polls - others keep trying in case the leader exits"""
+        if self._lock_handle:
+            return True
+        handle = open(self.lock_file, 'a')
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            handle.close()
+            return False
+        self._lock_handle = handle
+        logger.info("Background poller started in process %d", os.getpid())
+        return True
+
+    async def _run(self):
+        while True:
+            try:
+                if self._is_leader():
+                    await self.poll_once()
+            except Exception as e:
+                logger.exception("Background poller error: %s", e)
+            await asyncio.sleep(self.tick_seconds)
+
+    def outstanding_jobs(self) -> Dict[JobKey, Callable[[], Awaitable]]:
+        """Every background job that hasn't reached a final state, with the function that advances it"""
+        load_entities()
+        load_notability_data()
+        draft_summaries_db.load()
+
+        jobs = {}
+        for entity_id, notability_data in list(notability_store.items()):
+            research_request_id = notability_data.get('openai_research_request_id')
+            if research_request_id and entities_store.get(entity_id, {}).get('status') == 'researching':
+                jobs[('research', entity_id, research_request_id)] = \
+                    lambda entity_id=entity_id: asyncio.to_thread(check_research_status, ResearchStatusRequest(id=entity_id))
+
+            notability_request_id = notability_data.get('openai_notability_request_id')
+            if notability_request_id and notability_data.get('notability_status') is None:
+                jobs[('notability', entity_id, notability_request_id)] = \
+                    lambda entity_id=entity_id: asyncio.to_thread(check_notability_status, NotabilityStatusRequest(id=entity_id))
+
+        # Summaries carry the per-section completion flags, so the drafts' research results aren't loaded every tick.
+        # Sections whose job failed, never existed or ran past its deadline are final too
+        for draft_id, summary in list(draft_summaries_store.items()):
+            if summary['completed_sections'] + summary.get('failed_sections', 0) < summary['total_sections']:
+                # One progress check covers every section of the draft
+                jobs[('draft', draft_id, '')] = lambda draft_id=draft_id: update_draft_progress(draft_id)
+
+        return jobs
+
+    async def poll_once(self):
+        """Advance every job whose next poll time has come, then push its next poll back"""
+        now = time.monotonic()
+        jobs = self.outstanding_jobs()
+
+        # Forget jobs that reached a final state (or were retried under a new response ID)
+        for key in list(self._schedule):
+            if key not in jobs:
+                del self._schedule[key]
+
+        due = []
+        for key, advance in jobs.items():
+            next_poll, _ = self._schedule.setdefault(key, (now + self.min_interval, self.min_interval))
+            if next_poll <= now:
+                due.append((key, advance))
+
+        if not due:
+            return
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def advance_job(key: JobKey, advance: Callable[[], Awaitable]):
+            phase, entity_id, response_id = key
+            async with semaphore, logs.context(entity_id=entity_id, response_id=response_id or None):
+                try:
+                    await advance()
+                except HTTPException as e:
+                    logger.warning("Background %s poll failed: %s", phase, e.detail)
+                except Exception as e:
+                    logger.exception("Background %s poll failed: %s", phase, e)
+
+        await asyncio.gather(*(advance_job(key, advance) for key, advance in due))
+
+        polled_at = time.monotonic()
+        for key, _ in due:
+            _, interval = self._schedule[key]
+            self._schedule[key] = (polled_at + interval, min(interval * 2, self.max_interval))
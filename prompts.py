@@ -0,0 +1,330 @@
+"""
+Registry of the stored OpenAI prompts the application calls, and the one call/extract pipeline
+every router uses.
+
+Each prompt is registered once under a name with its ID, version and any fixed request options
+(output format, token limit, ...). Routers call create()/acreate() with the prompt name and its
+variables, and read results with response_text()/response_json(), so retries - and anything else
+that should apply to every model call - live here instead of at each call site. Every attempt's
+latency, error and (for completed responses) token usage is recorded in metrics.py per prompt.
+"""
+
+import asyncio
+import json
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional
+import httpx
+import openai
+import metrics
+import logs
+from models import OPENAI_RETRY_ATTEMPTS, OPENAI_RETRY_BACKOFF_SECONDS
+
+logger = logs.get_logger(__name__)
+
+class Prompt(NamedTuple):
+    name: str
+    id: str
+    version: str
+    # Extra responses.create() arguments sent with every call of this prompt
+    options: Dict[str, Any] = {}
+
+    def payload(self, variables: Dict[str, Any]) -> Dict[str, Any]:
+        """The `prompt` argument of responses.create()"""
+        return {"id": self.id, "version": self.version, "variables": variables}
+
+# Structured output of the generic encyclopedia section prompt
+ENCYCLOPEDIA_SECTION_FORMAT = {
+    "format": {
+        "type": "json_schema",
+        "name": "encyclopedia_section_blocks",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "blocks": {
+                    "type": "array",
+                    "description": "A list of content blocks that make up the encyclopedia section. These can be headings, subheadings, paragraphs, etc.",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "type": {
+                                "type": "string",
+                                "enum": [
+                                    "heading",
+                                    "subheading",
+                                    "paragraph",
+                                    "quote",
+                                    "list"
+                                ],
+                                "description": "The type of content block. Determines how the block is rendered."
+                            },
+                            "content": {
+                                "type": "string",
+                                "description": "The textual content of the block."
+                            },
+                            "citations": {
+                                "type": "array",
+                                "description": "Optional in-line citations within this block, referencing the reference list by ID.",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "id": {
+                                            "type": "integer",
+                                            "description": "The ID of the source being cited, corresponding to the references list."
+                                        }
+                                    },
+                                    "required": [
+                                        "id"
+                                    ],
+                                    "additionalProperties": False
+                                }
+                            }
+                        },
+                        "required": [
+                            "type",
+                            "content",
+                            "citations"
+                        ],
+                        "additionalProperties": False
+                    }
+                },
+                "references": {
+                    "type": "array",
+                    "description": "The list of sources used in citations throughout this section.",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {
+                                "type": "integer",
+                                "description": "A unique identifier for the citation, used in the citations array."
+                            },
+                            "title": {
+                                "type": "string",
+                                "description": "The title of the article or source."
+                            },
+                            "url": {
+                                "type": "string",
+                                "description": "The full URL of the source."
+                            },
+                            "author": {
+                                "type": "string",
+                                "description": "The name of the author or creator of the source."
+                            },
+                            "publisher": {
+                                "type": "string",
+                                "description": "The publisher or platform where the source was published."
+                            },
+                            "date": {
+                                "type": "string",
+                                "description": "The date the source was published in YYYY-MM-DD format."
+                            }
+                        },
+                        "required": [
+                            "id",
+                            "title",
+                            "url",
+                            "author",
+                            "publisher",
+                            "date"
+                        ],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": [
+                "blocks",
+                "references"
+            ],
+            "additionalProperties": False
+        }
+    }
+}
+
+PROMPTS: Dict[str, Prompt] = {prompt.name: prompt for prompt in (
+    # Named entity recognition (routers/ner.py)
+    Prompt("ner", "pmpt_687e9a02edfc8193ab9fcc4cd3508f5c0fba5ac419ccbf53", "9"),
+    # Entity research and notability evaluation (routers/notability.py)
+    Prompt("research", "pmpt_687eaf8edda88194b8f2c14fa48e3a45059695391023684d", "10"),
+    Prompt("notability", "pmpt_687ec395081c81969578b916f2d6a6d609eb423f8db71c55", "5"),
+    # Draft research sections (routers/drafts.py)
+    Prompt("research_early_life", "pmpt_6881597633e08193a2ea8b886f8aa8990e7ece07212aea25", "10"),
+    Prompt("research_pre_vc_career", "pmpt_68816c05988c8193856a632187c8fe4d08d13066f2175710", "6"),
+    Prompt("research_vc_career", "pmpt_68816c254784819792b04926ab25312c0ae69cb869929a41", "6"),
+    Prompt("research_notable_investments", "pmpt_68816c4c78fc8190858a214948b257940b4a7c7d059861df", "6"),
+    Prompt("research_personal_life", "pmpt_68816c6a82a8819687e1eeda14f1a9480ae9ac0c76914685", "6"),
+    # Article drafting from the research sections
+    Prompt("article_draft", "pmpt_688182dcd80081939d8bef19645b0a4d0ed9043fd95e9430", "5"),
+    # Encyclopedia sections written by draft_document
+    Prompt("section_generic", "pmpt_6883c4dcfe5c819387acad8910d66c340a50e18e12e625a6", "6", {
+        "input": [],
+        "text": ENCYCLOPEDIA_SECTION_FORMAT,
+        "reasoning": {},
+        "max_output_tokens": 5000,
+        "store": True
+    }),
+    Prompt("section_notable_investments", "pmpt_6883c4eb15f481949785358f13d37243075c7030141d46f3", "7"),
+    Prompt("section_personal_life", "pmpt_688555fe690c8190a80f494f1960150606270da2f1dfcb3f", "2"),
+    Prompt("section_person_infobox", "pmpt_6883c991fe888196a6ae9fc79bbd07880738447170486610", "3"),
+    Prompt("section_lead", "pmpt_68842015293c819483d326d4693478e10e0fc773bb2e0e5d", "3"),
+)}
+
+_PROMPT_NAMES_BY_ID = {prompt.id: prompt.name for prompt in PROMPTS.values()}
+
+def get_prompt(name: str) -> Prompt:
+    """A registered prompt by name"""
+    try:
+        return PROMPTS[name]
+    except KeyError:
+        raise KeyError(f"Unknown prompt: {name}") from None
+
+# Errors worth retrying - everything else (bad request, auth, ...) fails the same way every time
+RETRYABLE_OPENAI_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+# Connection errors raised before the request was sent - the only ones a non-idempotent call can retry
+UNSENT_REQUEST_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+def is_retryable(error: Exception, idempotent: bool = True) -> bool:
+    """Whether a failed call may be sent again.
+
+    A rate limit means OpenAI turned the request down. A server error (a 5xx from a gateway can
+    arrive after the job was accepted), timeout or dropped connection may not have, so a
+    non-idempotent call (responses.create, which would start a second billed job) is only retried
+    on a rate limit or if it never left the process.
+    """
+    if not isinstance(error, RETRYABLE_OPENAI_ERRORS):
+        return False
+    if idempotent or isinstance(error, openai.RateLimitError):
+        return True
+    # The SDK raises its connection errors from the underlying httpx exception
+    return isinstance(error, openai.APIConnectionError) and isinstance(error.__cause__, UNSENT_REQUEST_ERRORS)
+
+def _retry_delay(error: Exception, attempt: int, attempts: int, backoff_seconds: float) -> float:
+    delay = backoff_seconds * (2 ** attempt) * random.uniform(0.5, 1.5)
+    logger.warning("OpenAI call failed (%s), retrying in %.1fs (attempt %d/%d)", type(error).__name__, delay, attempt + 2, attempts)
+    return delay
+
+async def with_retries(make_call: Callable[[], Awaitable[Any]], attempts: int = OPENAI_RETRY_ATTEMPTS,
+                       backoff_seconds: float = OPENAI_RETRY_BACKOFF_SECONDS, idempotent: bool = True) -> Any:
+    """Await make_call(), retrying transient OpenAI errors with jittered exponential backoff.
+
+    Pass idempotent=False for calls that must not run twice (see is_retryable).
+    """
+    for attempt in range(attempts):
+        try:
+            return await make_call()
+        except RETRYABLE_OPENAI_ERRORS as e:
+            if attempt == attempts - 1 or not is_retryable(e, idempotent):
+                raise
+            await asyncio.sleep(_retry_delay(e, attempt, attempts, backoff_seconds))
+
+def with_retries_sync(make_call: Callable[[], Any], attempts: int = OPENAI_RETRY_ATTEMPTS,
+                      backoff_seconds: float = OPENAI_RETRY_BACKOFF_SECONDS, idempotent: bool = True) -> Any:
+    """Blocking version of with_retries, for the threadpool handlers"""
+    for attempt in range(attempts):
+        try:
+            return make_call()
+        except RETRYABLE_OPENAI_ERRORS as e:
+            if attempt == attempts - 1 or not is_retryable(e, idempotent):
+                raise
+            time.sleep(_retry_delay(e, attempt, attempts, backoff_seconds))
+
+# Calls
+
+def prompt_for_response(response) -> Optional[Prompt]:
+    """The registered prompt (at the version actually used) that produced a response, if known"""
+    prompt = getattr(response, 'prompt', None)
+    prompt_id = getattr(prompt, 'id', None)
+    if prompt_id is None:
+        return None
+    return Prompt(_PROMPT_NAMES_BY_ID.get(prompt_id, "unknown"), prompt_id, str(getattr(prompt, 'version', None) or ""))
+
+def _record_call(operation: str, prompt: Optional[Prompt], started: float, response=None, error: Exception = None):
+    if prompt is None and response is not None:
+        # Retrieves and cancels only know the response ID until the response comes back
+        prompt = prompt_for_response(response)
+    labels = {"prompt": prompt.name, "prompt_id": prompt.id, "version": prompt.version} if prompt else \
+        {"prompt": "unknown", "prompt_id": "", "version": ""}
+    metrics.OPENAI_REQUEST_DURATION.observe(time.perf_counter() - started, operation=operation, **labels)
+    if error is not None:
+        metrics.OPENAI_ERRORS.inc(operation=operation, error=type(error).__name__, **labels)
+    elif getattr(response, 'status', None) == "completed":
+        metrics.record_openai_usage(response, **labels)
+
+def _call(operation: str, prompt: Optional[Prompt], make_call: Callable[[], Any]) -> Any:
+    """One blocking OpenAI call with retries, each attempt recorded in the metrics"""
+    def attempt():
+        started = time.perf_counter()
+        try:
+            response = make_call()
+        except Exception as e:
+            _record_call(operation, prompt, started, error=e)
+            raise
+        _record_call(operation, prompt, started, response=response)
+        return response
+    # Creating a response isn't idempotent - re-sending one that was accepted starts a second job
+    return with_retries_sync(attempt, idempotent=operation != "create")
+
+async def _acall(operation: str, prompt: Optional[Prompt], make_call: Callable[[], Awaitable[Any]]) -> Any:
+    """Async version of _call"""
+    async def attempt():
+        started = time.perf_counter()
+        try:
+            response = await make_call()
+        except Exception as e:
+            _record_call(operation, prompt, started, error=e)
+            raise
+        _record_call(operation, prompt, started, response=response)
+        return response
+    return await with_retries(attempt, idempotent=operation != "create")
+
+def create(client: openai.OpenAI, name: str, variables: Dict[str, Any], **kwargs) -> Any:
+    """Run a registered prompt with the sync client - kwargs are passed on to responses.create()"""
+    prompt = get_prompt(name)
+    return _call("create", prompt, lambda: client.responses.create(
+        prompt=prompt.payload(variables), **{**prompt.options, **kwargs}
+    ))
+
+async def acreate(client: openai.AsyncOpenAI, name: str, variables: Dict[str, Any], **kwargs) -> Any:
+    """Run a registered prompt with the async client - kwargs are passed on to responses.create()"""
+    prompt = get_prompt(name)
+    return await _acall("create", prompt, lambda: client.responses.create(
+        prompt=prompt.payload(variables), **{**prompt.options, **kwargs}
+    ))
+
+def retrieve(client: openai.OpenAI, response_id: str) -> Any:
+    """Fetch a (background) response with the sync client"""
+    return _call("retrieve", None, lambda: client.responses.retrieve(response_id))
+
+async def aretrieve(client: openai.AsyncOpenAI, response_id: str) -> Any:
+    """Fetch a (background) response with the async client"""
+    return await _acall("retrieve", None, lambda: client.responses.retrieve(response_id))
+
+def cancel(client: openai.OpenAI, response_id: str) -> Any:
+    """Cancel a background response with the sync client"""
+    return _call("cancel", None, lambda: client.responses.cancel(response_id))
+
+async def acancel(client: openai.AsyncOpenAI, response_id: str) -> Any:
+    """Cancel a background response with the async client"""
+    return await _acall("cancel", None, lambda: client.responses.cancel(response_id))
+
+# Extraction
+
+def response_text(response) -> Optional[str]:
+    """Text of the last output item that has any - the final message, after reasoning/tool items"""
+    for item in reversed(getattr(response, 'output', None) or []):
+        for content_item in getattr(item, 'content', None) or []:
+            text = getattr(content_item, 'text', None)
+            if text:
+                return text
+    return None
+
+def response_json(response, default: Any = None) -> Any:
+    """The response text parsed as JSON, or `default` if there is no text.
+
+    Raises json.JSONDecodeError when the text isn't valid JSON.
+    """
+    text = response_text(response)
+    if text is None:
+        return default
+    return json.loads(text)
@@ -1,17 +1,24 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Dict, Optional, Literal, List, Any
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field
+from typing import Awaitable, Callable, Dict, Optional, Literal, List, Any, Tuple
 import json
 import os
 import asyncio
 import uuid
 from datetime import datetime
-import fcntl
-from contextlib import contextmanager
-from openai import OpenAI
+import openai
 
-from .notability import notability_store, notability_exists
-from .entities import entities_store, save_entities, load_entities
+from models import TIMEOUT_SECONDS, MAX_RETRIES
+from storage import open_store
+from openai_client import get_async_client
+import prompts
+import logs
+from serialization import MAX_PAGE_SIZE, parse_fields, query_response, record_response
+from .notability import notability_db
+from .entities import entities_db, entities_store, load_entities
+from .responses import index_response
+
+logger = logs.get_logger(__name__)
 
 router = APIRouter(
     prefix="/drafts",
@@ -19,28 +26,56 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-# Initialize OpenAI client
-client = OpenAI()
+# Shared async OpenAI client - handlers here are async, so blocking calls would stall the event loop
+client = get_async_client()
 
 # Store for drafts and articles
-drafts_store: Dict[str, dict] = {}
 drafts_file = "drafts.txt"
-articles_store: Dict[str, dict] = {}
+drafts_db = open_store(drafts_file, "# Article drafts KV store - ID -> {type, statuses, results}",
+                       indexes=('created_at', 'updated_at'), lazy=True)
+drafts_store: Dict[str, dict] = drafts_db.data
 articles_file = "articles.txt"
+articles_db = open_store(articles_file, "# Articles KV store - ID -> {status, text}",
+                         indexes=('status', 'created_at', 'updated_at'), lazy=True)
+articles_store: Dict[str, dict] = articles_db.data
+
+# Compact sidecar records kept in step with every draft/article save, so listings never parse
+# the research results or article sections
+draft_summaries_file = "draft_summaries.txt"
+draft_summaries_db = open_store(draft_summaries_file, "# Draft summaries - ID -> {type, sections, timestamps}",
+                                indexes=('type', 'updated_at'))
+draft_summaries_store: Dict[str, dict] = draft_summaries_db.data
+article_summaries_file = "article_summaries.txt"
+article_summaries_db = open_store(article_summaries_file, "# Article summaries - ID -> {status, sections, word counts, timestamps}",
+                                  indexes=('status', 'updated_at'))
+article_summaries_store: Dict[str, dict] = article_summaries_db.data
 
 EntityType = Literal["venture_capitalist", "startup_founder", "startup_company", "venture_firm"]
 
-# Prompt IDs and versions for different research sections
-PROMPT_IDS = {
-    "early_life": {"id": "pmpt_6881597633e08193a2ea8b886f8aa8990e7ece07212aea25", "version": "10"},
-    "pre_vc_career": {"id": "pmpt_68816c05988c8193856a632187c8fe4d08d13066f2175710", "version": "6"},
-    "vc_career": {"id": "pmpt_68816c254784819792b04926ab25312c0ae69cb869929a41", "version": "6"},
-    "notable_investments": {"id": "pmpt_68816c4c78fc8190858a214948b257940b4a7c7d059861df", "version": "6"},
-    "personal_life": {"id": "pmpt_68816c6a82a8819687e1eeda14f1a9480ae9ac0c76914685", "version": "6"}
+# Registered prompt (see prompts.py) for each research section
+RESEARCH_SECTION_PROMPTS = {
+    "early_life": "research_early_life",
+    "pre_vc_career": "research_pre_vc_career",
+    "vc_career": "research_vc_career",
+    "notable_investments": "research_notable_investments",
+    "personal_life": "research_personal_life"
 }
 
-# Article drafting prompt
-ARTICLE_DRAFT_PROMPT_ID = "pmpt_688182dcd80081939d8bef19645b0a4d0ed9043fd95e9430"
+# Maximum number of encyclopedia section prompts draft_document runs at the same time
+DRAFT_SECTION_CONCURRENCY = int(os.getenv('DRAFT_SECTION_CONCURRENCY', '5'))
+
+# Maximum number of concurrent job lookups per progress check, and how long each may take
+DRAFT_POLL_CONCURRENCY = int(os.getenv('DRAFT_POLL_CONCURRENCY', '5'))
+DRAFT_POLL_TIMEOUT_SECONDS = float(os.getenv('DRAFT_POLL_TIMEOUT_SECONDS', '10'))
+
+# Seconds a research section job may stay pending before it is cancelled and marked timed_out - by
+# default the time research gets (TIMEOUT_SECONDS per attempt, MAX_RETRIES retries)
+DRAFT_SECTION_TIMEOUT_SECONDS = float(os.getenv('DRAFT_SECTION_TIMEOUT_SECONDS', str(TIMEOUT_SECONDS * (MAX_RETRIES + 1))))
+
+# Section job states that will never produce a result: the response's own final statuses, plus
+# missing (OpenAI no longer has it), invalid (its output isn't JSON), not_submitted (the job was
+# never created - a local fallback ID) and timed_out (past DRAFT_SECTION_TIMEOUT_SECONDS)
+FAILED_SECTION_STATES = ("failed", "cancelled", "expired", "incomplete", "missing", "invalid", "not_submitted", "timed_out")
 
 class CreateDraftRequest(BaseModel):
     id: str
@@ -51,6 +86,7 @@ class DraftStatus(BaseModel):
     type: EntityType
     statuses: Dict[str, Optional[str]]
     results: Dict[str, Optional[Any]]
+    failed_sections: Dict[str, str] = Field(default_factory=dict, description="Research section -> final state of a job that produced no result")
     created_at: str
     updated_at: str
 
@@ -59,6 +95,7 @@ class DraftProgressResponse(BaseModel):
     total_sections: int
     completed_sections: int
     pending_sections: int
+    failed_sections: Dict[str, str] = Field(default_factory=dict, description="Research section -> final state of a job that produced no result")
     progress_percentage: float
     updated_sections: List[str]
     is_complete: bool
@@ -78,70 +115,121 @@ class ArticleStatus(BaseModel):
     created_at: str
     updated_at: str
 
+class DraftSummary(BaseModel):
+    id: str
+    type: EntityType
+    sections: Dict[str, bool] = Field(..., description="Research section -> whether its result has arrived")
+    completed_sections: int
+    failed_sections: int = Field(0, description="Sections whose job ended without a result")
+    total_sections: int
+    created_at: str
+    updated_at: str
+
+class ArticleSummary(BaseModel):
+    id: str
+    status: Literal["drafting", "drafted", "published"]
+    sections: List[str] = Field(..., description="Names of the article's sections")
+    word_counts: Dict[str, int] = Field(..., description="Section name -> words in its text blocks")
+    total_words: int
+    created_at: str
+    updated_at: str
+
 class UpdateArticleRequest(BaseModel):
     status: Optional[Literal["drafting", "drafted", "published"]] = None
     sections: Optional[Dict[str, Any]] = None
 
-@contextmanager
-def file_lock(filename, mode='r'):
-    """Context manager for file locking to prevent concurrent writes"""
-    f = open(filename, mode)
-    try:
-        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
-        yield f
-    finally:
-        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-        f.close()
-
 def load_drafts():
     """Load drafts from file into memory"""
-    global drafts_store
-    if os.path.exists(drafts_file):
-        with file_lock(drafts_file, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#'):
-                    try:
-                        data = json.loads(line)
-                        if 'id' in data:
-                            drafts_store[data['id']] = data
-                    except json.JSONDecodeError:
-                        continue
-
-def save_drafts():
-    """Save all drafts to file with file locking"""
-    with file_lock(drafts_file, 'w') as f:
-        f.write("# Article drafts KV store - ID -> {type, statuses, results}\n")
-        for draft in drafts_store.values():
-            f.write(json.dumps(draft) + '\n')
+    drafts_db.load()
+
+def save_drafts(*draft_ids):
+    """Save drafts to file - only the given IDs when passed, otherwise every draft"""
+    drafts_db.save(*draft_ids)
+    update_summaries(drafts_store, draft_summaries_db, summarize_draft, draft_ids)
 
 def load_articles():
     """Load articles from file into memory"""
-    global articles_store
-    if os.path.exists(articles_file):
-        with file_lock(articles_file, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#'):
-                    try:
-                        data = json.loads(line)
-                        if 'id' in data:
-                            articles_store[data['id']] = data
-                    except json.JSONDecodeError:
-                        continue
-
-def save_articles():
-    """Save all articles to file with file locking"""
-    with file_lock(articles_file, 'w') as f:
-        f.write("# Articles KV store - ID -> {status, text}\n")
-        for article in articles_store.values():
-            f.write(json.dumps(article) + '\n')
+    articles_db.load()
+
+def save_articles(*article_ids):
+    """Save articles to file - only the given IDs when passed, otherwise every article"""
+    articles_db.save(*article_ids)
+    update_summaries(articles_store, article_summaries_db, summarize_article, article_ids)
+
+def summarize_draft(draft: dict) -> dict:
+    """Compact summary of a draft - which research sections are done, without the results"""
+    results = draft.get('results', {})
+    sections = {section_key.replace('_id', ''): results.get(section_key.replace('_id', '')) is not None
+                for section_key in draft.get('statuses', {})}
+    return {
+        'id': draft['id'],
+        'type': draft['type'],
+        'sections': sections,
+        'completed_sections': sum(sections.values()),
+        'failed_sections': len(draft.get('failed_sections') or {}),
+        'total_sections': len(sections),
+        'created_at': draft['created_at'],
+        'updated_at': draft['updated_at']
+    }
+
+def section_word_count(section: Any) -> int:
+    """Words in a section's text blocks (infobox-style sections have none)"""
+    if not isinstance(section, dict) or not isinstance(section.get('blocks'), list):
+        return 0
+    return sum(len(block['content'].split()) for block in section['blocks']
+               if isinstance(block, dict) and isinstance(block.get('content'), str))
+
+def summarize_article(article: dict) -> dict:
+    """Compact summary of an article - section names and sizes, without the section content"""
+    sections = article.get('sections') or {}
+    word_counts = {section_name: section_word_count(section) for section_name, section in sections.items()}
+    return {
+        'id': article['id'],
+        'status': article['status'],
+        'sections': list(sections.keys()),
+        'word_counts': word_counts,
+        'total_words': sum(word_counts.values()),
+        'created_at': article['created_at'],
+        'updated_at': article['updated_at']
+    }
+
+def update_summaries(records: Dict[str, dict], summaries_db, summarize: Callable[[dict], dict], record_ids=()):
+    """Rebuild the summaries of the given records (all when no IDs are passed) and save them"""
+    record_ids = list(record_ids) or list(records.keys())
+    for record_id in record_ids:
+        if record_id in records:
+            summaries_db.data[record_id] = summarize(records[record_id])
+        else:
+            summaries_db.data.pop(record_id, None)
+    summaries_db.save(*record_ids)
+
+def put_summary(summaries_db, summary: dict):
+    """Save one summary unless a newer one is already stored - two workers saving the same record can finish in either order"""
+    summaries_db.update(summary['id'], lambda current: summary
+                        if current is None or (current.get('updated_at') or '') <= (summary['updated_at'] or '') else None)
+
+def sync_summaries():
+    """Rebuild summaries that are missing or older than their draft/article (e.g. written before
+    summaries existed, or after a crash between the two saves) and drop summaries of removed ones.
+
+    Only each record's updated_at is read (in SQL with sqlite, without caching with lazy stores) and
+    compared with the timestamp stored in its summary, so records whose summary is current are never
+    summarized again.
+    """
+    draft_summaries_db.load()
+    article_summaries_db.load()
+    for records_db, summaries_db, summarize in ((drafts_db, draft_summaries_db, summarize_draft),
+                                                 (articles_db, article_summaries_db, summarize_article)):
+        timestamps = {record['id']: record.get('updated_at') for record in records_db.scan(fields=['updated_at'])}
+        stale_ids = [record_id for record_id, updated_at in timestamps.items()
+                     if summaries_db.data.get(record_id, {}).get('updated_at') != updated_at]
+        stale_ids += [record_id for record_id in list(summaries_db.data.keys()) if record_id not in timestamps]
+        if stale_ids:
+            update_summaries(records_db.data, summaries_db, summarize, stale_ids)
 
 def update_entity_status(entity_id: str, new_status: str):
-    """Update entity status and save to file"""
-    if entity_id in entities_store:
-        entities_store[entity_id]['status'] = new_status
-        save_entities()
+    """Update entity status on disk - a single-record write, a no-op if the entity doesn't exist"""
+    entities_db.patch(entity_id, {'status': new_status})
 
 def draft_exists(draft_id: str) -> bool:
     """Check if a draft exists"""
@@ -149,10 +237,8 @@ def draft_exists(draft_id: str) -> bool:
 
 def validate_notability(entity_id: str) -> bool:
     """Validate that entity exists in notability store with meets/exceeds status"""
-    if not notability_exists(entity_id):
-        return False
-    
-    notability_data = notability_store.get(entity_id)
+    # Latest version, including changes made by other workers
+    notability_data = notability_db.get(entity_id)
     if not notability_data:
         return False
     
@@ -197,34 +283,27 @@ def extract_pages_content(results: Dict[str, Any]) -> Dict[str, str]:
     
     return section_content
 
-async def call_openai_prompt(prompt_id: str, prompt_version: str, entity_name: str, entity_context: str, entity_type: str) -> Dict[str, Any]:
-    """Generic function to call OpenAI API with different prompts"""
-    try:
-        type_mapping = {
-            "venture_capitalist": "Venture Capitalist",
-            "startup_founder": "Startup Founder",
-            "startup_company": "Startup Company",
-            "venture_firm": "Venture Firm"
-        }
-        formatted_type = type_mapping.get(entity_type, entity_type)
-        
-        response = client.responses.create(
-            prompt={
-                "id": prompt_id,
-                "version": prompt_version,
-                "variables": {
-                    "entity": entity_name,
-                    "context": entity_context,
-                    "type": formatted_type
-                }
-            },
-            background=True
-        )
-        
-        return {"job_id": response.id, "status": "pending"}
-            
-    except Exception as e:
-        return {"pages": []}
+async def call_openai_prompt(prompt_name: str, entity_name: str, entity_context: str, entity_type: str) -> Dict[str, Any]:
+    """Generic function to call OpenAI API with different prompts - errors are raised to the caller"""
+    type_mapping = {
+        "venture_capitalist": "Venture Capitalist",
+        "startup_founder": "Startup Founder",
+        "startup_company": "Startup Company",
+        "venture_firm": "Venture Firm"
+    }
+    formatted_type = type_mapping.get(entity_type, entity_type)
+    
+    response = await prompts.acreate(
+        client, prompt_name,
+        {
+            "entity": entity_name,
+            "context": entity_context,
+            "type": formatted_type
+        },
+        background=True
+    )
+    
+    return {"job_id": response.id, "status": "pending"}
 
 async def create_vc_research_jobs(entity_id: str, entity_type: str) -> tuple[Dict[str, str], Dict[str, Any]]:
     """Create research jobs for venture capitalist sections"""
@@ -235,38 +314,27 @@ async def create_vc_research_jobs(entity_id: str, entity_type: str) -> tuple[Dic
     entity_name = entity_data.get('name', entity_id)
     entity_context = entity_data.get('context', '')
     
-    section_prompts = {
-        "early_life": (PROMPT_IDS["early_life"]["id"], PROMPT_IDS["early_life"]["version"]),
-        "pre_vc_career": (PROMPT_IDS["pre_vc_career"]["id"], PROMPT_IDS["pre_vc_career"]["version"]),
-        "vc_career": (PROMPT_IDS["vc_career"]["id"], PROMPT_IDS["vc_career"]["version"]),
-        "notable_investments": (PROMPT_IDS["notable_investments"]["id"], PROMPT_IDS["notable_investments"]["version"]),
-        "personal_life": (PROMPT_IDS["personal_life"]["id"], PROMPT_IDS["personal_life"]["version"])
-    }
+    # Submit every section job at once - a failure in one section doesn't affect the others
+    sections = list(RESEARCH_SECTION_PROMPTS.keys())
+    section_results = await asyncio.gather(
+        *(call_openai_prompt(RESEARCH_SECTION_PROMPTS[section], entity_name, entity_context, entity_type)
+          for section in sections),
+        return_exceptions=True
+    )
     
     job_ids = {}
     initial_results = {}
     
-    for section, prompt_info in section_prompts.items():
-        if prompt_info:
-            prompt_id, version = prompt_info
-            try:
-                result = await call_openai_prompt(prompt_id, version, entity_name, entity_context, entity_type)
-                openai_job_id = result.get("job_id")
-                if openai_job_id:
-                    job_ids[f"{section}_id"] = openai_job_id
-                    initial_results[section] = None
-                else:
-                    fallback_job_id = f"{entity_id}_{section}_{uuid.uuid4().hex[:8]}"
-                    job_ids[f"{section}_id"] = fallback_job_id
-                    initial_results[section] = result
-            except Exception as e:
-                fallback_job_id = f"{entity_id}_{section}_{uuid.uuid4().hex[:8]}"
-                job_ids[f"{section}_id"] = fallback_job_id
-                initial_results[section] = None
-        else:
-            job_id = f"{entity_id}_{section}_{uuid.uuid4().hex[:8]}"
-            job_ids[f"{section}_id"] = job_id
-            initial_results[section] = None
+    for section, result in zip(sections, section_results):
+        # No result either way - a section with a fallback ID is recorded as not_submitted on the first progress check
+        initial_results[section] = None
+        if isinstance(result, Exception):
+            logger.warning("Failed to create research job for section %s: %s", section, result)
+            job_ids[f"{section}_id"] = f"{entity_id}_{section}_{uuid.uuid4().hex[:8]}"
+            continue
+        
+        job_ids[f"{section}_id"] = result["job_id"]
+        index_response(result["job_id"], 'drafts', entity_id, 'draft', section=section)
     
     return job_ids, initial_results
 
@@ -300,91 +368,215 @@ async def create_article_draft(entity_id: str) -> str:
     formatted_type = type_mapping.get(entity_type, entity_type)
     
     # Call OpenAI to generate the article
-    response = client.responses.create(
-        prompt={
-            "id": ARTICLE_DRAFT_PROMPT_ID,
-            "version": "5",
-            "variables": {
-                "entity": entity_name,
-                "context": entity_context,
-                "type": formatted_type,
-                "elac": section_content.get("elac", ""),
-                "pvcr": section_content.get("pvcr", ""),
-                "vcc": section_content.get("vcc", ""),
-                "ni": section_content.get("ni", ""),
-                "pl": section_content.get("pl", "")
-            }
+    response = await prompts.acreate(
+        client, "article_draft",
+        {
+            "entity": entity_name,
+            "context": entity_context,
+            "type": formatted_type,
+            "elac": section_content.get("elac", ""),
+            "pvcr": section_content.get("pvcr", ""),
+            "vcc": section_content.get("vcc", ""),
+            "ni": section_content.get("ni", ""),
+            "pl": section_content.get("pl", "")
         }
     )
     
-    # Extract the JSON response containing markdown blocks
-    if response.output and len(response.output) > 0:
-        last_output = response.output[-1]
-        if hasattr(last_output, 'content') and last_output.content:
-            json_text = last_output.content[0].text
-            # Return the JSON string (client will parse the markdown blocks)
-            return json_text
+    # Return the JSON string containing markdown blocks (client will parse them)
+    return prompts.response_text(response) or ""
+
+async def check_background_task_status(job_id: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Look up a background task, returning its state and, once completed, its result.
+
+    The state is the response status, "missing" when OpenAI no longer has the response, "invalid"
+    when its output isn't JSON, or "unknown" when the lookup itself failed (treated as pending).
+    """
+    try:
+        response = await prompts.aretrieve(client, job_id)
+    except openai.NotFoundError:
+        return "missing", None
+    except Exception as e:
+        logger.warning("Looking up background task %s failed: %s", job_id, e)
+        return "unknown", None
     
-    return ""
+    if response.status != "completed":
+        return response.status, None
+    try:
+        # The last message in the output holds the JSON result
+        return "completed", prompts.response_json(response, default={"pages": []})
+    except json.JSONDecodeError as e:
+        logger.warning("Background task %s returned invalid JSON: %s", job_id, e)
+        return "invalid", None
+
+async def cancel_background_task(job_id: str):
+    """Cancel a background task that ran past its deadline - best effort, it is marked timed_out either way"""
+    try:
+        await prompts.acancel(client, job_id)
+    except Exception as e:
+        logger.warning("Cancelling background task %s failed: %s", job_id, e)
 
-async def check_background_task_status(job_id: str) -> Optional[Dict[str, Any]]:
-    """Check if a background task has completed and return its result"""
+def extract_section_data(response, section_key: str) -> Dict[str, Any]:
+    """Parse the JSON section from the last output message, falling back to an empty section"""
+    empty_section = {"blocks": [], "references": []}
     try:
-        response = client.responses.retrieve(job_id)
-        
-        if response.status == "completed":
-            # Get the last item in the output array (the actual message response)
-            if response.output and len(response.output) > 0:
-                last_output = response.output[-1]
-                if hasattr(last_output, 'content') and last_output.content:
-                    text_content = last_output.content[0].text
-                    return json.loads(text_content)
-            return {"pages": []}
-        else:
+        return prompts.response_json(response, default=empty_section)
+    except json.JSONDecodeError as e:
+        logger.warning("Error parsing response for section %s: %s", section_key, e)
+        return empty_section
+
+async def run_section_jobs(
+    section_jobs: Dict[str, Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]],
+    section_dependencies: Dict[str, List[str]],
+    max_concurrency: int
+) -> Dict[str, Any]:
+    """Run section jobs concurrently, starting each one as soon as the sections it depends on are done.
+
+    Every job receives the sections completed so far. At most max_concurrency jobs run at once, and
+    the results keep the order of section_jobs.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    sections_data: Dict[str, Any] = {}
+    tasks: Dict[str, asyncio.Task] = {}
+    
+    async def run_job(section_key: str):
+        for dependency in section_dependencies.get(section_key, []):
+            await tasks[dependency]
+        async with semaphore:
+            sections_data[section_key] = await section_jobs[section_key](sections_data)
+    
+    # All tasks exist before any of them runs, so dependencies can always be looked up
+    for section_key in section_jobs:
+        tasks[section_key] = asyncio.ensure_future(run_job(section_key))
+    
+    try:
+        await asyncio.gather(*tasks.values())
+    except Exception:
+        for task in tasks.values():
+            task.cancel()
+        raise
+    
+    return {section_key: sections_data[section_key] for section_key in section_jobs}
+
+def record_draft_progress(draft_id: str, results: Dict[str, Any], failed_sections: Dict[str, str],
+                          section_names: List[str]) -> Tuple[Optional[dict], List[str]]:
+    """Merge newly completed and failed sections into the latest version of a draft.
+
+    Sections another worker recorded in the meantime are kept as they are. Returns the stored
+    draft and the sections this call recorded.
+    """
+    recorded = []
+    
+    def merge(current: Optional[dict]) -> Optional[dict]:
+        recorded.clear()
+        if current is None:
             return None
-            
-    except Exception as e:
-        return None
+        merged_results = dict(current.get('results') or {})
+        merged_failed = dict(current.get('failed_sections') or {})
+        for section_name in section_names:
+            if merged_results.get(section_name) is not None or section_name in merged_failed:
+                continue
+            if section_name in failed_sections:
+                merged_failed[section_name] = failed_sections[section_name]
+            else:
+                merged_results[section_name] = results[section_name]
+            recorded.append(section_name)
+        if not recorded:
+            return None
+        return {**current, 'results': merged_results, 'failed_sections': merged_failed,
+                'updated_at': datetime.utcnow().isoformat()}
+    
+    draft = drafts_db.update(draft_id, merge)
+    if recorded:
+        put_summary(draft_summaries_db, summarize_draft(draft))
+    return draft, list(recorded)
 
 async def update_draft_progress(draft_id: str) -> DraftProgressResponse:
-    """Check all background tasks for a draft and update completed results"""
+    """Check all background tasks for a draft and record completed results and failed jobs.
+
+    A section whose job can never produce a result - it failed, was cancelled or deleted at OpenAI,
+    was never submitted, or is still pending DRAFT_SECTION_TIMEOUT_SECONDS after the draft was
+    created - is recorded in failed_sections and not polled again.
+    """
+    # Called from the poller and webhooks too, so don't rely on the caller having reloaded
+    load_drafts()
     if not draft_exists(draft_id):
         raise HTTPException(status_code=404, detail="Draft not found")
     
     draft_data = drafts_store[draft_id]
     statuses = draft_data.get('statuses', {})
-    results = draft_data.get('results', {})
+    results = dict(draft_data.get('results') or {})
+    failed_sections = dict(draft_data.get('failed_sections') or {})
     
     updated_sections = []
     total_sections = len(statuses)
     
-    # Check each background task
+    # Check every outstanding background task concurrently
+    outstanding = []
     for section_key, job_id in statuses.items():
         section_name = section_key.replace('_id', '')
+        if results.get(section_name) is not None or section_name in failed_sections:
+            continue
         
-        if job_id and results.get(section_name) is None:
-            task_result = await check_background_task_status(job_id)
-            if task_result is not None:
-                results[section_name] = task_result
-                updated_sections.append(section_name)
+        if job_id and job_id.startswith('resp_'):
+            outstanding.append((section_name, job_id))
+        else:
+            # The job couldn't be created (a local fallback ID), so there is nothing to poll
+            failed_sections[section_name] = 'not_submitted'
+            updated_sections.append(section_name)
+    
+    semaphore = asyncio.Semaphore(DRAFT_POLL_CONCURRENCY)
+    
+    async def poll_job(job_id: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(check_background_task_status(job_id), timeout=DRAFT_POLL_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                # Treat a slow lookup like a pending job - the next check will pick it up
+                return "unknown", None
+    
+    task_results = await asyncio.gather(*(poll_job(job_id) for _, job_id in outstanding))
+    
+    # Every section job is submitted when the draft is created
+    past_deadline = (datetime.utcnow() - datetime.fromisoformat(draft_data['created_at'])).total_seconds() \
+        > DRAFT_SECTION_TIMEOUT_SECONDS
+    timed_out_jobs = []
+    for (section_name, job_id), (state, task_result) in zip(outstanding, task_results):
+        if state == "completed":
+            results[section_name] = task_result
+        elif state in FAILED_SECTION_STATES:
+            failed_sections[section_name] = state
+        elif past_deadline:
+            failed_sections[section_name] = 'timed_out'
+            timed_out_jobs.append(job_id)
+        else:
+            continue
+        updated_sections.append(section_name)
+    
+    if timed_out_jobs:
+        logger.warning("Draft research sections timed out after %ds", DRAFT_SECTION_TIMEOUT_SECONDS)
+        await asyncio.gather(*(cancel_background_task(job_id) for job_id in timed_out_jobs))
+    
+    # Record the updated sections in a single-record write, reporting only the ones no other worker recorded first
+    if updated_sections:
+        stored, updated_sections = await asyncio.to_thread(
+            record_draft_progress, draft_id, results, failed_sections, updated_sections
+        )
+        if stored is not None:
+            results = stored.get('results') or {}
+            failed_sections = stored.get('failed_sections') or {}
     
     # Count completed sections
     completed_sections = sum(1 for result in results.values() if result is not None)
-    pending_sections = total_sections - completed_sections
+    pending_sections = total_sections - completed_sections - len(failed_sections)
     progress_percentage = (completed_sections / total_sections) * 100 if total_sections > 0 else 0
     is_complete = completed_sections == total_sections
     
-    # Update the draft if any sections were updated
-    if updated_sections:
-        draft_data['results'] = results
-        draft_data['updated_at'] = datetime.utcnow().isoformat()
-        save_drafts()
-    
     return DraftProgressResponse(
         id=draft_id,
         total_sections=total_sections,
         completed_sections=completed_sections,
         pending_sections=pending_sections,
+        failed_sections=failed_sections,
         progress_percentage=progress_percentage,
         updated_sections=updated_sections,
         is_complete=is_complete
@@ -393,6 +585,7 @@ async def update_draft_progress(draft_id: str) -> DraftProgressResponse:
 @router.post("/", response_model=DraftStatus)
 async def create_draft(request: CreateDraftRequest):
     """Create a new draft if entity meets notability requirements"""
+    logs.bind(entity_id=request.id)
     load_entities()
     load_drafts()
     
@@ -437,11 +630,26 @@ async def create_draft(request: CreateDraftRequest):
     }
     
     drafts_store[request.id] = draft_data
-    save_drafts()
+    save_drafts(request.id)
     update_entity_status(request.id, 'drafting_sections')
     
     return DraftStatus(**draft_data)
 
+@router.get("/summaries", response_model=list[DraftSummary])
+async def list_draft_summaries(request: Request, response: Response, type: Optional[EntityType] = None,
+                               updated_since: Optional[str] = None,
+                               limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), after: Optional[str] = None):
+    """List draft summaries (section completion and timestamps) without loading the research results.
+    
+    Takes the same filters and pagination as GET /drafts/.
+    """
+    return query_response(
+        request, response, draft_summaries_db, DraftSummary,
+        criteria={'type': type} if type else None,
+        since=('updated_at', updated_since) if updated_since else None,
+        after=after, limit=limit
+    )
+
 @router.get("/{draft_id}", response_model=DraftStatus)
 async def get_draft(draft_id: str):
     """Get a specific draft by ID"""
@@ -451,19 +659,30 @@ async def get_draft(draft_id: str):
     if not draft_exists(draft_id):
         raise HTTPException(status_code=404, detail="Draft not found")
     
-    return DraftStatus(**drafts_store[draft_id])
+    return record_response(drafts_store[draft_id], DraftStatus)
 
 @router.get("/", response_model=list[DraftStatus])
-async def list_drafts():
-    """List all drafts"""
-    # Reload data to ensure we have the latest state
-    load_drafts()
-    
-    return [DraftStatus(**draft) for draft in drafts_store.values()]
+async def list_drafts(request: Request, response: Response, type: Optional[EntityType] = None,
+                      updated_since: Optional[str] = None, limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+                      after: Optional[str] = None, fields: Optional[str] = None):
+    """List drafts in ID order, optionally filtered by entity type and last update (ISO timestamp).
+    
+    Pass `limit` to page through them - the next page's `after` cursor is in the X-Next-Cursor header.
+    `fields` (comma separated, e.g. id,updated_at) skips the large `results` unless asked for.
+    Streamed with Accept: application/x-ndjson.
+    """
+    projection = parse_fields(fields, DraftStatus)
+    return query_response(
+        request, response, drafts_db, DraftStatus,
+        criteria={'type': type} if type else None,
+        since=('updated_at', updated_since) if updated_since else None,
+        after=after, limit=limit, fields=projection
+    )
 
 @router.get("/{draft_id}/check-progress", response_model=DraftProgressResponse)
 async def check_draft_progress(draft_id: str):
     """Check progress of background tasks for a draft and update any completed results"""
+    logs.bind(entity_id=draft_id)
     load_entities()
     load_drafts()
     return await update_draft_progress(draft_id)
@@ -471,6 +690,7 @@ async def check_draft_progress(draft_id: str):
 @router.post("/{draft_id}/draft-document", response_model=ArticleStatus)
 async def draft_document(draft_id: str):
     """Draft encyclopedia sections from completed research data"""
+    logs.bind(entity_id=draft_id)
     load_entities()
     load_drafts()
     load_articles()
@@ -496,13 +716,6 @@ async def draft_document(draft_id: str):
     timestamp = datetime.utcnow().isoformat()
     
     try:
-        # Section mapping for the API calls (personal_life handled separately)
-        section_mapping = {
-            "early_life": "Early Life",
-            "career": "Career", 
-            "notable_investments": "Notable Investments"
-        }
-        
         entity_name = entity_data.get('name', draft_id)
         entity_context = entity_data.get('context', '')
         
@@ -524,271 +737,95 @@ async def draft_document(draft_id: str):
         all_research_pages = get_all_research_pages()
         all_pages_str = json.dumps(all_research_pages)
         
-        # Process each section serially
-        sections_data = {}
+        # Each section job is drafted from ALL pages from ALL research tasks
+        async def draft_generic_section(section_key: str, section_name: str) -> Dict[str, Any]:
+            # Call generic encyclopedia section endpoint
+            response = await prompts.acreate(
+                client, "section_generic",
+                {
+                    "entity": entity_name,
+                    "context": entity_context,
+                    "type": "Venture Capitalist",
+                    "section": section_name,
+                    "sources": all_pages_str
+                }
+            )
+            return extract_section_data(response, section_key)
         
-        for section_key, section_name in section_mapping.items():
-            # ALL sections get ALL pages from ALL research tasks
-            pages_str = all_pages_str
-            
-            # Use different endpoint for notable_investments
-            if section_key == "notable_investments":
-                # Call special notable investments endpoint
-                response = client.responses.create(
-                    prompt={
-                        "id": "pmpt_6883c4eb15f481949785358f13d37243075c7030141d46f3",
-                        "version": "7",
-                        "variables": {
-                            "entity": entity_name,
-                            "context": entity_context,
-                            "type": "Venture Capitalist",
-                            "sources": pages_str
-                        }
-                    }
-                )
-            else:
-                # Call generic encyclopedia section endpoint
-                response = client.responses.create(
-                    prompt={
-                        "id": "pmpt_6883c4dcfe5c819387acad8910d66c340a50e18e12e625a6",
-                        "version": "6",
-                        "variables": {
-                            "entity": entity_name,
-                            "context": entity_context,
-                            "type": "Venture Capitalist",
-                            "section": section_name,
-                            "sources": pages_str
-                        }
-                    },
-                    input=[],
-                    text={
-                        "format": {
-                            "type": "json_schema",
-                            "name": "encyclopedia_section_blocks",
-                            "strict": True,
-                            "schema": {
-                                "type": "object",
-                                "properties": {
-                                    "blocks": {
-                                        "type": "array",
-                                        "description": "A list of content blocks that make up the encyclopedia section. These can be headings, subheadings, paragraphs, etc.",
-                                        "items": {
-                                            "type": "object",
-                                            "properties": {
-                                                "type": {
-                                                    "type": "string",
-                                                    "enum": [
-                                                        "heading",
-                                                        "subheading",
-                                                        "paragraph",
-                                                        "quote",
-                                                        "list"
-                                                    ],
-                                                    "description": "The type of content block. Determines how the block is rendered."
-                                                },
-                                                "content": {
-                                                    "type": "string",
-                                                    "description": "The textual content of the block."
-                                                },
-                                                "citations": {
-                                                    "type": "array",
-                                                    "description": "Optional in-line citations within this block, referencing the reference list by ID.",
-                                                    "items": {
-                                                        "type": "object",
-                                                        "properties": {
-                                                            "id": {
-                                                                "type": "integer",
-                                                                "description": "The ID of the source being cited, corresponding to the references list."
-                                                            }
-                                                        },
-                                                        "required": [
-                                                            "id"
-                                                        ],
-                                                        "additionalProperties": False
-                                                    }
-                                                }
-                                            },
-                                            "required": [
-                                                "type",
-                                                "content",
-                                                "citations"
-                                            ],
-                                            "additionalProperties": False
-                                        }
-                                    },
-                                    "references": {
-                                        "type": "array",
-                                        "description": "The list of sources used in citations throughout this section.",
-                                        "items": {
-                                            "type": "object",
-                                            "properties": {
-                                                "id": {
-                                                    "type": "integer",
-                                                    "description": "A unique identifier for the citation, used in the citations array."
-                                                },
-                                                "title": {
-                                                    "type": "string",
-                                                    "description": "The title of the article or source."
-                                                },
-                                                "url": {
-                                                    "type": "string",
-                                                    "description": "The full URL of the source."
-                                                },
-                                                "author": {
-                                                    "type": "string",
-                                                    "description": "The name of the author or creator of the source."
-                                                },
-                                                "publisher": {
-                                                    "type": "string",
-                                                    "description": "The publisher or platform where the source was published."
-                                                },
-                                                "date": {
-                                                    "type": "string",
-                                                    "description": "The date the source was published in YYYY-MM-DD format."
-                                                }
-                                            },
-                                            "required": [
-                                                "id",
-                                                "title",
-                                                "url",
-                                                "author",
-                                                "publisher",
-                                                "date"
-                                            ],
-                                            "additionalProperties": False
-                                        }
-                                    }
-                                },
-                                "required": [
-                                    "blocks",
-                                    "references"
-                                ],
-                                "additionalProperties": False
-                            }
-                        }
-                    },
-                    reasoning={},
-                    max_output_tokens=5000,
-                    store=True
-                )
-            
-            # Extract the response content
-            if response.output and len(response.output) > 0:
-                last_output = response.output[-1]
-                if hasattr(last_output, 'content') and last_output.content:
-                    content_text = last_output.content[0].text
-                    try:
-                        section_data = json.loads(content_text)
-                        sections_data[section_key] = section_data
-                    except json.JSONDecodeError as e:
-                        print(f"Error parsing response for section {section_key}: {e}")
-                        sections_data[section_key] = {"blocks": [], "references": []}
-                else:
-                    sections_data[section_key] = {"blocks": [], "references": []}
-            else:
-                sections_data[section_key] = {"blocks": [], "references": []}
+        async def draft_notable_investments(sections_data: Dict[str, Any]) -> Dict[str, Any]:
+            # Call special notable investments endpoint
+            response = await prompts.acreate(
+                client, "section_notable_investments",
+                {
+                    "entity": entity_name,
+                    "context": entity_context,
+                    "type": "Venture Capitalist",
+                    "sources": all_pages_str
+                }
+            )
+            return extract_section_data(response, "notable_investments")
         
-        # Handle personal life section separately to avoid repetition with early life
-        # Extract early life content to pass to personal life prompt
-        early_life_content = ""
-        if "early_life" in sections_data:
-            early_life_blocks = sections_data["early_life"].get("blocks", [])
-            for block in early_life_blocks:
+        async def draft_personal_life(sections_data: Dict[str, Any]) -> Dict[str, Any]:
+            # Extract early life content to pass to personal life prompt
+            early_life_content = ""
+            for block in sections_data["early_life"].get("blocks", []):
                 if "content" in block:
                     early_life_content += block["content"] + "\n\n"
-        
-        # Call personal life endpoint with early life content to avoid repetition
-        personal_life_response = client.responses.create(
-            prompt={
-                "id": "pmpt_688555fe690c8190a80f494f1960150606270da2f1dfcb3f",
-                "version": "2",
-                "variables": {
+            
+            # Call personal life endpoint with early life content to avoid repetition
+            response = await prompts.acreate(
+                client, "section_personal_life",
+                {
                     "entity": entity_name,
                     "context": entity_context,
                     "type": "Venture Capitalist",
                     "sources": all_pages_str,
                     "early_life": early_life_content
                 }
-            }
-        )
+            )
+            return extract_section_data(response, "personal_life")
         
-        # Extract the personal life response content
-        if personal_life_response.output and len(personal_life_response.output) > 0:
-            last_output = personal_life_response.output[-1]
-            if hasattr(last_output, 'content') and last_output.content:
-                content_text = last_output.content[0].text
-                try:
-                    personal_life_data = json.loads(content_text)
-                    sections_data['personal_life'] = personal_life_data
-                except json.JSONDecodeError as e:
-                    print(f"Error parsing personal life response: {e}")
-                    sections_data['personal_life'] = {"blocks": [], "references": []}
-            else:
-                sections_data['personal_life'] = {"blocks": [], "references": []}
-        else:
-            sections_data['personal_life'] = {"blocks": [], "references": []}
-        
-        # Now make the 6th call for person_infobox using ALL pages from all research tasks
-        # Call person infobox endpoint
-        person_infobox_response = client.responses.create(
-            prompt={
-                "id": "pmpt_6883c991fe888196a6ae9fc79bbd07880738447170486610",
-                "version": "3",
-                "variables": {
+        async def draft_person_infobox(sections_data: Dict[str, Any]) -> Dict[str, Any]:
+            # Call person infobox endpoint
+            response = await prompts.acreate(
+                client, "section_person_infobox",
+                {
                     "entity": entity_name,
                     "context": entity_context,
                     "type": "Venture Capitalist",
                     "sources": all_pages_str
                 }
-            }
-        )
+            )
+            return extract_section_data(response, "person_infobox")
         
-        # Extract the person infobox response content
-        if person_infobox_response.output and len(person_infobox_response.output) > 0:
-            last_output = person_infobox_response.output[-1]
-            if hasattr(last_output, 'content') and last_output.content:
-                content_text = last_output.content[0].text
-                try:
-                    person_infobox_data = json.loads(content_text)
-                    sections_data['person_infobox'] = person_infobox_data
-                except json.JSONDecodeError as e:
-                    print(f"Error parsing person infobox response: {e}")
-                    sections_data['person_infobox'] = {"blocks": [], "references": []}
-            else:
-                sections_data['person_infobox'] = {"blocks": [], "references": []}
-        else:
-            sections_data['person_infobox'] = {"blocks": [], "references": []}
-        
-        # Now make the lead section call using ALL pages from all 5 research tasks
-        # Call lead section endpoint
-        lead_response = client.responses.create(
-            prompt={
-                "id": "pmpt_68842015293c819483d326d4693478e10e0fc773bb2e0e5d",
-                "version": "3",
-                "variables": {
+        async def draft_lead(sections_data: Dict[str, Any]) -> Dict[str, Any]:
+            # Call lead section endpoint
+            response = await prompts.acreate(
+                client, "section_lead",
+                {
                     "entity": entity_name,
                     "context": entity_context,
                     "type": "Venture Capitalist",
                     "sources": all_pages_str
                 }
-            }
-        )
+            )
+            return extract_section_data(response, "lead")
         
-        # Extract the lead response content
-        if lead_response.output and len(lead_response.output) > 0:
-            last_output = lead_response.output[-1]
-            if hasattr(last_output, 'content') and last_output.content:
-                content_text = last_output.content[0].text
-                try:
-                    lead_data = json.loads(content_text)
-                    sections_data['lead'] = lead_data
-                except json.JSONDecodeError as e:
-                    print(f"Error parsing lead response: {e}")
-                    sections_data['lead'] = {"blocks": [], "references": []}
-            else:
-                sections_data['lead'] = {"blocks": [], "references": []}
-        else:
-            sections_data['lead'] = {"blocks": [], "references": []}
+        section_jobs = {
+            "early_life": lambda sections_data: draft_generic_section("early_life", "Early Life"),
+            "career": lambda sections_data: draft_generic_section("career", "Career"),
+            "notable_investments": draft_notable_investments,
+            "personal_life": draft_personal_life,
+            "person_infobox": draft_person_infobox,
+            "lead": draft_lead
+        }
+        
+        # Only personal life waits on another section - it gets the early life text to avoid repetition
+        section_dependencies = {
+            "personal_life": ["early_life"]
+        }
+        
+        sections_data = await run_section_jobs(section_jobs, section_dependencies, DRAFT_SECTION_CONCURRENCY)
         
         # Create or update article entry
         existing_article = articles_store.get(draft_id)
@@ -802,7 +839,7 @@ async def draft_document(draft_id: str):
         
         # Save to articles store (overwrites if exists)
         articles_store[draft_id] = article_data
-        save_articles()
+        save_articles(draft_id)
         
         # Update entity status
         update_entity_status(draft_id, 'drafted_sections')
@@ -812,6 +849,22 @@ async def draft_document(draft_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating article sections: {str(e)}")
 
+@router.get("/articles/summaries", response_model=list[ArticleSummary])
+async def list_article_summaries(request: Request, response: Response,
+                                 status: Optional[Literal["drafting", "drafted", "published"]] = None,
+                                 updated_since: Optional[str] = None,
+                                 limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), after: Optional[str] = None):
+    """List article summaries (section names, word counts and timestamps) without loading the sections.
+    
+    Takes the same filters and pagination as GET /drafts/articles/.
+    """
+    return query_response(
+        request, response, article_summaries_db, ArticleSummary,
+        criteria={'status': status} if status else None,
+        since=('updated_at', updated_since) if updated_since else None,
+        after=after, limit=limit
+    )
+
 @router.get("/articles/{article_id}", response_model=ArticleStatus)
 async def get_article(article_id: str):
     """Get a specific article by ID"""
@@ -820,14 +873,26 @@ async def get_article(article_id: str):
     if article_id not in articles_store:
         raise HTTPException(status_code=404, detail="Article not found")
     
-    return ArticleStatus(**articles_store[article_id])
+    return record_response(articles_store[article_id], ArticleStatus)
 
 @router.get("/articles/", response_model=list[ArticleStatus])
-async def list_articles():
-    """List all articles"""
-    load_articles()
-    
-    return [ArticleStatus(**article) for article in articles_store.values()]
+async def list_articles(request: Request, response: Response,
+                        status: Optional[Literal["drafting", "drafted", "published"]] = None,
+                        updated_since: Optional[str] = None, limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+                        after: Optional[str] = None, fields: Optional[str] = None):
+    """List articles in ID order, optionally filtered by status and last update (ISO timestamp).
+    
+    Pass `limit` to page through them - the next page's `after` cursor is in the X-Next-Cursor header.
+    `fields` (comma separated, e.g. id,status,updated_at) skips the large `sections` unless asked for.
+    Streamed with Accept: application/x-ndjson.
+    """
+    projection = parse_fields(fields, ArticleStatus)
+    return query_response(
+        request, response, articles_db, ArticleStatus,
+        criteria={'status': status} if status else None,
+        since=('updated_at', updated_since) if updated_since else None,
+        after=after, limit=limit, fields=projection
+    )
 
 @router.put("/articles/{article_id}", response_model=ArticleStatus)
 async def update_article(article_id: str, request: UpdateArticleRequest):
@@ -852,11 +917,12 @@ async def update_article(article_id: str, request: UpdateArticleRequest):
     
     # Save the updated article
     articles_store[article_id] = existing_article
-    save_articles()
+    save_articles(article_id)
     
     return ArticleStatus(**existing_article)
 
 # Load data on module import
 load_entities()
 load_drafts()
-load_articles()
\ No newline at end of file
+load_articles()
+sync_summaries()
\ No newline at end of file
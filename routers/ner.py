@@ -1,10 +1,18 @@
 from fastapi import APIRouter, HTTPException
-from openai import OpenAI
+from typing import List, Optional
+import asyncio
+import hashlib
 import json
 import os
+import re
+import threading
+import time
 from dotenv import load_dotenv
-from models import Entity, NERRequest, NERResponse
+from models import Entity, NERRequest, NERResponse, NERBatchRequest, NERBatchResult, NERBatchResponse
 from routers.entities import format_entity_key, entity_exists
+from storage import open_store
+from openai_client import get_async_client
+import prompts
 
 # Load environment variables
 load_dotenv()
@@ -16,77 +24,229 @@ router = APIRouter(
     responses={500: {"description": "Internal server error"}},
 )
 
-# Initialize OpenAI client
-client = OpenAI()
+# Shared async OpenAI client - handlers here are async, so blocking calls would stall the event loop
+client = get_async_client()
+
+NER_CHUNK_CHARS = int(os.getenv('NER_CHUNK_CHARS', '4000'))  # Target chunk size for batch documents
+NER_CHUNK_OVERLAP_SENTENCES = int(os.getenv('NER_CHUNK_OVERLAP_SENTENCES', '1'))  # Sentences repeated between chunks
+NER_BATCH_CONCURRENCY = int(os.getenv('NER_BATCH_CONCURRENCY', '5'))  # Chunks sent to OpenAI at the same time
+NER_CACHE_MAX_ENTRIES = int(os.getenv('NER_CACHE_MAX_ENTRIES', '10000'))  # Least recently used results are evicted beyond this
+NER_CACHE_TTL_SECONDS = float(os.getenv('NER_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))  # Results older than this are recomputed
+NER_CACHE_TOUCH_SECONDS = 60  # Minimum time between last-used updates of a cached result, to avoid a write per hit
+
+NER_PROMPT = prompts.get_prompt("ner")
+
+# Raw model output per (prompt, text) - filtering is re-applied on every hit since the entity store changes
+ner_cache_file = "ner_cache.txt"
+ner_cache_db = open_store(ner_cache_file, "# NER result cache - hash of (prompt id, version, normalized text) -> raw entities")
+ner_cache = ner_cache_db.data
+# The cache is read and written from threadpool threads (see extract_entities) - one at a time, so
+# eviction never iterates the dictionary while another request inserts into it
+ner_cache_lock = threading.Lock()
+
+# Define entity types to filter out - focus on meaningful entities for companies and persons
+FILTERED_OUT_TYPES = {
+    "LANGUAGE",
+    "DATE",
+    "TIME",
+    "PERCENT",
+    "MONEY",
+    "QUANTITY",
+    "ORDINAL",
+    "CARDINAL"
+}
+
+# Sentence ends: terminal punctuation (optionally followed by a closing quote/bracket) and whitespace
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])["\')\]]?\s+')
+
+def ner_cache_key(text: str, prompt_id: str = NER_PROMPT.id, prompt_version: str = NER_PROMPT.version) -> str:
+    """Cache key for a text - whitespace differences don't change the key"""
+    normalized_text = " ".join(text.split())
+    return hashlib.sha256(f"{prompt_id}\n{prompt_version}\n{normalized_text}".encode('utf-8')).hexdigest()
+
+def get_cached_entities(cache_key: str) -> Optional[List[dict]]:
+    """Raw entities cached for a key, or None if missing or expired - blocking file I/O"""
+    with ner_cache_lock:
+        return _get_cached_entities(cache_key)
+
+def _get_cached_entities(cache_key: str) -> Optional[List[dict]]:
+    ner_cache_db.load()
+    cached = ner_cache.get(cache_key)
+    if cached is None:
+        return None
+    
+    now = time.time()
+    if now - cached['created_at'] > NER_CACHE_TTL_SECONDS:
+        return None
+    
+    if now - cached['last_used_at'] > NER_CACHE_TOUCH_SECONDS:
+        cached['last_used_at'] = now
+        ner_cache_db.save(cache_key)
+    return cached['entities']
+
+def cache_entities(cache_key: str, entities_data: List[dict]):
+    """Cache raw entities for a key, evicting expired and least recently used results - blocking file I/O"""
+    with ner_cache_lock:
+        _cache_entities(cache_key, entities_data)
+
+def _cache_entities(cache_key: str, entities_data: List[dict]):
+    now = time.time()
+    ner_cache[cache_key] = {
+        'id': cache_key,
+        'prompt_id': NER_PROMPT.id,
+        'prompt_version': NER_PROMPT.version,
+        'entities': entities_data,
+        'created_at': now,
+        'last_used_at': now
+    }
+    
+    evicted = []
+    if len(ner_cache) > NER_CACHE_MAX_ENTRIES:
+        evicted = [key for key, cached in ner_cache.items() if now - cached['created_at'] > NER_CACHE_TTL_SECONDS]
+        overflow = len(ner_cache) - len(evicted) - NER_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            # Evict a tenth of the cache at once so the sort isn't repeated on every insert
+            overflow += NER_CACHE_MAX_ENTRIES // 10
+            by_last_use = sorted((cached['last_used_at'], key) for key, cached in ner_cache.items()
+                                 if key not in evicted and key != cache_key)
+            evicted += [key for _, key in by_last_use[:overflow]]
+        for key in evicted:
+            del ner_cache[key]
+    
+    ner_cache_db.save(cache_key, *evicted)
+
+async def extract_entities(text: str) -> List[dict]:
+    """Run the NER prompt on a text and return the raw {type, value} items, using the cache when possible"""
+    cache_key = ner_cache_key(text)
+    # Cache lookups and writes take file locks, which would stall every request on the event loop
+    cached_entities = await asyncio.to_thread(get_cached_entities, cache_key)
+    if cached_entities is not None:
+        return cached_entities
+    
+    response = await prompts.acreate(client, NER_PROMPT.name, {"text": text})
+    
+    entities_data = prompts.response_json(response)
+    if entities_data is None:
+        raise Exception("No text found in response output")
+    
+    # Check if we have valid entities data
+    raw_entities = []
+    if isinstance(entities_data, dict) and "entities" in entities_data and isinstance(entities_data["entities"], list):
+        raw_entities = [entity_data for entity_data in entities_data["entities"]
+                        if isinstance(entity_data, dict) and "type" in entity_data and "value" in entity_data]
+    
+    await asyncio.to_thread(cache_entities, cache_key, raw_entities)
+    return raw_entities
+
+def filter_entities(entities_data: List[dict]) -> List[Entity]:
+    """Drop unwanted types, duplicates and entities already in the store"""
+    entities = []
+    seen_ids = set()
+    
+    for entity_data in entities_data:
+        entity_type = entity_data["type"]
+        entity_value = entity_data["value"]
+        
+        # Filter out unwanted entity types - keep only meaningful entities like PERSON, ORG, etc.
+        if entity_type in FILTERED_OUT_TYPES:
+            continue
+        
+        # Convert entity value to our ID format - chunks overlap, so the same entity can appear more than once
+        entity_id = format_entity_key(entity_value)
+        if entity_id in seen_ids:
+            continue
+        seen_ids.add(entity_id)
+        
+        # Only add entity if it's not already in our store
+        if not entity_exists(entity_id):
+            entities.append(Entity(type=entity_type, value=entity_value))
+    
+    return entities
+
+def split_into_chunks(text: str, max_chars: int = NER_CHUNK_CHARS,
+                      overlap_sentences: int = NER_CHUNK_OVERLAP_SENTENCES) -> List[str]:
+    """Split text at sentence boundaries into chunks of about max_chars.
+    
+    The last overlap_sentences sentences of a chunk start the next one, so an entity mentioned
+    across a boundary is still seen whole. A single sentence longer than max_chars is its own chunk.
+    """
+    if len(text) <= max_chars:
+        return [text]
+    
+    sentences = [sentence for sentence in SENTENCE_BOUNDARY.split(text) if sentence.strip()]
+    chunks = []
+    current = []
+    current_length = 0
+    
+    for sentence in sentences:
+        if current and current_length + len(sentence) > max_chars:
+            chunks.append(" ".join(current))
+            current = current[-overlap_sentences:] if overlap_sentences > 0 else []
+            # Drop the overlap if it wouldn't leave room for the new sentence
+            if sum(len(s) + 1 for s in current) + len(sentence) > max_chars:
+                current = []
+            current_length = sum(len(s) + 1 for s in current)
+        current.append(sentence)
+        current_length += len(sentence) + 1
+    
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
 
 @router.post("/", response_model=NERResponse)
 async def named_entity_recognition(request: NERRequest):
     """Perform Named Entity Recognition on the provided text using OpenAI prompt"""
     
     try:
-        # Use the exact OpenAI API call structure provided
-        response = client.responses.create(
-            prompt={
-                "id": "pmpt_687e9a02edfc8193ab9fcc4cd3508f5c0fba5ac419ccbf53",
-                "version": "9",
-                "variables": {
-                    "text": request.text
-                }
-            }
-        )
-
-        if hasattr(response, 'output') and response.output:
-            output_message = response.output[0]  # Get first output message
-            
-            if hasattr(output_message, 'content') and output_message.content:
-                content_item = output_message.content[0]  # Get first content item
-                
-                if hasattr(content_item, 'text'):
-                    response_text = content_item.text
-                else:
-                    raise Exception("No text found in content item")
-            else:
-                raise Exception("No content found in output message")
-        else:
-            raise Exception("No output found in response")
-        
-        entities_data = json.loads(response_text)
-
-        # Define entity types to filter out - focus on meaningful entities for companies and persons
-        filtered_out_types = {
-            "LANGUAGE",
-            "DATE", 
-            "TIME",
-            "PERCENT",
-            "MONEY",
-            "QUANTITY", 
-            "ORDINAL",
-            "CARDINAL"
-        }
-        
-        entities = []
-        
-        # Check if we have valid entities data
-        if isinstance(entities_data, dict) and "entities" in entities_data and isinstance(entities_data["entities"], list):
-            for entity_data in entities_data["entities"]:
-                if isinstance(entity_data, dict) and "type" in entity_data and "value" in entity_data:
-                    entity_type = entity_data["type"]
-                    entity_value = entity_data["value"]
-                    
-                    # Filter out unwanted entity types - keep only meaningful entities like PERSON, ORG, etc.
-                    if entity_type not in filtered_out_types:
-                        # Convert entity value to our ID format and check if it already exists
-                        entity_id = format_entity_key(entity_value)
-                        
-                        # Only add entity if it's not already in our store
-                        if not entity_exists(entity_id):
-                            entity = Entity(type=entity_type, value=entity_value)
-                            entities.append(entity)
+        # The existing-entity check reads the entity store, so it runs in the threadpool too
+        entities = await asyncio.to_thread(filter_entities, await extract_entities(request.text))
         
         # Always return a valid response, even if entities list is empty
         return NERResponse(entities=entities)
-        
+    
     except json.JSONDecodeError as e:
         raise HTTPException(status_code=500, detail=f"Failed to parse OpenAI response as JSON: {str(e)}")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing NER request: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error processing NER request: {str(e)}")
+
+@router.post("/batch", response_model=NERBatchResponse)
+async def batch_named_entity_recognition(request: NERBatchRequest):
+    """Perform Named Entity Recognition on many documents, splitting long ones into overlapping chunks.
+    
+    Chunks from every document run concurrently (at most NER_BATCH_CONCURRENCY at a time). A failed
+    chunk fails only its own document.
+    """
+    semaphore = asyncio.Semaphore(NER_BATCH_CONCURRENCY)
+    
+    async def extract_chunk(chunk: str) -> List[dict]:
+        async with semaphore:
+            return await extract_entities(chunk)
+    
+    document_chunks = [split_into_chunks(text) for text in request.texts]
+    chunk_results = await asyncio.gather(
+        *(extract_chunk(chunk) for chunks in document_chunks for chunk in chunks),
+        return_exceptions=True
+    )
+    
+    results = []
+    position = 0
+    for chunks in document_chunks:
+        document_results = chunk_results[position:position + len(chunks)]
+        position += len(chunks)
+        
+        errors = [result for result in document_results if isinstance(result, Exception)]
+        if errors:
+            error = errors[0]
+            if isinstance(error, json.JSONDecodeError):
+                detail = f"Failed to parse OpenAI response as JSON: {str(error)}"
+            else:
+                detail = f"Error processing NER request: {str(error)}"
+            results.append(NERBatchResult(chunks=len(chunks), error=detail))
+            continue
+        
+        # Merge chunks in document order, then filter once so overlaps are deduplicated
+        entities_data = [entity_data for chunk_entities in document_results for entity_data in chunk_entities]
+        entities = await asyncio.to_thread(filter_entities, entities_data)
+        results.append(NERBatchResult(entities=entities, chunks=len(chunks)))
+    
+    return NERBatchResponse(results=results)
@@ -1,13 +1,17 @@
-from fastapi import APIRouter, HTTPException, Request
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import List, Optional
 import json
-import os
-import fcntl
 import time
-from contextlib import contextmanager
-from openai import OpenAI
 from models import NotabilityData, CreateNotabilityRequest, ResearchRequest, ResearchResponse, ResearchStatusRequest, ResearchStatusResponse, NotabilityStatusRequest, NotabilityStatusResponse, TIMEOUT_SECONDS, MAX_RETRIES
-from routers.entities import entities_store, save_entities, load_entities
+from routers.entities import entities_db, entities_store, load_entities
+from routers.responses import index_response
+from storage import open_store
+from openai_client import get_client
+import prompts
+import logs
+from serialization import MAX_PAGE_SIZE, parse_fields, query_response
+
+logger = logs.get_logger(__name__)
 
 # Create router for notability endpoints
 router = APIRouter(
@@ -16,56 +20,38 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-@contextmanager
-def file_lock(filename, mode='r'):
-    """Context manager for file locking to prevent concurrent writes"""
-    f = open(filename, mode)
-    try:
-        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
-        yield f
-    finally:
-        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-        f.close()
-
 # Simple key-value store - load from file into dictionary
-notability_store = {}
 notability_file = "notability.txt"
+notability_db = open_store(
+    notability_file,
+    "# Simple key-value store for notability data (JSON format)",
+    # Migrate old data to include new fields
+    defaults={
+        'research_request_timestamp': None,
+        'notability_request_timestamp': None,
+        'retry_count': 0
+    },
+    indexes=('notability_status', 'research_request_timestamp', 'notability_request_timestamp')
+)
+notability_store = notability_db.data
 
-# Initialize OpenAI client
-client = OpenAI()
+# Shared sync OpenAI client - handlers here are sync and run in the threadpool
+client = get_client()
 
 # Load existing notability data from file (JSON format)
 def load_notability_data():
-    global notability_store
-    if os.path.exists(notability_file):
-        with file_lock(notability_file, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line and not line.startswith('#'):
-                    try:
-                        notability_data = json.loads(line)
-                        if 'id' in notability_data:
-                            # Migrate old data to include new fields
-                            if 'research_request_timestamp' not in notability_data:
-                                notability_data['research_request_timestamp'] = None
-                            if 'notability_request_timestamp' not in notability_data:
-                                notability_data['notability_request_timestamp'] = None
-                            if 'retry_count' not in notability_data:
-                                notability_data['retry_count'] = 0
-                            notability_store[notability_data['id']] = notability_data
-                    except json.JSONDecodeError:
-                        continue
+    notability_db.load()
 
-# Save notability data to file
-def save_notability_data():
-    with file_lock(notability_file, 'w') as f:
-        f.write("# Simple key-value store for notability data (JSON format)\n")
-        for notability in notability_store.values():
-            f.write(json.dumps(notability) + '\n')
+# Save notability data to file - pass the IDs that changed so only those records are written
+def save_notability_data(*entity_ids):
+    notability_db.save(*entity_ids)
 
 # Load data on module import
 load_notability_data()
 
+# Stands in for the notability request ID while a worker starts the evaluation, so only one worker starts it
+NOTABILITY_REQUEST_PENDING = "pending"
+
 def is_request_timed_out(timestamp: float) -> bool:
     """Check if a request has timed out based on its timestamp"""
     if timestamp is None:
@@ -74,15 +60,15 @@ def is_request_timed_out(timestamp: float) -> bool:
 
 def cancel_and_retry_research_request(entity_id: str, entity_data: dict) -> str:
     """Cancel a hanging research request and retry it"""
-    print(f"[DEBUG] Cancelling and retrying research request for entity {entity_id}")
+    logger.info("Cancelling and retrying research request for entity %s", entity_id)
     
     # Cancel the hanging request
     try:
         if entity_data.get('openai_research_request_id'):
-            client.responses.cancel(entity_data['openai_research_request_id'])
-            print(f"[DEBUG] Cancelled research request: {entity_data['openai_research_request_id']}")
+            prompts.cancel(client, entity_data['openai_research_request_id'])
+            logger.info("Cancelled research request %s", entity_data['openai_research_request_id'])
     except Exception as e:
-        print(f"[DEBUG] Error cancelling research request: {str(e)}")
+        logger.warning("Error cancelling research request: %s", e)
     
     # Get entity info for retry
     entity = entities_store[entity_id]
@@ -90,54 +76,51 @@ def cancel_and_retry_research_request(entity_id: str, entity_data: dict) -> str:
     context = entity.get('context', '')
     
     # Create idempotency key based on entity ID and retry count
+    previous_request_id = entity_data.get('openai_research_request_id')
     retry_count = entity_data.get('retry_count', 0) + 1
     idempotency_key = f"research_{entity_id}_{retry_count}"
     
     # Retry the request
     try:
-        response = client.responses.create(
-            prompt={
-                "id": "pmpt_687eaf8edda88194b8f2c14fa48e3a45059695391023684d",
-                "version": "10",
-                "variables": {
-                    "entity_name": canonical_name,
-                    "context": context
-                }
+        response = prompts.create(
+            client, "research",
+            {
+                "entity_name": canonical_name,
+                "context": context
             },
             background=True,
             idempotency_key=idempotency_key
         )
         
-        # Update the notability data with new request ID and timestamp
-        entity_data['openai_research_request_id'] = response.id
-        entity_data['research_request_timestamp'] = time.time()
-        entity_data['retry_count'] = retry_count
-        notability_store[entity_id] = entity_data
-        save_notability_data()
+        # Replace the request ID only if no other worker retried it in the meantime
+        if not notability_db.compare_and_set(entity_id, 'openai_research_request_id', previous_request_id, response.id,
+                                             research_request_timestamp=time.time(), retry_count=retry_count):
+            logger.info("Research request was already retried by another worker")
+            return notability_db.get(entity_id, {}).get('openai_research_request_id')
+        index_response(response.id, 'notability', entity_id, 'research')
         
-        print(f"[DEBUG] Retried research request with ID: {response.id}")
+        logger.info("Retried research request with ID %s", response.id)
         return response.id
         
     except Exception as e:
-        print(f"[DEBUG] Failed to retry research request: {str(e)}")
+        logger.error("Failed to retry research request: %s", e)
         # Mark as failed if we can't retry
-        entity_data['openai_research_request_id'] = None
-        entity_data['research_request_timestamp'] = None
-        notability_store[entity_id] = entity_data
-        save_notability_data()
+        notability_db.compare_and_set(entity_id, 'openai_research_request_id', previous_request_id, None,
+                                      research_request_timestamp=None)
         raise HTTPException(status_code=500, detail=f"Failed to retry research request: {str(e)}")
 
 def cancel_and_retry_notability_request(entity_id: str, entity_data: dict) -> str:
     """Cancel a hanging notability request and retry it"""
-    print(f"[DEBUG] Cancelling and retrying notability request for entity {entity_id}")
+    logger.info("Cancelling and retrying notability request for entity %s", entity_id)
     
-    # Cancel the hanging request
+    # Cancel the hanging request - a pending claim never got as far as creating one
+    previous_request_id = entity_data.get('openai_notability_request_id')
     try:
-        if entity_data.get('openai_notability_request_id'):
-            client.responses.cancel(entity_data['openai_notability_request_id'])
-            print(f"[DEBUG] Cancelled notability request: {entity_data['openai_notability_request_id']}")
+        if previous_request_id and previous_request_id != NOTABILITY_REQUEST_PENDING:
+            prompts.cancel(client, entity_data['openai_notability_request_id'])
+            logger.info("Cancelled notability request %s", entity_data['openai_notability_request_id'])
     except Exception as e:
-        print(f"[DEBUG] Error cancelling notability request: {str(e)}")
+        logger.warning("Error cancelling notability request: %s", e)
     
     # Get entity info for retry
     entity = entities_store[entity_id]
@@ -151,39 +134,74 @@ def cancel_and_retry_notability_request(entity_id: str, entity_data: dict) -> st
     
     # Retry the request
     try:
-        response = client.responses.create(
-            prompt={
-                "id": "pmpt_687ec395081c81969578b916f2d6a6d609eb423f8db71c55",
-                "version": "5",
-                "variables": {
-                    "entity_name": entity_name,
-                    "context": entity_context,
-                    "sources": sources_str
-                }
+        response = prompts.create(
+            client, "notability",
+            {
+                "entity_name": entity_name,
+                "context": entity_context,
+                "sources": sources_str
             },
             background=True,
             idempotency_key=idempotency_key
         )
         
-        # Update the notability data with new request ID and timestamp
-        entity_data['openai_notability_request_id'] = response.id
-        entity_data['notability_request_timestamp'] = time.time()
-        entity_data['retry_count'] = retry_count
-        notability_store[entity_id] = entity_data
-        save_notability_data()
+        # Replace the request ID only if no other worker retried it in the meantime
+        if not notability_db.compare_and_set(entity_id, 'openai_notability_request_id', previous_request_id, response.id,
+                                             notability_request_timestamp=time.time(), retry_count=retry_count):
+            logger.info("Notability request was already retried by another worker")
+            return notability_db.get(entity_id, {}).get('openai_notability_request_id')
+        index_response(response.id, 'notability', entity_id, 'notability')
         
-        print(f"[DEBUG] Retried notability request with ID: {response.id}")
+        logger.info("Retried notability request with ID %s", response.id)
         return response.id
         
     except Exception as e:
-        print(f"[DEBUG] Failed to retry notability request: {str(e)}")
+        logger.error("Failed to retry notability request: %s", e)
         # Mark as failed if we can't retry
-        entity_data['openai_notability_request_id'] = None
-        entity_data['notability_request_timestamp'] = None
-        notability_store[entity_id] = entity_data
-        save_notability_data()
+        notability_db.compare_and_set(entity_id, 'openai_notability_request_id', previous_request_id, None,
+                                      notability_request_timestamp=None)
         raise HTTPException(status_code=500, detail=f"Failed to retry notability request: {str(e)}")
 
+def start_notability_evaluation(entity_id: str, sources: list) -> Optional[str]:
+    """Start the background notability evaluation of a researched entity, unless it has been started already.
+
+    The request ID is claimed (None -> NOTABILITY_REQUEST_PENDING) before calling OpenAI, so two
+    workers never both start one. Returns the new response ID, or None if it was already started.
+    """
+    if not notability_db.compare_and_set(entity_id, 'openai_notability_request_id', None, NOTABILITY_REQUEST_PENDING,
+                                         notability_request_timestamp=time.time()):
+        return None
+    
+    entity = entities_store[entity_id]
+    logs.log_payload(logger, "Entity data for notability trigger: %s", entity)
+    
+    # Convert sources to string format for the API
+    sources_str = json.dumps(sources)
+    logger.debug("Sources string length: %d", len(sources_str))
+    
+    try:
+        response = prompts.create(
+            client, "notability",
+            {
+                "entity_name": entity.get('name', ''),
+                "context": entity.get('context', ''),
+                "sources": sources_str
+            },
+            background=True
+        )
+    except Exception:
+        # Release the claim so the evaluation can be triggered again
+        notability_db.compare_and_set(entity_id, 'openai_notability_request_id', NOTABILITY_REQUEST_PENDING, None,
+                                      notability_request_timestamp=None)
+        raise
+    
+    # A claim held past the timeout is retried by the status check, which replaces the marker
+    if not notability_db.compare_and_set(entity_id, 'openai_notability_request_id', NOTABILITY_REQUEST_PENDING, response.id,
+                                         notability_request_timestamp=time.time()):
+        logger.warning("Notability request %s was replaced while it was being started", response.id)
+    index_response(response.id, 'notability', entity_id, 'notability')
+    return response.id
+
 @router.post("/{entity_id}", response_model=NotabilityData)
 def create_notability_research_job(entity_id: str):
     """Create a new research job for an entity - given an entity ID, start background research"""
@@ -211,50 +229,37 @@ def create_notability_research_job(entity_id: str):
     
     # Call OpenAI API with background=True
     try:
-        response = client.responses.create(
-            prompt={
-                "id": "pmpt_687eaf8edda88194b8f2c14fa48e3a45059695391023684d",
-                "version": "10",
-                "variables": {
-                    "entity_name": canonical_name,
-                    "context": context
-                }
+        response = prompts.create(
+            client, "research",
+            {
+                "entity_name": canonical_name,
+                "context": context
             },
             background=True
         )
         
         # Extract the request ID
         openai_research_request_id = response.id
+        research_fields = {
+            'openai_research_request_id': openai_research_request_id,
+            'research_request_timestamp': time.time()
+        }
         
-        # Update existing notability entry or create new one
-        if entity_id in notability_store:
-            notability_data = notability_store[entity_id]
-            notability_data['openai_research_request_id'] = openai_research_request_id
-            notability_data['research_request_timestamp'] = time.time()
-        else:
-            # Create new notability entry with null values except research_request_id
-            notability_data = {
-                'id': entity_id,
-                'notability_status': None,
-                'openai_research_request_id': openai_research_request_id,
-                'research_request_timestamp': time.time(),
-                'sources': [],
-                'openai_notability_request_id': None,
-                'notability_request_timestamp': None,
-                'notability_rationale': None,
-                'retry_count': 0
-            }
-        
-        # Add/update in-memory store
-        notability_store[entity_id] = notability_data
-        
-        # Update entity status to researching
-        entities_store[entity_id]['status'] = 'researching'
-        # Save entities to file using the proper function
-        save_entities()
+        # Update existing notability entry or create new one with null values except research_request_id
+        new_entry = {
+            'id': entity_id,
+            'notability_status': None,
+            'sources': [],
+            'openai_notability_request_id': None,
+            'notability_request_timestamp': None,
+            'notability_rationale': None,
+            'retry_count': 0
+        }
+        notability_data = notability_db.update(entity_id, lambda current: {**(current or new_entry), **research_fields})
         
-        # Save to file
-        save_notability_data()
+        # Update entity status to researching - a single-record write
+        entities_db.patch(entity_id, {'status': 'researching'})
+        index_response(openai_research_request_id, 'notability', entity_id, 'research')
         
         return NotabilityData(**notability_data)
         
@@ -262,12 +267,19 @@ def create_notability_research_job(entity_id: str):
         raise HTTPException(status_code=500, detail=f"OpenAI API error: {str(e)}")
 
 @router.get("/", response_model=List[NotabilityData])
-def get_all_notability_data():
-    """Get all notability data"""
-    # Reload data to ensure we have the latest state
-    load_notability_data()
-    
-    return [NotabilityData(**data) for data in notability_store.values()]
+def get_all_notability_data(request: Request, response: Response, status: Optional[str] = None,
+                            limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE), after: Optional[str] = None,
+                            fields: Optional[str] = None):
+    """Get notability data in entity ID order, optionally filtered by notability status.
+    
+    Pass `limit` to page through it - the next page's `after` cursor is in the X-Next-Cursor header.
+    `fields` (comma separated) returns only those fields. Streamed with Accept: application/x-ndjson.
+    """
+    projection = parse_fields(fields, NotabilityData)
+    return query_response(
+        request, response, notability_db, NotabilityData,
+        criteria={'notability_status': status} if status else None, after=after, limit=limit, fields=projection
+    )
 
 @router.get("/{entity_id}", response_model=NotabilityData)
 def get_notability_data(entity_id: str):
@@ -297,14 +309,11 @@ def research_entity(request: ResearchRequest):
     
     # Call OpenAI API with background=True
     try:
-        response = client.responses.create(
-            prompt={
-                "id": "pmpt_687eaf8edda88194b8f2c14fa48e3a45059695391023684d",
-                "version": "10",
-                "variables": {
-                    "entity_name": canonical_name,
-                    "context": context
-                }
+        response = prompts.create(
+            client, "research",
+            {
+                "entity_name": canonical_name,
+                "context": context
             },
             background=True
         )
@@ -312,28 +321,23 @@ def research_entity(request: ResearchRequest):
         # Extract the request ID
         openai_research_request_id = response.id
         
-        # Store the request ID in the notability store
-        if request.id in notability_store:
-            notability_store[request.id]['openai_research_request_id'] = openai_research_request_id
-            notability_store[request.id]['research_request_timestamp'] = time.time()
-        else:
-            # Create new entry
-            notability_data = {
-                'id': request.id,
-                'is_notable': None,
-                'openai_research_request_id': openai_research_request_id,
-                'research_request_timestamp': time.time(),
-                'sources': [],
-                'openai_notability_request_id': None,
-                'notability_request_timestamp': None,
-                'notability_status': None,
-                'notability_rationale': None,
-                'retry_count': 0
-            }
-            notability_store[request.id] = notability_data
-        
-        # Save to file
-        save_notability_data()
+        # Store the request ID in the notability store, creating the entry if there is none
+        research_fields = {
+            'openai_research_request_id': openai_research_request_id,
+            'research_request_timestamp': time.time()
+        }
+        new_entry = {
+            'id': request.id,
+            'is_notable': None,
+            'sources': [],
+            'openai_notability_request_id': None,
+            'notability_request_timestamp': None,
+            'notability_status': None,
+            'notability_rationale': None,
+            'retry_count': 0
+        }
+        notability_db.update(request.id, lambda current: {**(current or new_entry), **research_fields})
+        index_response(openai_research_request_id, 'notability', request.id, 'research')
         
         return ResearchResponse(openai_research_request_id=openai_research_request_id)
         
@@ -344,24 +348,26 @@ def research_entity(request: ResearchRequest):
 def check_research_status(request: ResearchStatusRequest):
     """Check the status of a research request and parse response if completed"""
     
-    print(f"[DEBUG] Checking research status for entity_id: {request.id}")
-    print(f"[DEBUG] Request object: {request}")
-    print(f"[DEBUG] Request type: {type(request)}")
-    print(f"[DEBUG] Request dict: {request.dict()}")
+    logs.bind(entity_id=request.id)
+    logger.debug("Checking research status")
+    
+    # Catch up with changes made by other workers
+    load_notability_data()
+    load_entities()
     
     # Check if entity exists in notability store
     if request.id not in notability_store:
-        print(f"[DEBUG] Entity {request.id} not found in notability store")
+        logger.debug("Entity not found in notability store")
         raise HTTPException(status_code=404, detail="Entity not found in notability store")
     
     entity_data = notability_store[request.id]
-    print(f"[DEBUG] Entity data: {entity_data}")
+    logs.log_payload(logger, "Notability data: %s", entity_data)
     
     openai_research_request_id = entity_data.get('openai_research_request_id')
-    print(f"[DEBUG] OpenAI research request ID: {openai_research_request_id}")
+    logs.bind(response_id=openai_research_request_id)
     
     if not openai_research_request_id:
-        print(f"[DEBUG] No research request ID found for entity {request.id}")
+        logger.debug("No research request ID found")
         # Check if entity exists in entities store to provide better error message
         if request.id in entities_store:
             raise HTTPException(status_code=400, detail="No research request found for this entity. Please start research first using POST /notability/{entity_id}")
@@ -373,19 +379,15 @@ def check_research_status(request: ResearchStatusRequest):
     retry_count = entity_data.get('retry_count', 0)
     
     if research_timestamp and is_request_timed_out(research_timestamp):
-        print(f"[DEBUG] Research request timed out for entity {request.id}")
+        logger.info("Research request timed out")
         
         if retry_count >= MAX_RETRIES:
-            print(f"[DEBUG] Max retries exceeded for entity {request.id}, marking as failed")
+            logger.warning("Max retries exceeded, marking as failed")
             # Mark as failed
-            entity_data['openai_research_request_id'] = None
-            entity_data['research_request_timestamp'] = None
-            notability_store[request.id] = entity_data
-            save_notability_data()
+            notability_db.patch(request.id, {'openai_research_request_id': None, 'research_request_timestamp': None})
             
             # Update entity status to failed
-            entities_store[request.id]['status'] = 'failed'
-            save_entities()
+            entities_db.patch(request.id, {'status': 'failed'})
             
             return ResearchStatusResponse(
                 status="failed",
@@ -394,7 +396,7 @@ def check_research_status(request: ResearchStatusRequest):
             )
         else:
             # Retry the request
-            print(f"[DEBUG] Retrying research request for entity {request.id} (attempt {retry_count + 1})")
+            logger.info("Retrying research request (attempt %d)", retry_count + 1)
             new_request_id = cancel_and_retry_research_request(request.id, entity_data)
             return ResearchStatusResponse(
                 status="pending",
@@ -403,37 +405,20 @@ def check_research_status(request: ResearchStatusRequest):
             )
     
     try:
-        print(f"[DEBUG] Calling OpenAI API to retrieve response for ID: {openai_research_request_id}")
+        logger.debug("Retrieving research response")
         # Retrieve the response from OpenAI
-        response = client.responses.retrieve(openai_research_request_id)
-        print(f"[DEBUG] OpenAI response status: {response.status}")
+        response = prompts.retrieve(client, openai_research_request_id)
+        logger.debug("Research response status: %s", response.status)
         
         if response.status == 'completed':
             # Parse the response content for sources
             try:
-                print(f"[DEBUG] Response object attributes: {dir(response)}")
-                print(f"[DEBUG] Response object: {response}")
-                
-                # Extract the content from the response output
-                content = None
-                if hasattr(response, 'output') and response.output:
-                    # Look for the last message in output that contains the JSON
-                    for item in reversed(response.output):
-                        if hasattr(item, 'content') and item.content:
-                            for content_item in item.content:
-                                if hasattr(content_item, 'text'):
-                                    content = content_item.text
-                                    break
-                            if content:
-                                break
-                
-                print(f"[DEBUG] Extracted content: {content}")
+                logs.log_payload(logger, "Research response object: %s", response)
                 
-                # Parse JSON content to extract sources array
-                if isinstance(content, str):
-                    parsed_content = json.loads(content)
-                else:
-                    parsed_content = content
+                # The JSON is in the last message of the response output
+                content = prompts.response_text(response)
+                logs.log_payload(logger, "Extracted content: %s", content)
+                parsed_content = json.loads(content) if content is not None else None
                 
                 # Extract sources array from the parsed content
                 sources_data = parsed_content.get('sources', [])
@@ -450,57 +435,22 @@ def check_research_status(request: ResearchStatusRequest):
                         continue
                 
                 # Update the notability store with the parsed sources
-                entity_data['sources'] = [source.dict() for source in sources]
-                notability_store[request.id] = entity_data
-                save_notability_data()
+                source_dicts = [source.dict() for source in sources]
+                notability_db.patch(request.id, {'sources': source_dicts})
                 
-                # Update entity status to researched
-                entities_store[request.id]['status'] = 'researched'
-                # Save entities to file using the proper function
-                save_entities()
-                
-                # Trigger notability evaluation
-                try:
-                    entity = entities_store[request.id]
-                    entity_name = entity.get('name', '')
-                    entity_context = entity.get('context', '')
-                    
-                    print(f"[DEBUG] Entity data for notability trigger: {entity}")
-                    print(f"[DEBUG] Entity name: {entity_name}")
-                    print(f"[DEBUG] Entity context: {entity_context}")
-                    
-                    # Convert sources to string format for the API
-                    sources_str = json.dumps([source.dict() for source in sources])
-                    print(f"[DEBUG] Sources string length: {len(sources_str)}")
-                    
-                    print(f"[DEBUG] Starting notability evaluation for {request.id}")
-                    notability_response = client.responses.create(
-                        prompt={
-                            "id": "pmpt_687ec395081c81969578b916f2d6a6d609eb423f8db71c55",
-                            "version": "5",
-                            "variables": {
-                                "entity_name": entity_name,
-                                "context": entity_context,
-                                "sources": sources_str
-                            }
-                        },
-                        background=True
-                    )
-                    
-                    # Update notability data with the notability request ID
-                    entity_data['openai_notability_request_id'] = notability_response.id
-                    entity_data['notability_request_timestamp'] = time.time()
-                    notability_store[request.id] = entity_data
-                    save_notability_data()
-                    
-                    print(f"[DEBUG] Notability evaluation started with ID: {notability_response.id}")
-                    
-                except Exception as e:
-                    print(f"[DEBUG] Failed to start notability evaluation: {str(e)}")
-                    print(f"[DEBUG] Exception type: {type(e)}")
-                    import traceback
-                    print(f"[DEBUG] Full traceback: {traceback.format_exc()}")
-                    # Don't fail the research response if notability evaluation fails to start
+                # Move the entity from researching to researched. Only the request that makes the
+                # transition starts the notability evaluation - another worker or the poller
+                # completing the same research concurrently finds it already moved. An evaluation
+                # that failed to start is restarted with POST /notability/notability/trigger.
+                if entities_db.compare_and_set(request.id, 'status', 'researching', 'researched'):
+                    try:
+                        logger.info("Starting notability evaluation")
+                        notability_request_id = start_notability_evaluation(request.id, source_dicts)
+                        if notability_request_id:
+                            logger.info("Notability evaluation started with ID %s", notability_request_id)
+                    except Exception as e:
+                        logger.exception("Failed to start notability evaluation: %s", e)
+                        # Don't fail the research response if notability evaluation fails to start
                 
                 return ResearchStatusResponse(
                     status="completed",
@@ -510,9 +460,7 @@ def check_research_status(request: ResearchStatusRequest):
                 
             except json.JSONDecodeError as e:
                 # If we can't parse the response, still return completed status and mark as researched
-                entities_store[request.id]['status'] = 'researched'
-                # Save entities to file using the proper function
-                save_entities()
+                entities_db.compare_and_set(request.id, 'status', 'researching', 'researched')
                 
                 return ResearchStatusResponse(
                     status="completed",
@@ -535,21 +483,23 @@ def check_research_status(request: ResearchStatusRequest):
             )
             
     except Exception as e:
-        print(f"[DEBUG] Exception in research status check: {str(e)}")
-        print(f"[DEBUG] Exception type: {type(e)}")
-        import traceback
-        print(f"[DEBUG] Traceback: {traceback.format_exc()}")
+        logger.exception("Exception in research status check: %s", e)
         raise HTTPException(status_code=500, detail=f"Error checking research status: {str(e)}")
 
 @router.post("/notability/trigger", response_model=dict)
 def trigger_notability_evaluation(request: NotabilityStatusRequest):
     """Manually trigger notability evaluation for an entity that has completed research"""
     
-    print(f"[DEBUG] Manually triggering notability evaluation for entity_id: {request.id}")
+    logs.bind(entity_id=request.id)
+    logger.info("Manually triggering notability evaluation")
+    
+    # Catch up with changes made by other workers
+    load_notability_data()
+    load_entities()
     
     # Check if entity exists in notability store
     if request.id not in notability_store:
-        print(f"[DEBUG] Entity {request.id} not found in notability store")
+        logger.debug("Entity not found in notability store")
         raise HTTPException(status_code=404, detail="Entity not found in notability store")
     
     entity_data = notability_store[request.id]
@@ -567,74 +517,49 @@ def trigger_notability_evaluation(request: NotabilityStatusRequest):
         raise HTTPException(status_code=404, detail="Entity not found in entities store")
     
     try:
-        entity = entities_store[request.id]
-        entity_name = entity.get('name', '')
-        entity_context = entity.get('context', '')
-        
-        print(f"[DEBUG] Entity data for manual notability trigger: {entity}")
-        print(f"[DEBUG] Entity name: {entity_name}")
-        print(f"[DEBUG] Entity context: {entity_context}")
-        
-        # Convert sources to string format for the API
-        sources_str = json.dumps([source for source in entity_data.get('sources', [])])
-        print(f"[DEBUG] Sources string length: {len(sources_str)}")
-        
-        print(f"[DEBUG] Starting manual notability evaluation for {request.id}")
-        notability_response = client.responses.create(
-            prompt={
-                "id": "pmpt_687ec395081c81969578b916f2d6a6d609eb423f8db71c55",
-                "version": "5",
-                "variables": {
-                    "entity_name": entity_name,
-                    "context": entity_context,
-                    "sources": sources_str
-                }
-            },
-            background=True
-        )
-        
-        # Update notability data with the notability request ID
-        entity_data['openai_notability_request_id'] = notability_response.id
-        entity_data['notability_request_timestamp'] = time.time()
-        notability_store[request.id] = entity_data
-        save_notability_data()
-        
-        print(f"[DEBUG] Manual notability evaluation started with ID: {notability_response.id}")
-        
-        return {
-            "message": "Notability evaluation started successfully",
-            "notability_request_id": notability_response.id
-        }
-        
+        logger.info("Starting manual notability evaluation")
+        notability_request_id = start_notability_evaluation(request.id, entity_data.get('sources', []))
     except Exception as e:
-        print(f"[DEBUG] Failed to start manual notability evaluation: {str(e)}")
-        print(f"[DEBUG] Exception type: {type(e)}")
-        import traceback
-        print(f"[DEBUG] Full traceback: {traceback.format_exc()}")
+        logger.exception("Failed to start manual notability evaluation: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to start notability evaluation: {str(e)}")
+    
+    # Another request started it after the check above
+    if notability_request_id is None:
+        raise HTTPException(status_code=400, detail="Notability evaluation already in progress.")
+    
+    logger.info("Manual notability evaluation started with ID %s", notability_request_id)
+    
+    return {
+        "message": "Notability evaluation started successfully",
+        "notability_request_id": notability_request_id
+    }
 
 @router.post("/notability/status", response_model=NotabilityStatusResponse)
 def check_notability_status(request: NotabilityStatusRequest):
     """Check the status of a notability evaluation request and parse response if completed"""
     
-    print(f"[DEBUG] Checking notability status for entity_id: {request.id}")
+    logs.bind(entity_id=request.id)
+    logger.debug("Checking notability status")
+    
+    # Catch up with changes made by other workers
+    load_notability_data()
     
     # Check if entity exists in notability store
     if request.id not in notability_store:
-        print(f"[DEBUG] Entity {request.id} not found in notability store")
+        logger.debug("Entity not found in notability store")
         raise HTTPException(status_code=404, detail="Entity not found in notability store")
     
     entity_data = notability_store[request.id]
-    print(f"[DEBUG] Entity data: {entity_data}")
+    logs.log_payload(logger, "Notability data: %s", entity_data)
     
     openai_notability_request_id = entity_data.get('openai_notability_request_id')
-    print(f"[DEBUG] OpenAI notability request ID: {openai_notability_request_id}")
+    logs.bind(response_id=openai_notability_request_id)
     
     if not openai_notability_request_id:
-        print(f"[DEBUG] No notability request ID found for entity {request.id}")
+        logger.debug("No notability request ID found")
         # Check if research was completed but notability evaluation failed to start
         if entity_data.get('sources') and len(entity_data.get('sources', [])) > 0:
-            raise HTTPException(status_code=400, detail="Research completed but notability evaluation failed to start. Please retry the research status check to trigger notability evaluation.")
+            raise HTTPException(status_code=400, detail="Research completed but notability evaluation failed to start. Please trigger it with POST /notability/notability/trigger.")
         else:
             raise HTTPException(status_code=400, detail="No notability request found for this entity. Please complete research first.")
     
@@ -643,17 +568,17 @@ def check_notability_status(request: NotabilityStatusRequest):
     retry_count = entity_data.get('retry_count', 0)
     
     if notability_timestamp and is_request_timed_out(notability_timestamp):
-        print(f"[DEBUG] Notability request timed out for entity {request.id}")
+        logger.info("Notability request timed out")
         
         if retry_count >= MAX_RETRIES:
-            print(f"[DEBUG] Max retries exceeded for entity {request.id}, marking as failed")
+            logger.warning("Max retries exceeded, marking as failed")
             # Mark as failed
-            entity_data['openai_notability_request_id'] = None
-            entity_data['notability_request_timestamp'] = None
-            entity_data['notability_status'] = 'failed'
-            entity_data['notability_rationale'] = 'Request timed out after multiple retries'
-            notability_store[request.id] = entity_data
-            save_notability_data()
+            notability_db.patch(request.id, {
+                'openai_notability_request_id': None,
+                'notability_request_timestamp': None,
+                'notability_status': 'failed',
+                'notability_rationale': 'Request timed out after multiple retries'
+            })
             
             return NotabilityStatusResponse(
                 status="failed",
@@ -663,7 +588,7 @@ def check_notability_status(request: NotabilityStatusRequest):
             )
         else:
             # Retry the request
-            print(f"[DEBUG] Retrying notability request for entity {request.id} (attempt {retry_count + 1})")
+            logger.info("Retrying notability request (attempt %d)", retry_count + 1)
             new_request_id = cancel_and_retry_notability_request(request.id, entity_data)
             return NotabilityStatusResponse(
                 status="pending",
@@ -672,51 +597,42 @@ def check_notability_status(request: NotabilityStatusRequest):
                 notability_rationale=None
             )
     
+    # Another worker is still starting the evaluation
+    if openai_notability_request_id == NOTABILITY_REQUEST_PENDING:
+        logger.debug("Notability evaluation is being started")
+        return NotabilityStatusResponse(
+            status="pending",
+            openai_notability_request_id=None,
+            notability_status=None,
+            notability_rationale=None
+        )
+    
     try:
-        print(f"[DEBUG] Calling OpenAI API to retrieve notability response for ID: {openai_notability_request_id}")
+        logger.debug("Retrieving notability response")
         # Retrieve the response from OpenAI
-        response = client.responses.retrieve(openai_notability_request_id)
-        print(f"[DEBUG] OpenAI notability response status: {response.status}")
+        response = prompts.retrieve(client, openai_notability_request_id)
+        logger.debug("Notability response status: %s", response.status)
         
         if response.status == 'completed':
             # Parse the response content for notability evaluation
             try:
-                print(f"[DEBUG] Notability response object: {response}")
-                
-                # Extract the content from the response output
-                content = None
-                if hasattr(response, 'output') and response.output:
-                    # Look for the last message in output that contains the JSON
-                    for item in reversed(response.output):
-                        if hasattr(item, 'content') and item.content:
-                            for content_item in item.content:
-                                if hasattr(content_item, 'text'):
-                                    content = content_item.text
-                                    break
-                            if content:
-                                break
-                
-                print(f"[DEBUG] Extracted notability content: {content}")
+                logs.log_payload(logger, "Notability response object: %s", response)
                 
-                # Parse JSON content to extract notability evaluation
-                if isinstance(content, str):
-                    parsed_content = json.loads(content)
-                else:
-                    parsed_content = content
+                # The JSON is in the last message of the response output
+                content = prompts.response_text(response)
+                logs.log_payload(logger, "Extracted notability content: %s", content)
+                parsed_content = json.loads(content) if content is not None else None
                 
                 # Extract notability status and rationale
                 notability_status = parsed_content.get('notability_status', '')
                 rationale = parsed_content.get('rationale', '')
                 
-                print(f"[DEBUG] Parsed notability_status: {notability_status}, rationale: {rationale}")
+                logger.info("Notability evaluated as %s", notability_status)
                 
                 # Update the notability store with the evaluation results
-                entity_data['notability_status'] = notability_status
-                entity_data['notability_rationale'] = rationale
-                notability_store[request.id] = entity_data
-                save_notability_data()
+                notability_db.patch(request.id, {'notability_status': notability_status, 'notability_rationale': rationale})
                 
-                print(f"[DEBUG] Updated notability data: notability_status={notability_status}, rationale={rationale}")
+                logs.log_payload(logger, "Notability rationale: %s", rationale)
                 
                 return NotabilityStatusResponse(
                     status="completed",
@@ -726,7 +642,7 @@ def check_notability_status(request: NotabilityStatusRequest):
                 )
                 
             except json.JSONDecodeError as e:
-                print(f"[DEBUG] Failed to parse notability response JSON: {str(e)}")
+                logger.warning("Failed to parse notability response JSON: %s", e)
                 return NotabilityStatusResponse(
                     status="completed",
                     openai_notability_request_id=openai_notability_request_id,
@@ -735,7 +651,7 @@ def check_notability_status(request: NotabilityStatusRequest):
                 )
                 
         elif response.status == 'failed':
-            print(f"[DEBUG] Notability evaluation failed")
+            logger.info("Notability evaluation failed")
             return NotabilityStatusResponse(
                 status="failed",
                 openai_notability_request_id=openai_notability_request_id,
@@ -744,7 +660,7 @@ def check_notability_status(request: NotabilityStatusRequest):
             )
         else:
             # Still pending/processing
-            print(f"[DEBUG] Notability evaluation still pending")
+            logger.debug("Notability evaluation still pending")
             return NotabilityStatusResponse(
                 status="pending",
                 openai_notability_request_id=openai_notability_request_id,
@@ -753,13 +669,10 @@ def check_notability_status(request: NotabilityStatusRequest):
             )
             
     except Exception as e:
-        print(f"[DEBUG] Exception in notability status check: {str(e)}")
-        print(f"[DEBUG] Exception type: {type(e)}")
-        import traceback
-        print(f"[DEBUG] Traceback: {traceback.format_exc()}")
+        logger.exception("Exception in notability status check: %s", e)
         raise HTTPException(status_code=500, detail=f"Error checking notability status: {str(e)}")
 
 # Function to check if notability data exists (for use by other modules)
 def notability_exists(entity_id: str) -> bool:
     """Check if notability data exists for an entity"""
-    return entity_id in notability_store 
\ No newline at end of file
+    return notability_db.get(entity_id) is not None 
\ No newline at end of file
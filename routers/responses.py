@@ -0,0 +1,108 @@
+from fastapi import APIRouter, HTTPException
+from typing import List, Optional
+from datetime import datetime
+from models import ResponseOwner
+from storage import open_store
+
+# Create router for response index endpoints
+router = APIRouter(
+    prefix="/responses",
+    tags=["responses"],
+    responses={404: {"description": "Not found"}},
+)
+
+# Reverse index from OpenAI response ID to the job that created it, maintained on every job creation
+responses_file = "responses.txt"
+responses_db = open_store(
+    responses_file,
+    "# OpenAI response index - response ID -> {store, entity_id, phase, section, created_at}",
+    indexes=('entity_id',)
+)
+responses_store = responses_db.data
+
+def load_responses():
+    responses_db.load()
+
+def save_responses(*response_ids):
+    responses_db.save(*response_ids)
+
+def index_response(response_id: str, store: str, entity_id: str, phase: str, section: Optional[str] = None,
+                   created_at: Optional[str] = None):
+    """Record which job a newly created response belongs to"""
+    responses_store[response_id] = {
+        'id': response_id,
+        'store': store,
+        'entity_id': entity_id,
+        'phase': phase,
+        'section': section,
+        'created_at': created_at or datetime.utcnow().isoformat()
+    }
+    save_responses(response_id)
+
+def lookup_response(response_id: str) -> Optional[dict]:
+    """Find the job a response ID belongs to"""
+    load_responses()
+    return responses_store.get(response_id)
+
+def rebuild_response_index() -> int:
+    """Index every response ID already referenced by the notability and draft stores"""
+    from routers.notability import notability_store, load_notability_data, NOTABILITY_REQUEST_PENDING
+    from routers.drafts import drafts_store, load_drafts
+    
+    load_notability_data()
+    load_drafts()
+    
+    indexed = []
+    for entity_id, notability_data in list(notability_store.items()):
+        for phase in ('research', 'notability'):
+            response_id = notability_data.get(f'openai_{phase}_request_id')
+            if response_id and response_id != NOTABILITY_REQUEST_PENDING:
+                timestamp = notability_data.get(f'{phase}_request_timestamp')
+                responses_store[response_id] = {
+                    'id': response_id,
+                    'store': 'notability',
+                    'entity_id': entity_id,
+                    'phase': phase,
+                    'section': None,
+                    'created_at': datetime.utcfromtimestamp(timestamp).isoformat() if timestamp else None
+                }
+                indexed.append(response_id)
+    
+    for draft_id, draft_data in list(drafts_store.items()):
+        for section_key, job_id in draft_data.get('statuses', {}).items():
+            # Sections whose job couldn't be created get a local fallback ID instead of a response ID
+            if job_id and job_id.startswith('resp_'):
+                responses_store[job_id] = {
+                    'id': job_id,
+                    'store': 'drafts',
+                    'entity_id': draft_id,
+                    'phase': 'draft',
+                    'section': section_key.replace('_id', ''),
+                    'created_at': draft_data.get('created_at')
+                }
+                indexed.append(job_id)
+    
+    if indexed:
+        save_responses(*indexed)
+    return len(indexed)
+
+# Load index on module import
+load_responses()
+
+@router.get("/", response_model=List[ResponseOwner])
+def list_responses(entity_id: str):
+    """Get every response created for an entity or draft"""
+    return [ResponseOwner(**record) for record in responses_db.find(entity_id=entity_id)]
+
+@router.post("/rebuild", response_model=dict)
+def rebuild_responses():
+    """Re-index every response ID referenced by the notability and draft stores"""
+    return {"indexed": rebuild_response_index()}
+
+@router.get("/{response_id}", response_model=ResponseOwner)
+def get_response_owner(response_id: str):
+    """Get the entity, phase and section that own an OpenAI response ID"""
+    record = lookup_response(response_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Response ID not found in index")
+    return ResponseOwner(**record)
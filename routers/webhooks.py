@@ -0,0 +1,100 @@
+from fastapi import APIRouter, HTTPException, Request
+from typing import Optional, Tuple
+import asyncio
+import json
+import os
+from dotenv import load_dotenv
+from models import WebhookResponse, ResearchStatusRequest, NotabilityStatusRequest
+from routers.entities import entities_store, load_entities
+from routers.notability import notability_store, load_notability_data, check_research_status, check_notability_status
+from routers.drafts import update_draft_progress
+from routers.responses import lookup_response
+from webhook_signing import verify, WebhookVerificationError
+import logs
+
+logger = logs.get_logger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Create router for webhook endpoints
+router = APIRouter(
+    prefix="/webhooks",
+    tags=["webhooks"],
+    responses={400: {"description": "Invalid webhook delivery"}},
+)
+
+# Signing secret of the OpenAI webhook endpoint (whsec_...)
+OPENAI_WEBHOOK_SECRET = os.getenv('OPENAI_WEBHOOK_SECRET')
+
+# Events sent when a background response reaches a final state
+RESPONSE_FINAL_EVENTS = {"response.completed", "response.failed", "response.cancelled", "response.incomplete"}
+
+def find_response_owner(response_id: str) -> Optional[Tuple[str, str]]:
+    """Find the job a response ID belongs to, as (phase, entity or draft ID)"""
+    record = lookup_response(response_id)
+    if record is None:
+        return None
+    return record['phase'], record['entity_id']
+
+@router.post("/openai", response_model=WebhookResponse)
+async def openai_webhook(request: Request):
+    """Receive OpenAI background response events and run the matching completion logic"""
+    
+    if not OPENAI_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="OPENAI_WEBHOOK_SECRET is not configured")
+    
+    body = await request.body()
+    try:
+        verify(OPENAI_WEBHOOK_SECRET, request.headers, body)
+    except WebhookVerificationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        event = json.loads(body)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Webhook body is not valid JSON")
+    
+    event_type = event.get('type')
+    response_id = (event.get('data') or {}).get('id')
+    
+    if event_type not in RESPONSE_FINAL_EVENTS or not response_id:
+        return WebhookResponse(status="ignored", event_type=event_type, response_id=response_id)
+    
+    logs.bind(response_id=response_id)
+    owner = find_response_owner(response_id)
+    if owner is None:
+        logger.info("Webhook for unknown response ignored")
+        return WebhookResponse(status="ignored", event_type=event_type, response_id=response_id)
+    
+    phase, owner_id = owner
+    logs.bind(entity_id=owner_id)
+    result = WebhookResponse(status="processed", event_type=event_type, response_id=response_id, phase=phase, owner_id=owner_id)
+    
+    # Deliveries can be repeated, so only run the completion logic while the job is still pending
+    if phase in ('research', 'notability'):
+        load_notability_data()
+        # A retried job gets a new response ID - events for the one it replaced are stale
+        if notability_store.get(owner_id, {}).get(f'openai_{phase}_request_id') != response_id:
+            result.status = "already_processed"
+            return result
+    
+    if phase == 'research':
+        load_entities()
+        if entities_store.get(owner_id, {}).get('status') != 'researching':
+            result.status = "already_processed"
+            return result
+        await asyncio.to_thread(check_research_status, ResearchStatusRequest(id=owner_id))
+    
+    elif phase == 'notability':
+        if notability_store[owner_id].get('notability_status') is not None:
+            result.status = "already_processed"
+            return result
+        await asyncio.to_thread(check_notability_status, NotabilityStatusRequest(id=owner_id))
+    
+    elif phase == 'draft':
+        progress = await update_draft_progress(owner_id)
+        if not progress.updated_sections:
+            result.status = "already_processed"
+    
+    return result
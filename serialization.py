@@ -0,0 +1,123 @@
+"""
+Response serialization helpers shared by the list endpoints.
+
+Clients that send `Accept: application/x-ndjson` get one JSON record per line, streamed as each
+record is validated, instead of a single JSON array built in memory. A whole listing (no `limit`)
+is also read from the store as it streams, so it is never held in memory at once. Pages of a
+paginated list carry the cursor of the next page in the X-Next-Cursor header.
+"""
+
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Type
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from storage import codec
+
+# Load environment variables
+load_dotenv()
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Largest page a list endpoint returns at once
+MAX_PAGE_SIZE = 1000
+
+# Records read from our own stores were validated when they were written, so by default they are
+# serialized straight from the stored dicts instead of being rebuilt as Pydantic models first
+FAST_JSON_RESPONSES = os.getenv('FAST_JSON_RESPONSES', 'true').lower() in ('1', 'true', 'yes')
+
+class RawJSONResponse(Response):
+    """JSON response for content that is already plain JSON data (orjson when installed)"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return codec.dumps_bytes(content)
+
+def wants_ndjson(request: Request) -> bool:
+    """Whether the client asked for newline-delimited JSON"""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+def iter_ndjson(records: Iterable[dict], model: Optional[Type[BaseModel]]) -> Iterator[str]:
+    """Validate and serialize records one at a time, one JSON document per line.
+
+    With no model the records are written as they are (used for projected records).
+    """
+    for record in records:
+        if model is None:
+            yield codec.dumps(record) + "\n"
+        elif FAST_JSON_RESPONSES:
+            yield codec.dumps(trusted_dump(record, model)) + "\n"
+        else:
+            yield model(**record).model_dump_json() + "\n"
+
+def ndjson_response(records: Iterable[dict], model: Optional[Type[BaseModel]]) -> StreamingResponse:
+    """Stream records as NDJSON - only the record being written is held as a model at any time"""
+    return StreamingResponse(iter_ndjson(records, model), media_type=NDJSON_MEDIA_TYPE)
+
+def trusted_dump(record: dict, model: Type[BaseModel]) -> Dict[str, Any]:
+    """The fields of `model` taken straight from a stored record, without validating them.
+
+    Gives the same output as model(**record).model_dump(mode='json') for records our own handlers
+    wrote - extra stored fields are dropped and missing ones get the model's defaults.
+    """
+    dumped = {}
+    for field_name, field in model.model_fields.items():
+        if field_name in record:
+            dumped[field_name] = record[field_name]
+        else:
+            dumped[field_name] = field.get_default(call_default_factory=True)
+    return dumped
+
+def record_response(record: dict, model: Type[BaseModel]):
+    """A single stored record as a response"""
+    if FAST_JSON_RESPONSES:
+        return RawJSONResponse(trusted_dump(record, model))
+    return model(**record)
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[List[str]]:
+    """Split a comma separated `fields` parameter, rejecting fields the model doesn't have"""
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in model.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+def list_response(request: Request, response: Response, records: List[dict], model: Type[BaseModel],
+                  next_cursor: Optional[str] = None, projected: bool = False):
+    """Return a page of records as a JSON array or NDJSON, with the next page's cursor in a header.
+
+    Projected records are partial, so they are returned as they are rather than validated. With
+    FAST_JSON_RESPONSES full records skip validation too (see trusted_dump).
+    """
+    if wants_ndjson(request):
+        result = ndjson_response(records, None if projected else model)
+    elif projected:
+        result = RawJSONResponse(records)
+    elif FAST_JSON_RESPONSES:
+        result = RawJSONResponse([trusted_dump(record, model) for record in records])
+    else:
+        # Headers set on the injected response are copied onto the one FastAPI builds from the list
+        result = [model(**record) for record in records]
+
+    if next_cursor is not None:
+        (response if isinstance(result, list) else result).headers[NEXT_CURSOR_HEADER] = next_cursor
+    return result
+
+def query_response(request: Request, response: Response, store, model: Type[BaseModel],
+                   criteria: Optional[Dict[str, Any]] = None, since: Optional[Tuple[str, Any]] = None,
+                   after: Optional[str] = None, limit: Optional[int] = None,
+                   fields: Optional[Sequence[str]] = None):
+    """Query a store (see Store.query) and return the page through list_response.
+
+    An NDJSON request without a limit streams straight from Store.scan(), so records are read,
+    encoded and sent one at a time. Pages are at most MAX_PAGE_SIZE records and are built in full.
+    """
+    projected = fields is not None
+    if wants_ndjson(request) and limit is None:
+        return ndjson_response(store.scan(criteria, since, after, fields), None if projected else model)
+    records, next_cursor = store.query(criteria=criteria, since=since, after=after, limit=limit, fields=fields)
+    return list_response(request, response, records, model, next_cursor, projected=projected)
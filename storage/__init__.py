@@ -0,0 +1,53 @@
+# Storage package - persistence for the entity, notability, draft and article stores
+import os
+from typing import Any, Dict, Iterable, List, Optional
+from dotenv import load_dotenv
+
+from storage.jsonl import JsonLinesEngine
+from storage.locking import LockTimeout, file_lock, lock_stats
+from storage.sqlite import SQLiteEngine
+from storage.store import Store, UpdateConflict
+from storage.wal import AppendLogEngine
+
+# Load environment variables
+load_dotenv()
+
+# "wal" appends per-record mutations to <file>.log and compacts in the background,
+# "jsonl" rewrites the whole file on every save, "sqlite" keeps every store in one indexed database
+STORAGE_ENGINE = os.getenv('STORAGE_ENGINE', 'wal')
+STORAGE_SQLITE_PATH = os.getenv('STORAGE_SQLITE_PATH', 'leviathan.db')
+# The log is compacted once it is larger than both this and the snapshot
+STORAGE_COMPACT_MIN_BYTES = int(os.getenv('STORAGE_COMPACT_MIN_BYTES', str(1024 * 1024)))
+# Stores opened with lazy=True (drafts, articles) decode records on access instead of on load - wal engine only
+STORAGE_LAZY = os.getenv('STORAGE_LAZY', 'false').lower() in ('1', 'true', 'yes')
+STORAGE_LAZY_CACHE_SIZE = int(os.getenv('STORAGE_LAZY_CACHE_SIZE', '256'))  # Decoded records kept per lazy store
+# Generations of changes the sqlite engine keeps for workers catching up - one further behind re-reads the table
+STORAGE_CHANGE_RETENTION = int(os.getenv('STORAGE_CHANGE_RETENTION', '10000'))
+
+# Every store opened by the application, keyed by file name
+stores: Dict[str, Store] = {}
+
+def open_store(filename: str, header: str, defaults: Optional[Dict[str, Any]] = None,
+               indexes: Iterable[str] = (), lazy: bool = False) -> Store:
+    """Create a store for a JSON-lines file using the configured storage engine.
+
+    `indexes` names the record fields that status queries filter on; only the sqlite engine uses them.
+    `lazy` marks stores of large records that are worth decoding on access when STORAGE_LAZY is set.
+    """
+    if STORAGE_ENGINE == 'wal':
+        engine = AppendLogEngine(filename, header, compact_min_bytes=STORAGE_COMPACT_MIN_BYTES)
+    elif STORAGE_ENGINE == 'jsonl':
+        engine = JsonLinesEngine(filename, header)
+    elif STORAGE_ENGINE == 'sqlite':
+        engine = SQLiteEngine(STORAGE_SQLITE_PATH, filename, indexes=indexes,
+                              change_retention=STORAGE_CHANGE_RETENTION)
+    else:
+        raise ValueError(f"Unknown STORAGE_ENGINE '{STORAGE_ENGINE}' (expected 'wal', 'jsonl' or 'sqlite')")
+    lazy_cache_size = STORAGE_LAZY_CACHE_SIZE if lazy and STORAGE_LAZY and STORAGE_ENGINE == 'wal' else None
+    store = Store(filename, engine, defaults=defaults, lazy_cache_size=lazy_cache_size)
+    stores[filename] = store
+    return store
+
+def store_stats() -> List[Dict[str, Any]]:
+    """Record counts and reload cache counters for every open store"""
+    return [store.stats() for store in stores.values()]
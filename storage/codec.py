@@ -0,0 +1,37 @@
+# JSON encoding for persisted records and API responses - orjson when installed, the standard library otherwise
+import json
+import os
+from typing import Any, Union
+from dotenv import load_dotenv
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Load environment variables
+load_dotenv()
+
+# orjson writes compact JSON ({"id":"x"}) where json.dumps adds spaces - both read back the same
+FAST_JSON = orjson is not None and os.getenv('FAST_JSON', 'true').lower() in ('1', 'true', 'yes')
+
+# orjson's decode error subclasses this one, so callers only need to catch it
+JSONDecodeError = json.JSONDecodeError
+
+def dumps(obj: Any) -> str:
+    """Serialize to a JSON string"""
+    if FAST_JSON:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(obj)
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Serialize to UTF-8 encoded JSON, skipping the str round trip where possible"""
+    if FAST_JSON:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj).encode('utf-8')
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Parse JSON from a string or UTF-8 bytes"""
+    if FAST_JSON:
+        return orjson.loads(data)
+    return json.loads(data)
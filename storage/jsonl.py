@@ -0,0 +1,102 @@
+import os
+from typing import Dict, Iterable, Optional
+
+from storage import codec
+from storage.locking import file_lock
+
+def file_fingerprint(filename: str):
+    """Identity of a file's current contents - changes on rewrite, append, truncate or replace.
+
+    The inode catches replaces (tmp file + os.replace). ctime catches an mtime set back with utime().
+    In-place rewrites to the same size within the timestamp granularity would still look unchanged,
+    so JsonLinesEngine keeps its file's mtime strictly increasing.
+    """
+    try:
+        st = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+
+def parse_records(lines: Iterable[str], records: Dict[str, dict]) -> Dict[str, dict]:
+    """Parse JSON lines into an ID -> record dictionary, skipping comments and bad lines"""
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            try:
+                data = codec.loads(line)
+                if 'id' in data:
+                    records[data['id']] = data
+            except codec.JSONDecodeError:
+                continue
+    return records
+
+class JsonLinesEngine:
+    """Original storage format - one JSON record per line, whole file rewritten on every save"""
+
+    name = "jsonl"
+
+    def __init__(self, filename: str, header: str):
+        self.filename = filename
+        self.header = header
+        # Bytes read by read() and written by write() - reported as store metrics
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def fingerprint(self):
+        return file_fingerprint(self.filename)
+
+    def read(self) -> Dict[str, dict]:
+        """Read every record currently persisted"""
+        records = {}
+        if os.path.exists(self.filename):
+            with file_lock(self.filename, 'r') as f:
+                parse_records(f, records)
+                self.bytes_read += f.tell()
+        return records
+
+    def write(self, data: Dict[str, dict], changed_ids: Optional[Iterable[str]] = None):
+        """Rewrite the whole file - changed_ids is ignored since this format has no point writes.
+
+        Returns None since a full rewrite gives no way to tell whether someone else wrote in between.
+        """
+        # Open without truncating so shared readers never see a half-empty file, then truncate
+        # once we hold the exclusive lock
+        with file_lock(self.filename, 'a', shared=False) as f:
+            self._rewrite(f, data.values())
+
+    def put(self, record: dict, expected, data: Dict[str, dict]) -> Optional[tuple]:
+        """Rewrite the file with `record` in place of its old version, unless the file changed since
+        it had the fingerprint `expected`.
+
+        This format has no point writes, so the whole file is still rewritten - but under one
+        exclusive lock with the check, so it can't undo another writer's changes. Returns the
+        fingerprints from just before and just after the write, or None when another writer got
+        there first - the caller must reload and retry.
+        """
+        with file_lock(self.filename, 'a', shared=False) as f:
+            before = self.fingerprint()
+            if before != expected:
+                return None
+            records = [record if existing_id == record['id'] else existing for existing_id, existing in data.items()]
+            if record['id'] not in data:
+                records.append(record)
+            self._rewrite(f, records)
+            f.flush()
+            after = self.fingerprint()
+        return before, after
+
+    def _rewrite(self, f, records: Iterable[dict]):
+        """Replace the file's contents - caller must hold the exclusive lock"""
+        previous_mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+        f.seek(0)
+        f.truncate()
+        f.write(self.header + "\n")
+        for record in records:
+            f.write(codec.dumps(record) + '\n')
+        self.bytes_written += f.tell()
+        f.flush()
+        # Two rewrites to the same size within one clock tick would get the same fingerprint, so
+        # move the mtime past the previous one - other workers then never miss a rewrite
+        st = os.fstat(f.fileno())
+        if st.st_mtime_ns <= previous_mtime_ns:
+            os.utime(f.fileno(), ns=(st.st_atime_ns, previous_mtime_ns + 1))
@@ -0,0 +1,332 @@
+import json
+import mmap
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from storage import codec
+from storage.jsonl import file_fingerprint
+from storage.locking import file_lock
+
+# Line prefixes of records whose first key is "id" (spaced from json.dumps, compact from orjson)
+# and of log entries
+_RECORD_PREFIXES = (b'{"id": ', b'{"id":')
+_PUT_PREFIXES = (b'{"op": "put", "record": {"id": ', b'{"op": "put", "record": {"id":')
+_DELETE_PREFIXES = (b'{"op": "delete", "id": ',)
+# Longest ID the prefix fast path reads - anything longer falls back to parsing the line
+_MAX_ID_BYTES = 1024
+
+_decoder = json.JSONDecoder()
+
+class Record(dict):
+    """Decoded record - a dict subclass only so it can be weakly referenced"""
+    __slots__ = ('__weakref__',)
+
+def _prefixed_id(line: bytes, prefixes: Tuple[bytes, ...]):
+    """ID right after one of the given prefixes, without parsing the rest of the line"""
+    prefix = next((prefix for prefix in prefixes if line.startswith(prefix)), None)
+    if prefix is None:
+        return None
+    text = line[len(prefix):len(prefix) + _MAX_ID_BYTES].decode('utf-8', errors='ignore')
+    try:
+        record_id, _ = _decoder.raw_decode(text)
+    except codec.JSONDecodeError:
+        return None
+    return record_id if isinstance(record_id, str) else None
+
+def _scan_lines(buffer, start: int, end: int) -> Iterator[Tuple[int, int]]:
+    """(offset, length) of every complete line in buffer[start:end]"""
+    position = start
+    while position < end:
+        newline = buffer.find(b'\n', position, end)
+        if newline == -1:
+            return
+        if newline > position:
+            yield position, newline - position
+        position = newline + 1
+
+class LazyRecords:
+    """ID -> record mapping over an AppendLogEngine that decodes records only when accessed.
+
+    Instead of parsing every line, refresh() keeps a byte-offset index of the latest line for each
+    ID: the snapshot is memory-mapped and scanned for line breaks, and only the ID at the start of
+    each line is decoded. Records are parsed on first access and kept in an LRU of `cache_size`
+    entries. A record that is still referenced elsewhere (e.g. by a handler that is about to save
+    it) keeps being returned as the same object even after it leaves the LRU.
+
+    Records assigned with `records[id] = ...` stay in memory until they are saved.
+    """
+
+    def __init__(self, engine, cache_size: int = 256, prepare: Optional[Callable[[dict], dict]] = None):
+        self.engine = engine
+        self.cache_size = cache_size
+        self.prepare = prepare or (lambda record: record)
+        # ID -> (in log?, offset, length) of the line holding the record's latest version
+        self._index: Dict[str, Tuple[bool, int, int]] = {}
+        self._cache: "OrderedDict[str, dict]" = OrderedDict()
+        self._live = weakref.WeakValueDictionary()
+        self._pending: Dict[str, dict] = {}
+        self._deleted = set()
+        self._lock = threading.RLock()
+        self._snapshot_fingerprint = None
+        self._snapshot_map = None
+        self._log_ino = None
+        self._log_end = 0
+        self.decodes = 0
+
+    # Index maintenance
+
+    def _index_line(self, buffer, position: int, length: int, in_log: bool, offset: int, own_ids=(), changed=None):
+        """Index the line at buffer[position:position + length], which sits at `offset` in its file"""
+        # Only the start of the line is copied unless the ID can't be read from a known prefix
+        line = buffer[position:position + min(length, len(_PUT_PREFIXES[0]) + _MAX_ID_BYTES)]
+        if in_log:
+            record_id, deleted = _prefixed_id(line, _PUT_PREFIXES), False
+            if record_id is None:
+                record_id, deleted = _prefixed_id(line, _DELETE_PREFIXES), True
+            if record_id is None:
+                try:
+                    entry = codec.loads(buffer[position:position + length])
+                except codec.JSONDecodeError:
+                    # Torn append from a crash
+                    return
+                deleted = entry.get('op') == 'delete'
+                record_id = entry.get('id') if deleted else (entry.get('record') or {}).get('id')
+                if record_id is None:
+                    return
+        else:
+            record_id, deleted = _prefixed_id(line, _RECORD_PREFIXES), False
+            if record_id is None:
+                if line.startswith(b'#'):
+                    return
+                try:
+                    record_id = codec.loads(buffer[position:position + length]).get('id')
+                except (codec.JSONDecodeError, AttributeError):
+                    return
+                if record_id is None:
+                    return
+
+        if deleted:
+            self._index.pop(record_id, None)
+        else:
+            self._index[record_id] = (in_log, offset, length)
+        if changed is not None and record_id not in own_ids:
+            changed.add(record_id)
+
+    def _map_snapshot(self):
+        if self._snapshot_map is not None:
+            self._snapshot_map.close()
+            self._snapshot_map = None
+        if os.path.exists(self.engine.filename) and os.path.getsize(self.engine.filename) > 0:
+            with open(self.engine.filename, 'rb') as f:
+                self._snapshot_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def refresh(self, own_ids: Iterable[str] = ()) -> bool:
+        """Bring the index up to date with the files, returning whether anything changed.
+
+        Only the part of the log appended since the last refresh is scanned, unless the snapshot was
+        replaced or the log truncated (a compaction), which rebuilds the index. Decoded records that
+        changed on disk are dropped - except `own_ids`, which this process just wrote itself.
+        """
+        own_ids = set(own_ids)
+        with self._lock, file_lock(self.engine.log_filename, 'ab+', shared=True) as log:
+            snapshot_fingerprint = file_fingerprint(self.engine.filename)
+            log_stat = os.fstat(log.fileno())
+
+            rebuild = (snapshot_fingerprint != self._snapshot_fingerprint or log_stat.st_ino != self._log_ino
+                       or log_stat.st_size < self._log_end)
+            if not rebuild and log_stat.st_size == self._log_end:
+                self._settle(own_ids)
+                return False
+
+            changed = set()
+            if rebuild:
+                self._index = {}
+                self._map_snapshot()
+                if self._snapshot_map is not None:
+                    for offset, length in _scan_lines(self._snapshot_map, 0, len(self._snapshot_map)):
+                        self._index_line(self._snapshot_map, offset, length, False, offset)
+                    self.engine.bytes_read += len(self._snapshot_map)
+                self._log_end = 0
+                self._cache.clear()
+                self._live = weakref.WeakValueDictionary()
+
+            if log_stat.st_size > self._log_end:
+                log.seek(self._log_end)
+                appended = log.read(log_stat.st_size - self._log_end)
+                self.engine.bytes_read += len(appended)
+                scanned = 0
+                for offset, length in _scan_lines(appended, 0, len(appended)):
+                    self._index_line(appended, offset, length, True, self._log_end + offset, own_ids, changed)
+                    scanned = offset + length + 1
+                self._log_end += scanned
+
+            for record_id in changed:
+                self._cache.pop(record_id, None)
+                self._live.pop(record_id, None)
+            self._settle(own_ids)
+
+            self._snapshot_fingerprint = snapshot_fingerprint
+            self._log_ino = log_stat.st_ino
+            return True
+
+    def _settle(self, own_ids: Iterable[str]):
+        """Saved records no longer need pinning - keep them as recently used instead"""
+        for record_id in own_ids:
+            self._deleted.discard(record_id)
+            record = self._pending.pop(record_id, None)
+            if record is None:
+                record = self._live.get(record_id)
+            elif isinstance(record, Record):
+                self._live[record_id] = record
+            if record is not None and record_id in self._index:
+                self._remember(record_id, record)
+
+    def invalidate(self):
+        """Make the next refresh() rebuild the index from scratch"""
+        with self._lock:
+            self._snapshot_fingerprint = None
+
+    # Record access
+
+    def _remember(self, record_id: str, record: dict):
+        self._cache[record_id] = record
+        self._cache.move_to_end(record_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _decode(self, record_id: str) -> Optional[dict]:
+        location = self._index.get(record_id)
+        if location is None:
+            return None
+        in_log, offset, length = location
+        if in_log:
+            # Hold the shared log lock so a compaction can't truncate the line away while we read it
+            with file_lock(self.engine.log_filename, 'rb') as log:
+                # A compaction replaces the snapshot and truncates the log, invalidating log offsets
+                if (file_fingerprint(self.engine.filename) != self._snapshot_fingerprint
+                        or os.fstat(log.fileno()).st_size < offset + length):
+                    return None
+                line = os.pread(log.fileno(), length, offset)
+            record = codec.loads(line)['record']
+        else:
+            record = codec.loads(self._snapshot_map[offset:offset + length])
+        self.decodes += 1
+        return self.prepare(Record(record))
+
+    def get(self, record_id: str, default=None):
+        return self._lookup(record_id, default, remember=True)
+
+    def peek(self, record_id: str, default=None):
+        """Like get(), but a record that isn't decoded yet is decoded without being cached - for
+        scans that only read a few fields of every record"""
+        return self._lookup(record_id, default, remember=False)
+
+    def _lookup(self, record_id: str, default, remember: bool):
+        with self._lock:
+            if record_id in self._pending:
+                return self._pending[record_id]
+            if record_id in self._deleted:
+                return default
+            record = self._cache.get(record_id)
+            if record is None:
+                record = self._live.get(record_id)
+            if record is None:
+                record = self._decode(record_id)
+                if record is None:
+                    if record_id in self._index:
+                        # The log was compacted under us - re-index and try once more
+                        self.refresh()
+                        record = self._decode(record_id)
+                    if record is None:
+                        return default
+                if not remember:
+                    return record
+                self._live[record_id] = record
+            if remember:
+                self._remember(record_id, record)
+            return record
+
+    def __getitem__(self, record_id: str) -> dict:
+        record = self.get(record_id)
+        if record is None:
+            raise KeyError(record_id)
+        return record
+
+    def __setitem__(self, record_id: str, record: dict):
+        with self._lock:
+            self._deleted.discard(record_id)
+            self._pending[record_id] = record
+            self._cache.pop(record_id, None)
+            self._live.pop(record_id, None)
+
+    def __delitem__(self, record_id: str):
+        with self._lock:
+            if record_id not in self:
+                raise KeyError(record_id)
+            self._pending.pop(record_id, None)
+            self._cache.pop(record_id, None)
+            self._live.pop(record_id, None)
+            self._deleted.add(record_id)
+
+    def discard(self, record_id: str):
+        """Forget the in-memory version of a record, so the next access decodes the persisted one"""
+        with self._lock:
+            self._pending.pop(record_id, None)
+            self._cache.pop(record_id, None)
+            self._live.pop(record_id, None)
+
+    def pop(self, record_id: str, *default):
+        with self._lock:
+            record = self.get(record_id)
+            if record is None:
+                if default:
+                    return default[0]
+                raise KeyError(record_id)
+            del self[record_id]
+            return record
+
+    def setdefault(self, record_id: str, default=None):
+        with self._lock:
+            record = self.get(record_id)
+            if record is None:
+                self[record_id] = default
+                return default
+            return record
+
+    def __contains__(self, record_id) -> bool:
+        with self._lock:
+            if record_id in self._pending:
+                return True
+            return record_id in self._index and record_id not in self._deleted
+
+    def keys(self):
+        with self._lock:
+            keys = [record_id for record_id in self._index if record_id not in self._deleted]
+            keys += [record_id for record_id in self._pending if record_id not in self._index]
+            return keys
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    def values(self):
+        """Every record - decoded one at a time, so iterating touches the whole store"""
+        for record_id in self.keys():
+            record = self.get(record_id)
+            if record is not None:
+                yield record
+
+    def items(self):
+        for record_id in self.keys():
+            record = self.get(record_id)
+            if record is not None:
+                yield record_id, record
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'decoded': len(self._cache), 'decodes': self.decodes}
@@ -0,0 +1,92 @@
+import fcntl
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+import metrics
+
+# Load environment variables
+load_dotenv()
+
+# Seconds to wait for a file lock before giving up - unset means wait forever
+LOCK_TIMEOUT = float(os.getenv('STORAGE_LOCK_TIMEOUT')) if os.getenv('STORAGE_LOCK_TIMEOUT') else None
+
+class LockTimeout(TimeoutError):
+    """Raised when a file lock could not be acquired within the timeout"""
+
+# Wait-time statistics per (filename, mode)
+_lock_stats: Dict[tuple, Dict[str, Any]] = {}
+_lock_stats_guard = threading.Lock()
+
+def _record_wait(filename: str, mode: str, waited: float, timed_out: bool = False):
+    with _lock_stats_guard:
+        stats = _lock_stats.setdefault((filename, mode), {
+            'acquisitions': 0,
+            'timeouts': 0,
+            'total_wait_seconds': 0.0,
+            'max_wait_seconds': 0.0
+        })
+        if timed_out:
+            stats['timeouts'] += 1
+        else:
+            stats['acquisitions'] += 1
+        stats['total_wait_seconds'] += waited
+        stats['max_wait_seconds'] = max(stats['max_wait_seconds'], waited)
+    if timed_out:
+        metrics.LOCK_TIMEOUTS.inc(file=filename, mode=mode)
+    metrics.LOCK_WAIT.observe(waited, file=filename, mode=mode)
+
+def lock_stats() -> List[Dict[str, Any]]:
+    """Lock acquisitions, timeouts and wait times for every file locked so far"""
+    with _lock_stats_guard:
+        return [{'name': filename, 'mode': mode, **stats} for (filename, mode), stats in _lock_stats.items()]
+
+def _acquire(f, operation: int, timeout: Optional[float]):
+    if timeout is None:
+        fcntl.flock(f.fileno(), operation)
+        return
+    deadline = time.monotonic() + timeout
+    delay = 0.001
+    while True:
+        try:
+            fcntl.flock(f.fileno(), operation | fcntl.LOCK_NB)
+            return
+        except BlockingIOError:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LockTimeout(f"Timed out after {timeout}s waiting for lock on {f.name}")
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.05)
+
+@contextmanager
+def file_lock(filename, mode='r', shared=None, timeout=LOCK_TIMEOUT):
+    """Context manager for file locking.
+
+    Readers take a shared lock (LOCK_SH) so they don't serialize with each other, writers take an
+    exclusive lock (LOCK_EX). `shared` defaults to True only for read-only modes. Raises
+    LockTimeout if the lock isn't acquired within `timeout` seconds (None waits forever).
+    """
+    if shared is None:
+        shared = mode in ('r', 'rb')
+    lock_mode = 'shared' if shared else 'exclusive'
+
+    f = open(filename, mode)
+    start = time.monotonic()
+    try:
+        _acquire(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX, timeout)
+    except LockTimeout:
+        _record_wait(filename, lock_mode, time.monotonic() - start, timed_out=True)
+        f.close()
+        raise
+    except BaseException:
+        f.close()
+        raise
+    _record_wait(filename, lock_mode, time.monotonic() - start)
+
+    try:
+        yield f
+    finally:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        f.close()
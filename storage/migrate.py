@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Import the JSON-lines stores into the SQLite database used by STORAGE_ENGINE=sqlite.
+Usage: python -m storage.migrate [--db leviathan.db] [file ...]
+
+Records already in the database are overwritten by the ones in the files, so the import
+can be re-run safely. Indexes are created when the application opens the stores.
+"""
+
+import argparse
+import os
+import sys
+
+from storage import STORAGE_SQLITE_PATH
+from storage.jsonl import JsonLinesEngine
+from storage.sqlite import SQLiteEngine
+from storage.wal import AppendLogEngine
+
+DEFAULT_FILES = ["entities.txt", "notability.txt", "drafts.txt", "articles.txt"]
+
+def read_jsonl_store(filename: str) -> dict:
+    """Read a JSON-lines store, replaying its append-only log if there is one"""
+    if os.path.exists(filename + '.log'):
+        # Never compact from the migration tool - the application owns the snapshot header
+        return AppendLogEngine(filename, header="", compact_min_bytes=sys.maxsize).read()
+    return JsonLinesEngine(filename, header="").read()
+
+def migrate(db_path: str, filenames: list) -> int:
+    """Copy every record of the given files into their tables, returning the number imported"""
+    total = 0
+    for filename in filenames:
+        if not os.path.exists(filename):
+            print(f"Skipping {filename} - file not found")
+            continue
+        records = read_jsonl_store(filename)
+        engine = SQLiteEngine(db_path, filename)
+        engine.write(records)
+        print(f"Imported {len(records)} records from {filename} into {db_path} (table '{engine.table}')")
+        total += len(records)
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Import the JSON-lines stores into SQLite")
+    parser.add_argument("files", nargs="*", default=DEFAULT_FILES, help="Store files to import")
+    parser.add_argument("--db", default=STORAGE_SQLITE_PATH, help="SQLite database path")
+    args = parser.parse_args()
+
+    migrate(args.db, args.files)
+
+if __name__ == "__main__":
+    main()
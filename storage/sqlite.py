@@ -0,0 +1,251 @@
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from storage import codec
+
+def table_name(filename: str) -> str:
+    """Derive the table name for a store from its file name (entities.txt -> entities)"""
+    name = os.path.splitext(os.path.basename(filename))[0]
+    if not re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', name):
+        raise ValueError(f"Cannot derive a table name from '{filename}'")
+    return name
+
+def check_field(field: str):
+    """Reject field names that can't be safely embedded in a JSON path"""
+    if not re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', field):
+        raise ValueError(f"Invalid field name '{field}'")
+
+class SQLiteEngine:
+    """One table per store in a shared SQLite database running in WAL mode.
+
+    Records are kept as JSON text next to their ID. Fields listed in `indexes` get an expression
+    index on json_extract(data, '$.<field>'), which find() uses for equality lookups.
+
+    Each write bumps the store's row in store_generations, which is what fingerprint() returns,
+    and notes the IDs it wrote under the new generation in store_changes - the change feed other
+    workers read to catch up without re-reading the table. The last `change_retention`
+    generations are kept.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, filename: str, indexes: Iterable[str] = (), change_retention: int = 10000):
+        self.path = path
+        self.table = table_name(filename)
+        self.indexes = list(indexes)
+        self.change_retention = change_retention
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        self._local = threading.local()
+        # Record bytes read by read() and written by write() - reported as store metrics
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        conn = self._connect()
+        with conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table} (id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS store_generations (name TEXT PRIMARY KEY, generation INTEGER NOT NULL)")
+            # A NULL id marks a write of the whole store
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS store_changes (name TEXT NOT NULL, generation INTEGER NOT NULL, id TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS store_changes_idx ON store_changes (name, generation)")
+            for field in self.indexes:
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {self.table}_{field}_idx "
+                    f"ON {self.table} (json_extract(data, '$.{field}'))"
+                )
+
+    def fingerprint(self) -> int:
+        """Generation counter of this table - bumped by every committed write"""
+        row = self._connect().execute(
+            "SELECT generation FROM store_generations WHERE name = ?", (self.table,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def read(self) -> Dict[str, dict]:
+        """Read every record in the table"""
+        records = {}
+        for record_id, data in self._connect().execute(f"SELECT id, data FROM {self.table}"):
+            self.bytes_read += len(data)
+            records[record_id] = codec.loads(data)
+        return records
+
+    def get(self, record_id: str) -> Optional[dict]:
+        """One record by ID, straight from the table"""
+        row = self._connect().execute(f"SELECT data FROM {self.table} WHERE id = ?", (record_id,)).fetchone()
+        if row is None:
+            return None
+        self.bytes_read += len(row[0])
+        return codec.loads(row[0])
+
+    def update(self, record_id: str, apply: Callable[[Optional[dict]], Optional[dict]]):
+        """Read, change and write one record in a single IMMEDIATE transaction.
+
+        apply() gets the stored record (None if there is none) and returns the record to store, or
+        None to leave it unchanged. Concurrent updates from other workers queue up on the database
+        write lock, so each one sees the previous one's result. Returns the stored record and the
+        generations from just before and just after the write (None when nothing was written).
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(f"SELECT data FROM {self.table} WHERE id = ?", (record_id,)).fetchone()
+            current = codec.loads(row[0]) if row else None
+            record = apply(current)
+            if record is None:
+                conn.rollback()
+                return current, None
+            line = codec.dumps(record)
+            conn.execute(
+                f"INSERT INTO {self.table} (id, data) VALUES (?, ?) "
+                f"ON CONFLICT(id) DO UPDATE SET data = excluded.data",
+                (record_id, line)
+            )
+            after = self._bump_generation(conn, [record_id])
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        self.bytes_written += len(line)
+        return record, (after - 1, after)
+
+    def _where(self, criteria: Dict[str, Any]) -> Tuple[List[str], List[Any]]:
+        """SQL conditions for field equalities, matching the expression indexes"""
+        clauses = []
+        params = []
+        for field, value in criteria.items():
+            check_field(field)
+            if value is None:
+                clauses.append(f"json_extract(data, '$.{field}') IS NULL")
+            else:
+                clauses.append(f"json_extract(data, '$.{field}') = ?")
+                params.append(value)
+        return clauses, params
+
+    def find(self, criteria: Dict[str, Any]) -> List[dict]:
+        """Records whose fields equal the given values, answered from the expression indexes"""
+        clauses, params = self._where(criteria)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connect().execute(f"SELECT data FROM {self.table}{where}", params)
+        return [codec.loads(data) for (data,) in rows]
+
+    def query(self, criteria: Dict[str, Any], since: Optional[Tuple[str, Any]], after: Optional[str],
+              limit: Optional[int], fields: Optional[Sequence[str]]) -> List[dict]:
+        """Filter, page and project in SQL so unrequested fields are never decoded"""
+        clauses, params = self._where(criteria)
+        if since is not None:
+            check_field(since[0])
+            clauses.append(f"json_extract(data, '$.{since[0]}') >= ?")
+            params.append(since[1])
+        if after is not None:
+            clauses.append("id > ?")
+            params.append(after)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        if fields is None:
+            columns = "data"
+        else:
+            for field in fields:
+                check_field(field)
+            # json_extract keeps nested objects as JSON, so json_object embeds them unquoted
+            columns = "json_object(" + ", ".join(f"'{field}', json_extract(data, '$.{field}')" for field in fields) + ")"
+
+        sql = f"SELECT {columns} FROM {self.table}{where} ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        rows = self._connect().execute(sql, params)
+        return [codec.loads(data) for (data,) in rows]
+
+    def write(self, data: Dict[str, dict], changed_ids: Optional[Iterable[str]] = None):
+        """Upsert the changed records (every record when no IDs are passed) in one transaction.
+
+        Returns the generations from just before and just after the write.
+        """
+        ids = list(data.keys()) if changed_ids is None else list(changed_ids)
+        upserts = [(record_id, codec.dumps(data[record_id])) for record_id in ids if record_id in data]
+        deletes = [(record_id,) for record_id in ids if record_id not in data]
+        self.bytes_written += sum(len(line) for _, line in upserts)
+
+        conn = self._connect()
+        with conn:
+            if upserts:
+                conn.executemany(
+                    f"INSERT INTO {self.table} (id, data) VALUES (?, ?) "
+                    f"ON CONFLICT(id) DO UPDATE SET data = excluded.data",
+                    upserts
+                )
+            if deletes:
+                conn.executemany(f"DELETE FROM {self.table} WHERE id = ?", deletes)
+            after = self._bump_generation(conn, ids if changed_ids is not None else None)
+        return after - 1, after
+
+    def _bump_generation(self, conn: sqlite3.Connection, record_ids: Optional[List[str]]) -> int:
+        """Bump the store's generation and log which records changed under it - inside the caller's
+        write transaction. record_ids None means every record may have changed. Returns the new generation.
+        """
+        # Bumping the generation takes the write lock, so nobody can commit between the two reads
+        conn.execute(
+            "INSERT INTO store_generations (name, generation) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET generation = generation + 1",
+            (self.table,)
+        )
+        after = conn.execute(
+            "SELECT generation FROM store_generations WHERE name = ?", (self.table,)
+        ).fetchone()[0]
+        conn.executemany(
+            "INSERT INTO store_changes (name, generation, id) VALUES (?, ?, ?)",
+            [(self.table, after, record_id) for record_id in (record_ids if record_ids is not None else [None])]
+        )
+        conn.execute(
+            "DELETE FROM store_changes WHERE name = ? AND generation <= ?",
+            (self.table, after - self.change_retention)
+        )
+        return after
+
+    def changes(self, since: int) -> Optional[Tuple[Dict[str, Optional[dict]], int]]:
+        """Records changed since generation `since`, read from the change feed instead of the whole table.
+
+        Returns the changed records (None for deleted ones) and the generation they bring the
+        caller up to, or None when `since` is older than the retained changes or the whole store
+        was written since - the caller must read() instead.
+        """
+        conn = self._connect()
+        # One read transaction, so the generation and the records come from the same snapshot
+        conn.execute("BEGIN")
+        try:
+            generation = self.fingerprint()
+            if since > generation or generation - since > self.change_retention:
+                return None
+            changed_ids = [record_id for (record_id,) in conn.execute(
+                "SELECT DISTINCT id FROM store_changes WHERE name = ? AND generation > ?", (self.table, since)
+            )]
+            if None in changed_ids:
+                return None
+            changed: Dict[str, Optional[dict]] = dict.fromkeys(changed_ids)
+            # Stay below SQLite's limit on bound parameters
+            for start in range(0, len(changed_ids), 500):
+                chunk = changed_ids[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT id, data FROM {self.table} WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                )
+                for record_id, data in rows:
+                    self.bytes_read += len(data)
+                    changed[record_id] = codec.loads(data)
+        finally:
+            conn.commit()
+        return changed, generation
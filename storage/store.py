@@ -0,0 +1,361 @@
+import threading
+import time
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import metrics
+from storage.lazy import LazyRecords
+
+# Conditional writes lost to another worker before Store.update() gives up
+UPDATE_ATTEMPTS = 5
+# Records Store.scan() reads from the engine at a time
+SCAN_PAGE_SIZE = 500
+
+class UpdateConflict(RuntimeError):
+    """Raised when other workers kept changing a store faster than an update could be applied"""
+
+class Store:
+    """In-memory ID -> record dictionary persisted through a pluggable storage engine.
+
+    `data` is a plain dict that routers share by reference, so it is only ever updated in place.
+
+    load() only re-parses when the engine's fingerprint (file stat or database generation) differs
+    from the one recorded at the last load, and counts those skips as cache hits. Engines with a
+    change feed (wal and sqlite) then return just the records written since that fingerprint, by
+    any worker, so keeping up with the other workers costs the size of their changes rather than
+    a re-read of the store. jsonl, and a feed that can't reach back that far (after a wal
+    compaction, or beyond the sqlite retention), fall back to reading everything.
+
+    With `lazy_cache_size` (append-log engine only) `data` is a LazyRecords mapping instead, which
+    indexes record offsets on load() and decodes records on first access, keeping at most that many
+    decoded records cached.
+
+    get()/put()/patch()/compare_and_set() work on one record: each is a single conditional write
+    of that record (an appended log line, or one row with sqlite), checked under the engine's write
+    lock against the state the record was read from, so concurrent workers never lose each
+    other's changes.
+    """
+
+    def __init__(self, name: str, engine, defaults: Optional[Dict[str, Any]] = None,
+                 lazy_cache_size: Optional[int] = None):
+        self.name = name
+        self.engine = engine
+        self.defaults = defaults or {}
+        self.lazy = lazy_cache_size is not None
+        if self.lazy:
+            engine.track_persisted = False
+            self.data = LazyRecords(engine, lazy_cache_size, prepare=self._apply_defaults)
+        else:
+            self.data: Dict[str, dict] = {}
+        # Fingerprint of the persisted state that `data` is known to include
+        self._fingerprint = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Serializes this process's point updates, so its threads don't conflict with each other
+        self._update_lock = threading.Lock()
+
+    def _apply_defaults(self, record: dict) -> dict:
+        # Migrate old records to include newer fields
+        for field, value in self.defaults.items():
+            record.setdefault(field, value)
+        return record
+
+    def load(self):
+        """Merge the persisted records into memory, skipping the parse when nothing changed"""
+        start = time.perf_counter()
+        bytes_read = self.engine.bytes_read
+        changed = self._load()
+        metrics.STORE_LOAD_DURATION.observe(time.perf_counter() - start, store=self.name, engine=self.engine.name,
+                                            result='miss' if changed else 'hit')
+        if self.engine.bytes_read > bytes_read:
+            metrics.STORE_LOAD_BYTES.inc(self.engine.bytes_read - bytes_read, store=self.name, engine=self.engine.name)
+
+    def _load(self) -> bool:
+        """load() without the metrics - returns whether the persisted records had to be read"""
+        if self.lazy:
+            # Only re-indexes what was appended since the last load - records are decoded on access
+            if self.data.refresh():
+                self.cache_misses += 1
+                return True
+            self.cache_hits += 1
+            return False
+
+        # Taken before reading, so a write that races with the read is picked up next time
+        fingerprint = self.engine.fingerprint()
+        if fingerprint is not None and fingerprint == self._fingerprint:
+            self.cache_hits += 1
+            return False
+
+        self.cache_misses += 1
+        engine_changes = getattr(self.engine, 'changes', None)
+        if engine_changes is not None and self._fingerprint is not None:
+            changes = engine_changes(self._fingerprint)
+            if changes is not None:
+                changed, self._fingerprint = changes
+                for record_id, record in changed.items():
+                    if record is None:
+                        self.data.pop(record_id, None)
+                    else:
+                        self.data[record_id] = self._apply_defaults(record)
+                return True
+
+        for record_id, record in self.engine.read().items():
+            self.data[record_id] = self._apply_defaults(record)
+        self._fingerprint = fingerprint
+        return True
+
+    def invalidate(self):
+        """Force the next load() to re-read the persisted records"""
+        self._fingerprint = None
+        if self.lazy:
+            self.data.invalidate()
+
+    def find(self, **criteria: Any) -> List[dict]:
+        """Fresh records whose fields equal the given values, e.g. find(status='queue').
+
+        Engines with indexes answer this directly; otherwise the store is reloaded and scanned.
+        """
+        engine_find = getattr(self.engine, 'find', None)
+        if engine_find is not None:
+            records = [self._apply_defaults(record) for record in engine_find(criteria)]
+            for record in records:
+                self.data[record['id']] = record
+            return records
+
+        self.load()
+        return [record for record in list(self.data.values())
+                if all(record.get(field) == value for field, value in criteria.items())]
+
+    def query(self, criteria: Optional[Dict[str, Any]] = None, since: Optional[Tuple[str, Any]] = None,
+              after: Optional[str] = None, limit: Optional[int] = None,
+              fields: Optional[Sequence[str]] = None) -> Tuple[List[dict], Optional[str]]:
+        """One page of fresh records in ID order.
+
+        `criteria` are field equalities as in find(), `since` is a (field, value) lower bound,
+        `after` is the cursor (last ID of the previous page) and `fields` projects each record onto
+        those fields plus `id`. Returns the page and the cursor of the next page (None on the last).
+        Engines that can answer this directly filter, page and project before records are decoded.
+        """
+        criteria = criteria or {}
+        fields = self._projection(fields)
+
+        engine_query = getattr(self.engine, 'query', None)
+        if engine_query is not None:
+            records = engine_query(criteria, since, after, None if limit is None else limit + 1, fields)
+        else:
+            records = list(islice(self._scan_memory(criteria, since, after, fields), None if limit is None else limit + 1))
+
+        next_cursor = None
+        if limit is not None and len(records) > limit:
+            records = records[:limit]
+            next_cursor = records[-1]['id']
+
+        if fields is None:
+            records = [self._apply_defaults(record) for record in records]
+            if engine_query is not None:
+                for record in records:
+                    self.data[record['id']] = record
+        else:
+            for record in records:
+                self._project_defaults(record, fields)
+        return records, next_cursor
+
+    def scan(self, criteria: Optional[Dict[str, Any]] = None, since: Optional[Tuple[str, Any]] = None,
+             after: Optional[str] = None, fields: Optional[Sequence[str]] = None) -> Iterator[dict]:
+        """Every matching record in ID order, produced as the caller iterates - takes the same
+        arguments as query(), without the limit.
+
+        For streaming whole listings: engines that answer queries directly are read in pages of
+        SCAN_PAGE_SIZE, and in-memory stores hand out one record at a time (lazy stores decode each
+        on access), so the listing is never held in memory at once.
+        """
+        if getattr(self.engine, 'query', None) is not None:
+            while True:
+                records, after = self.query(criteria, since, after, SCAN_PAGE_SIZE, fields)
+                yield from records
+                if after is None:
+                    return
+
+        fields = self._projection(fields)
+        for record in self._scan_memory(criteria or {}, since, after, fields):
+            yield record if fields is None else self._project_defaults(record, fields)
+
+    def _projection(self, fields: Optional[Sequence[str]]) -> Optional[List[str]]:
+        if fields is None:
+            return None
+        return ['id'] + [field for field in fields if field != 'id']
+
+    def _project_defaults(self, record: dict, fields: Sequence[str]) -> dict:
+        for field in fields:
+            if record.get(field) is None and field in self.defaults:
+                record[field] = self.defaults[field]
+        return record
+
+    def _scan_memory(self, criteria: Dict[str, Any], since: Optional[Tuple[str, Any]], after: Optional[str],
+                     fields: Optional[Sequence[str]]) -> Iterator[dict]:
+        """Matching in-memory records in ID order, after reloading"""
+        self.load()
+        # A projection only reads a few fields, so lazy stores don't cache the records it decodes
+        lookup = self.data.peek if self.lazy and fields is not None else self.data.get
+        for record_id in sorted(self.data):
+            if after is not None and record_id <= after:
+                continue
+            record = lookup(record_id)
+            if record is None or not all(record.get(field) == value for field, value in criteria.items()):
+                continue
+            if since is not None and (record.get(since[0]) is None or record.get(since[0]) < since[1]):
+                continue
+            yield record if fields is None else {field: record.get(field) for field in fields}
+
+    def save(self, *record_ids: str):
+        """Persist the given records, or every record when no IDs are passed"""
+        start = time.perf_counter()
+        bytes_written = self.engine.bytes_written
+        self._save(record_ids)
+        metrics.STORE_SAVE_DURATION.observe(time.perf_counter() - start, store=self.name, engine=self.engine.name)
+        if self.engine.bytes_written > bytes_written:
+            metrics.STORE_SAVE_BYTES.inc(self.engine.bytes_written - bytes_written, store=self.name, engine=self.engine.name)
+
+    def _save(self, record_ids: Tuple[str, ...]):
+        if self.lazy:
+            record_ids = record_ids or tuple(self.data.keys())
+            self.engine.write(self.data, record_ids)
+            self.data.refresh(own_ids=record_ids)
+            return
+
+        fingerprints = self.engine.write(self.data, record_ids or None)
+        if fingerprints is not None:
+            self._advance_fingerprint(fingerprints)
+        else:
+            self._fingerprint = None
+
+    # Point operations
+
+    def get(self, record_id: str, default: Any = None) -> Optional[dict]:
+        """The latest persisted version of one record"""
+        engine_get = getattr(self.engine, 'get', None)
+        if engine_get is not None:
+            record = engine_get(record_id)
+            if record is None:
+                return default
+            record = self._apply_defaults(record)
+            self.data[record_id] = record
+            return record
+
+        self.load()
+        return self.data.get(record_id, default)
+
+    def update(self, record_id: str, apply: Callable[[Optional[dict]], Optional[dict]]) -> Optional[dict]:
+        """Atomically replace one record with apply(current record).
+
+        apply() gets a copy of the latest version of the record (None if there is none) and returns
+        the new record, or None to leave it unchanged. It runs again on the newer version if another
+        worker wrote to the store in between, so it must not have side effects. Returns the record
+        as stored afterwards (None if there is none).
+        """
+        start = time.perf_counter()
+        bytes_written = self.engine.bytes_written
+        with self._update_lock:
+            record = self._update(record_id, apply)
+        metrics.STORE_SAVE_DURATION.observe(time.perf_counter() - start, store=self.name, engine=self.engine.name)
+        if self.engine.bytes_written > bytes_written:
+            metrics.STORE_SAVE_BYTES.inc(self.engine.bytes_written - bytes_written, store=self.name, engine=self.engine.name)
+        return record
+
+    def _update(self, record_id: str, apply: Callable[[Optional[dict]], Optional[dict]]) -> Optional[dict]:
+        def apply_copy(current: Optional[dict]) -> Optional[dict]:
+            return apply(dict(self._apply_defaults(current)) if current is not None else None)
+
+        engine_update = getattr(self.engine, 'update', None)
+        if engine_update is not None:
+            # The engine reads and writes the record in one transaction
+            record, fingerprints = engine_update(record_id, apply_copy)
+            if record is not None:
+                record = self._apply_defaults(record)
+                self.data[record_id] = record
+            if fingerprints is not None:
+                self._advance_fingerprint(fingerprints)
+            return record
+
+        for _ in range(UPDATE_ATTEMPTS):
+            # Bring memory up to date and note the state it reflects - the write only goes
+            # through if nobody else wrote since
+            if self.lazy:
+                expected = self.engine.fingerprint()
+                self.data.refresh()
+            else:
+                self._load()
+                expected = self._fingerprint
+            current = self.data.get(record_id)
+            record = apply_copy(current)
+            if record is None:
+                return current
+            record['id'] = record_id
+            fingerprints = self.engine.put(record, expected, self.data)
+            if fingerprints is None:
+                continue
+            if self.lazy:
+                # Another worker may write the record again before we re-index, so the next access
+                # decodes whatever version is persisted instead of trusting ours
+                self.data.discard(record_id)
+                self.data.refresh()
+            else:
+                self.data[record_id] = record
+                self._advance_fingerprint(fingerprints)
+            return record
+        raise UpdateConflict(f"{self.name}: record {record_id} kept changing, gave up after {UPDATE_ATTEMPTS} attempts")
+
+    def _advance_fingerprint(self, fingerprints: Tuple[Any, Any]):
+        # Our own write doesn't make memory stale - unless someone else wrote since our last load.
+        # Then the change feed still brings memory up to date from the last load on (replaying
+        # our own records too); without one the next load re-reads everything
+        if fingerprints[0] == self._fingerprint:
+            self._fingerprint = fingerprints[1]
+        elif getattr(self.engine, 'changes', None) is None:
+            self._fingerprint = None
+
+    def put(self, record: dict) -> dict:
+        """Store one record, replacing any previous version"""
+        return self.update(record['id'], lambda current: dict(record))
+
+    def insert(self, record: dict) -> bool:
+        """Store one record unless one with its ID already exists, returning whether it was stored"""
+        inserted = False
+
+        def apply(current: Optional[dict]) -> Optional[dict]:
+            nonlocal inserted
+            inserted = current is None
+            return dict(record) if inserted else None
+
+        self.update(record['id'], apply)
+        return inserted
+
+    def patch(self, record_id: str, changes: Dict[str, Any]) -> Optional[dict]:
+        """Set some fields of one record, returning the updated record (None if there is no such record)"""
+        return self.update(record_id, lambda current: {**current, **changes} if current is not None else None)
+
+    def compare_and_set(self, record_id: str, field: str, expected: Any, value: Any, **changes: Any) -> bool:
+        """Set `field` to `value` (and any other `changes`) only if it currently equals `expected`.
+
+        Returns whether the record was changed - False also when there is no such record. Use it
+        for state transitions that only one worker may make, e.g. status researching -> researched.
+        """
+        changed = False
+
+        def apply(current: Optional[dict]) -> Optional[dict]:
+            nonlocal changed
+            changed = current is not None and current.get(field) == expected
+            return {**current, **changes, field: value} if changed else None
+
+        self.update(record_id, apply)
+        return changed
+
+    def stats(self) -> Dict[str, Any]:
+        """Record count and reload cache counters"""
+        return {
+            'name': self.name,
+            'engine': self.engine.name,
+            'records': len(self.data),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses
+        }
@@ -0,0 +1,270 @@
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from storage import codec
+from storage.jsonl import file_fingerprint, parse_records
+from storage.locking import file_lock
+import logs
+
+logger = logs.get_logger(__name__)
+
+def apply_log_entry(records: Dict[str, dict], entry: dict):
+    """Apply a single mutation record from the log to an ID -> record dictionary"""
+    op = entry.get('op')
+    if op == 'put':
+        record = entry.get('record')
+        if isinstance(record, dict) and 'id' in record:
+            records[record['id']] = record
+    elif op == 'delete':
+        records.pop(entry.get('id'), None)
+
+class AppendLogEngine:
+    """Snapshot file plus an append-only mutation log.
+
+    The snapshot (e.g. entities.txt) keeps the original JSON-lines format. Every save appends
+    one {"op": "put", "record": {...}} line per changed record to <snapshot>.log, so a write
+    costs the size of the change rather than the size of the store. Once the log outgrows the
+    snapshot it is folded back into the snapshot by a background compaction.
+
+    All readers, appenders and the compactor coordinate through a flock on the log - shared for
+    readers, exclusive for appends and compaction.
+    """
+
+    name = "wal"
+
+    def __init__(self, filename: str, header: str, compact_min_bytes: int = 1024 * 1024):
+        self.filename = filename
+        self.log_filename = filename + '.log'
+        self.header = header
+        self.compact_min_bytes = compact_min_bytes
+        # Serialized form of each record as last seen on disk, so unchanged records are never re-appended.
+        # Lazy stores turn this off since it would hold every record in memory
+        self.track_persisted = True
+        self._persisted: Dict[str, str] = {}
+        self._state_lock = threading.Lock()
+        self._compacting = False
+        # Bytes read by read() and refreshes, and appended by write() - reported as store metrics
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def _replay(self, log) -> Dict[str, dict]:
+        """Rebuild the current state from the snapshot and the log - caller must hold the log lock"""
+        records = {}
+        if os.path.exists(self.filename):
+            with open(self.filename, 'r') as f:
+                parse_records(f, records)
+        log.seek(0)
+        for line in log:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                apply_log_entry(records, codec.loads(line))
+            except codec.JSONDecodeError:
+                # Torn append from a crash - everything before it is still valid
+                continue
+        return records
+
+    def _snapshot_size(self) -> int:
+        return os.path.getsize(self.filename) if os.path.exists(self.filename) else 0
+
+    def _needs_compaction(self, log_size: int) -> bool:
+        return log_size > max(self.compact_min_bytes, self._snapshot_size())
+
+    def fingerprint(self):
+        """Snapshot and log identities - any append, compaction or replace changes one of them"""
+        log_fingerprint = file_fingerprint(self.log_filename)
+        # A missing and an empty log hold the same state (compaction also replaces the snapshot)
+        if log_fingerprint is not None and log_fingerprint[1] == 0:
+            log_fingerprint = None
+        return (file_fingerprint(self.filename), log_fingerprint)
+
+    def read(self) -> Dict[str, dict]:
+        """Recover the current state by replaying the log on top of the snapshot"""
+        with file_lock(self.log_filename, 'ab+', shared=True) as log:
+            records = self._replay(log)
+            log_size = os.fstat(log.fileno()).st_size
+        self.bytes_read += self._snapshot_size() + log_size
+
+        with self._state_lock:
+            self._persisted = {record_id: codec.dumps(record) for record_id, record in records.items()}
+
+        if self._needs_compaction(log_size):
+            self.compact_in_background()
+        return records
+
+    def changes(self, since) -> Optional[Tuple[Dict[str, Optional[dict]], Any]]:
+        """Records changed since the files had the fingerprint `since`, without re-reading the store.
+
+        Only the log past the position `since` recorded is read - the change feed every worker
+        tails to catch up with the others' appends. Returns the changed records (None for deleted
+        ones) and the fingerprint they bring the caller up to, or None when the snapshot was
+        replaced or the log truncated since (a compaction) and the caller must read() instead.
+        """
+        snapshot_fingerprint, log_fingerprint = since
+        with file_lock(self.log_filename, 'ab+', shared=True) as log:
+            if file_fingerprint(self.filename) != snapshot_fingerprint:
+                return None
+            log_stat = os.fstat(log.fileno())
+            offset = 0
+            if log_fingerprint is not None:
+                if log_fingerprint[0] != log_stat.st_ino or log_fingerprint[1] > log_stat.st_size:
+                    return None
+                offset = log_fingerprint[1]
+            log.seek(offset)
+            appended = log.read(log_stat.st_size - offset)
+            fingerprint = self.fingerprint()
+        self.bytes_read += len(appended)
+
+        changed: Dict[str, Optional[dict]] = {}
+        # Appends happen under the exclusive lock, so an unterminated last line is a torn append
+        # from a crash and is skipped like one
+        for line in appended.split(b'\n'):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = codec.loads(line)
+            except codec.JSONDecodeError:
+                continue
+            if entry.get('op') == 'delete':
+                changed[entry.get('id')] = None
+            else:
+                apply_log_entry(changed, entry)
+
+        if self.track_persisted:
+            with self._state_lock:
+                for record_id, record in changed.items():
+                    if record is None:
+                        self._persisted.pop(record_id, None)
+                    else:
+                        self._persisted[record_id] = codec.dumps(record)
+
+        if self._needs_compaction(len(appended) + offset):
+            self.compact_in_background()
+        return changed, fingerprint
+
+    def write(self, data: Dict[str, dict], changed_ids: Optional[Iterable[str]] = None):
+        """Append a mutation record for every changed record.
+
+        With changed_ids only those records are considered (IDs missing from data are logged as
+        deletes); without them every in-memory record is compared against what is on disk.
+        Returns the fingerprints from just before and just after the append.
+        """
+        ids = list(data.keys()) if changed_ids is None else list(changed_ids)
+        entries = []
+        updated = {}
+
+        with self._state_lock:
+            for record_id in ids:
+                record = data.get(record_id)
+                if not self.track_persisted:
+                    if record is None:
+                        entries.append('{"op": "delete", "id": ' + codec.dumps(record_id) + '}')
+                    else:
+                        entries.append('{"op": "put", "record": ' + codec.dumps(record) + '}')
+                    continue
+                if record is None:
+                    if changed_ids is not None and record_id in self._persisted:
+                        entries.append('{"op": "delete", "id": ' + codec.dumps(record_id) + '}')
+                        updated[record_id] = None
+                    continue
+                line = codec.dumps(record)
+                if self._persisted.get(record_id) != line:
+                    # Embed the already-serialized record instead of dumping it twice
+                    entries.append('{"op": "put", "record": ' + line + '}')
+                    updated[record_id] = line
+
+        if not entries:
+            fingerprint = self.fingerprint()
+            return fingerprint, fingerprint
+
+        with file_lock(self.log_filename, 'ab+') as log:
+            before = self.fingerprint()
+            log_size = self._append(log, entries)
+            after = self.fingerprint()
+        self._appended(updated, log_size)
+        return before, after
+
+    def put(self, record: dict, expected, data: Dict[str, dict]) -> Optional[tuple]:
+        """Append one record, unless the files changed since they had the fingerprint `expected`.
+
+        This is the conditional write behind Store.update(): it costs one appended line however
+        large the store is (`data` isn't needed). Returns the fingerprints from just before and
+        just after the append, or None when another writer appended or compacted first - the
+        caller must reload and retry.
+        """
+        line = codec.dumps(record)
+        with file_lock(self.log_filename, 'ab+') as log:
+            before = self.fingerprint()
+            if before != expected:
+                return None
+            log_size = self._append(log, ['{"op": "put", "record": ' + line + '}'])
+            after = self.fingerprint()
+        self._appended({record['id']: line} if self.track_persisted else {}, log_size)
+        return before, after
+
+    def _append(self, log, entries: List[str]) -> int:
+        """Append log entries - caller must hold the exclusive log lock. Returns the new log size"""
+        log.seek(0, os.SEEK_END)
+        prefix = b''
+        if log.tell() > 0:
+            # Make sure a torn line left by a crash doesn't swallow our first entry
+            log.seek(-1, os.SEEK_END)
+            if log.read(1) != b'\n':
+                prefix = b'\n'
+        payload = prefix + ('\n'.join(entries) + '\n').encode('utf-8')
+        log.write(payload)
+        log.flush()
+        self.bytes_written += len(payload)
+        return log.tell()
+
+    def _appended(self, updated: Dict[str, Optional[str]], log_size: int):
+        """Remember what was just appended, and compact if the log grew too large"""
+        with self._state_lock:
+            for record_id, line in updated.items():
+                if line is None:
+                    self._persisted.pop(record_id, None)
+                else:
+                    self._persisted[record_id] = line
+
+        if self._needs_compaction(log_size):
+            self.compact_in_background()
+
+    def compact(self):
+        """Fold the log into a fresh snapshot and truncate the log"""
+        with file_lock(self.log_filename, 'ab+') as log:
+            records = self._replay(log)
+
+            tmp_filename = self.filename + '.tmp'
+            with open(tmp_filename, 'w') as f:
+                f.write(self.header + "\n")
+                for record in records.values():
+                    f.write(codec.dumps(record) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_filename, self.filename)
+
+            log.truncate(0)
+            log.flush()
+
+        if self.track_persisted:
+            with self._state_lock:
+                self._persisted = {record_id: codec.dumps(record) for record_id, record in records.items()}
+
+    def compact_in_background(self):
+        """Start a compaction on a daemon thread unless one is already running"""
+        with self._state_lock:
+            if self._compacting:
+                return
+            self._compacting = True
+        threading.Thread(target=self._run_compaction, name=f"compact-{self.filename}", daemon=True).start()
+
+    def _run_compaction(self):
+        try:
+            self.compact()
+        except Exception as e:
+            logger.exception("Compaction of %s failed: %s", self.filename, e)
+        finally:
+            self._compacting = False
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+# The application modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import AppendLogEngine, JsonLinesEngine, SQLiteEngine, Store
+
+HEADER = "# Test store (JSON format)"
+
+@pytest.fixture
+def open_worker(tmp_path):
+    """Open the same store the way another uvicorn worker would - its own Store and engine over the same files.
+
+    Takes the engine name, and for the wal engine optionally compact_min_bytes and lazy_cache_size.
+    """
+    filename = str(tmp_path / "entities.txt")
+
+    def open_store(engine_name: str = 'wal', compact_min_bytes: int = sys.maxsize, lazy_cache_size=None,
+                   change_retention: int = 10000) -> Store:
+        if engine_name == 'wal':
+            engine = AppendLogEngine(filename, HEADER, compact_min_bytes=compact_min_bytes)
+        elif engine_name == 'jsonl':
+            engine = JsonLinesEngine(filename, HEADER)
+        else:
+            engine = SQLiteEngine(str(tmp_path / "test.db"), filename, indexes=('status',),
+                                  change_retention=change_retention)
+        store = Store(filename, engine, lazy_cache_size=lazy_cache_size)
+        store.load()
+        return store
+
+    return open_store
@@ -0,0 +1,39 @@
+import asyncio
+import types
+
+import httpx
+import openai
+import pytest
+
+@pytest.fixture
+def drafts(tmp_path, monkeypatch):
+    """The drafts router, with the stores it opens on import kept out of the repository"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('OPENAI_API_KEY', 'test')
+    from routers import drafts
+    return drafts
+
+def test_section_whose_job_could_not_be_created_is_reported_failed(drafts, monkeypatch):
+    import prompts
+
+    async def acreate(client, prompt_name, variables, background=False):
+        if prompt_name == 'research_personal_life':
+            request = httpx.Request("POST", "https://api.openai.com/v1/responses")
+            raise openai.RateLimitError("slow down", response=httpx.Response(429, request=request), body=None)
+        return types.SimpleNamespace(id=f"resp_{prompt_name}")
+
+    async def aretrieve(client, response_id):
+        return types.SimpleNamespace(id=response_id, status='in_progress', output=[])
+
+    monkeypatch.setattr(prompts, 'acreate', acreate)
+    monkeypatch.setattr(prompts, 'aretrieve', aretrieve)
+    drafts.entities_db.put({'id': 'vc', 'name': 'A Capitalist', 'context': 'Investor', 'status': 'researched'})
+    drafts.notability_db.put({'id': 'vc', 'notability_status': 'meets'})
+
+    draft = asyncio.run(drafts.create_draft(drafts.CreateDraftRequest(id='vc', type='venture_capitalist')))
+    assert draft.results == {section: None for section in drafts.RESEARCH_SECTION_PROMPTS}
+
+    progress = asyncio.run(drafts.update_draft_progress('vc'))
+    assert progress.failed_sections == {'personal_life': 'not_submitted'}
+    assert progress.completed_sections == 0
+    assert progress.pending_sections == len(drafts.RESEARCH_SECTION_PROMPTS) - 1
@@ -0,0 +1,23 @@
+from storage import JsonLinesEngine
+from conftest import HEADER
+
+def test_same_size_rewrites_always_change_the_fingerprint(tmp_path):
+    engine = JsonLinesEngine(str(tmp_path / "entities.txt"), HEADER)
+    fingerprints = []
+    for n in range(50):
+        # Same size every time, faster than the filesystem's timestamp granularity
+        engine.write({'a': {'id': 'a', 'n': n % 10}})
+        fingerprints.append(engine.fingerprint())
+
+    assert len(set(fingerprints)) == len(fingerprints)
+
+def test_reload_sees_same_size_rewrite_by_another_worker(open_worker):
+    reader = open_worker('jsonl')
+    writer = open_worker('jsonl')
+    writer.put({'id': 'a', 'status': 'queue1'})
+    reader.load()
+
+    writer.patch('a', {'status': 'queue2'})
+    reader.load()
+
+    assert reader.data['a']['status'] == 'queue2'
@@ -0,0 +1,43 @@
+from storage import AppendLogEngine
+from conftest import HEADER
+
+def test_refresh_rebuilds_index_after_log_is_truncated(open_worker, tmp_path):
+    writer = AppendLogEngine(str(tmp_path / "entities.txt"), HEADER)
+    writer.write({'a': {'id': 'a', 'n': 1}, 'b': {'id': 'b', 'n': 2}})
+    lazy = open_worker('wal', lazy_cache_size=1)
+    assert lazy.data['a'] == {'id': 'a', 'n': 1}
+
+    # Compaction replaces the snapshot and truncates the log, so every log offset starts over
+    writer.write({'b': {'id': 'b', 'n': 20}}, ['b'])
+    writer.compact()
+    writer.write({'c': {'id': 'c', 'n': 3}}, ['c'])
+
+    assert lazy.data.refresh()
+    assert dict(lazy.data.items()) == {
+        'a': {'id': 'a', 'n': 1},
+        'b': {'id': 'b', 'n': 20},
+        'c': {'id': 'c', 'n': 3}
+    }
+    assert not lazy.data.refresh()
+
+def test_access_reindexes_when_log_was_truncated_since_refresh(open_worker, tmp_path):
+    writer = AppendLogEngine(str(tmp_path / "entities.txt"), HEADER)
+    writer.write({'a': {'id': 'a', 'n': 1}, 'b': {'id': 'b', 'n': 2}})
+    lazy = open_worker('wal', lazy_cache_size=1)
+
+    # 'b' is indexed at an offset in the log, which the compaction truncates away
+    writer.write({'b': {'id': 'b', 'n': 20}}, ['b'])
+    writer.compact()
+
+    assert lazy.data.get('b') == {'id': 'b', 'n': 20}
+    assert lazy.data.get('a') == {'id': 'a', 'n': 1}
+
+def test_projected_scan_does_not_cache_records(open_worker):
+    writer = open_worker('wal')
+    for i in range(5):
+        writer.put({'id': f'r{i}', 'updated_at': f'2025-01-0{i + 1}', 'results': {'pages': ['x'] * 10}})
+    lazy = open_worker('wal', lazy_cache_size=10)
+
+    assert [record['updated_at'] for record in lazy.scan(fields=['updated_at'])] == \
+        ['2025-01-01', '2025-01-02', '2025-01-03', '2025-01-04', '2025-01-05']
+    assert lazy.data.stats() == {'decoded': 0, 'decodes': 5}
@@ -0,0 +1,66 @@
+import httpx
+import openai
+import pytest
+
+import prompts
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/responses")
+
+def connection_error(cause: Exception) -> openai.APIConnectionError:
+    """A connection error the way the SDK raises it - from the underlying httpx exception"""
+    try:
+        raise cause
+    except httpx.TimeoutException as e:
+        try:
+            raise openai.APITimeoutError(request=REQUEST) from e
+        except openai.APIConnectionError as error:
+            return error
+    except httpx.HTTPError as e:
+        try:
+            raise openai.APIConnectionError(request=REQUEST) from e
+        except openai.APIConnectionError as error:
+            return error
+
+def failing_call(error: Exception):
+    calls = []
+
+    def make_call():
+        calls.append(error)
+        raise error
+
+    return make_call, calls
+
+@pytest.mark.parametrize('cause', [httpx.ReadTimeout("read"), httpx.RemoteProtocolError("dropped")])
+def test_create_is_not_resent_after_the_request_went_out(cause):
+    make_call, calls = failing_call(connection_error(cause))
+    with pytest.raises(openai.APIConnectionError):
+        prompts.with_retries_sync(make_call, attempts=3, backoff_seconds=0, idempotent=False)
+    assert len(calls) == 1
+
+@pytest.mark.parametrize('cause', [httpx.ConnectError("refused"), httpx.ConnectTimeout("connect"), httpx.PoolTimeout("pool")])
+def test_create_is_retried_when_the_request_never_left(cause):
+    make_call, calls = failing_call(connection_error(cause))
+    with pytest.raises(openai.APIConnectionError):
+        prompts.with_retries_sync(make_call, attempts=3, backoff_seconds=0, idempotent=False)
+    assert len(calls) == 3
+
+def test_retrieve_is_retried_after_a_timeout():
+    make_call, calls = failing_call(connection_error(httpx.ReadTimeout("read")))
+    with pytest.raises(openai.APITimeoutError):
+        prompts.with_retries_sync(make_call, attempts=3, backoff_seconds=0)
+    assert len(calls) == 3
+
+def test_bad_requests_are_never_retried():
+    error = openai.BadRequestError("bad", response=httpx.Response(400, request=REQUEST), body=None)
+    assert not prompts.is_retryable(error)
+    assert prompts.is_retryable(openai.RateLimitError("slow down", response=httpx.Response(429, request=REQUEST), body=None),
+                                idempotent=False)
+
+@pytest.mark.parametrize('status_code', [500, 502, 503, 504])
+def test_create_is_not_resent_after_a_server_error(status_code):
+    error = openai.InternalServerError("unavailable", response=httpx.Response(status_code, request=REQUEST), body=None)
+    make_call, calls = failing_call(error)
+    with pytest.raises(openai.InternalServerError):
+        prompts.with_retries_sync(make_call, attempts=3, backoff_seconds=0, idempotent=False)
+    assert len(calls) == 1
+    assert prompts.is_retryable(error)
@@ -0,0 +1,41 @@
+def test_change_feed_returns_only_changed_records(open_worker):
+    reader = open_worker('sqlite')
+    writer = open_worker('sqlite')
+    writer.put({'id': 'a', 'status': 'queue'})
+    reader.load()
+    since = reader.engine.fingerprint()
+
+    writer.patch('a', {'status': 'researching'})
+    writer.put({'id': 'b', 'status': 'queue'})
+
+    assert reader.engine.changes(since) == (
+        {'a': {'id': 'a', 'status': 'researching'}, 'b': {'id': 'b', 'status': 'queue'}}, since + 2
+    )
+
+def test_change_feed_falls_back_to_full_read_beyond_retention(open_worker):
+    reader = open_worker('sqlite', change_retention=2)
+    writer = open_worker('sqlite', change_retention=2)
+    writer.put({'id': 'a', 'status': 'queue'})
+    reader.load()
+    since = reader.engine.fingerprint()
+
+    for record_id in ('b', 'c', 'd'):
+        writer.put({'id': record_id, 'status': 'queue'})
+    assert reader.engine.changes(since) is None
+
+    reader.load()
+    assert sorted(reader.data) == ['a', 'b', 'c', 'd']
+
+def test_change_feed_falls_back_after_whole_store_write(open_worker):
+    reader = open_worker('sqlite')
+    writer = open_worker('sqlite')
+    writer.put({'id': 'a', 'status': 'queue'})
+    reader.load()
+    since = reader.engine.fingerprint()
+
+    writer.data['b'] = {'id': 'b', 'status': 'queue'}
+    writer.save()
+    assert reader.engine.changes(since) is None
+
+    reader.load()
+    assert sorted(reader.data) == ['a', 'b']
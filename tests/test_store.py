@@ -0,0 +1,85 @@
+import pytest
+
+from storage import UpdateConflict
+from storage.store import UPDATE_ATTEMPTS
+
+def race(store, other_write, times: int = 1):
+    """Make another worker's write land between `store` reading a record and writing it back"""
+    engine_put = store.engine.put
+    remaining = [times]
+
+    def racing_put(record, expected, data):
+        if remaining[0] > 0:
+            remaining[0] -= 1
+            other_write()
+        return engine_put(record, expected, data)
+
+    store.engine.put = racing_put
+
+@pytest.mark.parametrize('engine_name', ['wal', 'jsonl'])
+def test_update_retries_on_the_record_another_worker_wrote(open_worker, engine_name):
+    first = open_worker(engine_name)
+    second = open_worker(engine_name)
+    first.put({'id': 'a', 'status': 'queue', 'tags': []})
+
+    seen = []
+
+    def apply(current):
+        seen.append(current)
+        return {**current, 'status': 'researching'}
+
+    race(first, lambda: second.patch('a', {'tags': ['other']}))
+    stored = first.update('a', apply)
+
+    assert [version['tags'] for version in seen] == [[], ['other']]
+    assert stored == {'id': 'a', 'status': 'researching', 'tags': ['other']}
+    assert open_worker(engine_name).get('a') == stored
+
+@pytest.mark.parametrize('engine_name', ['wal', 'jsonl'])
+def test_compare_and_set_loses_race_to_another_worker(open_worker, engine_name):
+    first = open_worker(engine_name)
+    second = open_worker(engine_name)
+    first.put({'id': 'a', 'status': 'researching'})
+
+    race(first, lambda: second.compare_and_set('a', 'status', 'researching', 'researched', winner='second'))
+    assert not first.compare_and_set('a', 'status', 'researching', 'researched', winner='first')
+
+    assert open_worker(engine_name).get('a') == {'id': 'a', 'status': 'researched', 'winner': 'second'}
+
+@pytest.mark.parametrize('engine_name', ['wal', 'jsonl', 'sqlite'])
+def test_compare_and_set_transitions_once(open_worker, engine_name):
+    first = open_worker(engine_name)
+    second = open_worker(engine_name)
+    first.put({'id': 'a', 'status': 'researching'})
+
+    assert first.compare_and_set('a', 'status', 'researching', 'researched')
+    assert not second.compare_and_set('a', 'status', 'researching', 'researched')
+    assert not second.compare_and_set('missing', 'status', 'researching', 'researched')
+    assert second.get('a')['status'] == 'researched'
+
+@pytest.mark.parametrize('engine_name', ['wal', 'jsonl'])
+def test_update_gives_up_when_every_attempt_loses(open_worker, engine_name):
+    first = open_worker(engine_name)
+    second = open_worker(engine_name)
+    first.put({'id': 'a', 'count': 0})
+
+    def bump():
+        second.update('a', lambda current: {**current, 'count': current['count'] + 1})
+
+    race(first, bump, times=UPDATE_ATTEMPTS)
+    with pytest.raises(UpdateConflict):
+        first.patch('a', {'status': 'lost'})
+
+    assert open_worker(engine_name).get('a') == {'id': 'a', 'count': UPDATE_ATTEMPTS}
+
+@pytest.mark.parametrize('engine_name', ['wal', 'jsonl', 'sqlite'])
+def test_scan_matches_query_across_pages(open_worker, engine_name, monkeypatch):
+    monkeypatch.setattr('storage.store.SCAN_PAGE_SIZE', 3)
+    store = open_worker(engine_name)
+    for i in range(10):
+        store.put({'id': f'r{i:02d}', 'status': 'queue' if i % 2 else 'done', 'n': i})
+
+    for kwargs in ({}, {'criteria': {'status': 'queue'}}, {'after': 'r04', 'fields': ['n']}):
+        records, _ = store.query(**kwargs)
+        assert list(store.scan(**kwargs)) == records
+    assert [record['id'] for record in store.scan(criteria={'status': 'queue'})] == ['r01', 'r03', 'r05', 'r07', 'r09']
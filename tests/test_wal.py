@@ -0,0 +1,95 @@
+import multiprocessing
+import os
+import sys
+
+from storage import AppendLogEngine
+from conftest import HEADER
+
+def record(record_id: str, **fields) -> dict:
+    return {'id': record_id, **fields}
+
+def test_replay_skips_torn_append(tmp_path):
+    filename = str(tmp_path / "entities.txt")
+    engine = AppendLogEngine(filename, HEADER)
+    engine.write({'a': record('a', n=1), 'b': record('b', n=2)})
+
+    # A crash in the middle of an append leaves an unterminated line behind
+    with open(filename + '.log', 'ab') as log:
+        log.write(b'{"op": "put", "record": {"id": "c", "n"')
+
+    assert AppendLogEngine(filename, HEADER).read() == {'a': record('a', n=1), 'b': record('b', n=2)}
+
+def test_append_after_torn_line_starts_a_new_line(tmp_path):
+    filename = str(tmp_path / "entities.txt")
+    engine = AppendLogEngine(filename, HEADER)
+    engine.write({'a': record('a', n=1)})
+    with open(filename + '.log', 'ab') as log:
+        log.write(b'{"op": "put", "record": {"id": "c", "n"')
+
+    engine.write({'c': record('c', n=3)}, ['c'])
+
+    assert AppendLogEngine(filename, HEADER).read() == {'a': record('a', n=1), 'c': record('c', n=3)}
+
+def test_change_feed_skips_torn_append(open_worker, tmp_path):
+    reader = open_worker('wal')
+    writer = open_worker('wal')
+    writer.put(record('a', n=1))
+    reader.load()
+
+    with open(str(tmp_path / "entities.txt.log"), 'ab') as log:
+        log.write(b'{"op": "put", "record": {"id": "x"')
+    writer.put(record('b', n=2))
+    reader.load()
+
+    assert dict(reader.data) == {'a': record('a', n=1), 'b': record('b', n=2)}
+
+def append_records(filename: str, count: int):
+    """Run in a separate process - appends one record per write, never compacting itself"""
+    engine = AppendLogEngine(filename, HEADER, compact_min_bytes=sys.maxsize)
+    for i in range(count):
+        engine.write({f'r{i:04d}': record(f'r{i:04d}', n=i)}, [f'r{i:04d}'])
+
+def test_compaction_while_another_process_appends(open_worker, tmp_path):
+    filename = str(tmp_path / "entities.txt")
+    expected = {f'r{i:04d}': record(f'r{i:04d}', n=i) for i in range(300)}
+    reader = open_worker('wal')
+    compactor = AppendLogEngine(filename, HEADER, compact_min_bytes=0)
+
+    appender = multiprocessing.get_context('fork').Process(target=append_records, args=(filename, len(expected)))
+    appender.start()
+    compactions = 0
+    while appender.is_alive():
+        compactor.compact()
+        compactions += 1
+        # Catches up through the change feed between compactions, and by re-reading across them
+        reader.load()
+    appender.join()
+    assert appender.exitcode == 0
+    assert compactions > 0
+
+    reader.load()
+    assert dict(reader.data) == expected
+    assert AppendLogEngine(filename, HEADER).read() == expected
+
+    compactor.compact()
+    assert os.path.getsize(filename + '.log') == 0
+    assert AppendLogEngine(filename, HEADER).read() == expected
+
+def test_change_feed_falls_back_to_full_read_after_compaction(open_worker):
+    reader = open_worker('wal')
+    writer = open_worker('wal')
+    writer.put(record('a', n=1))
+    reader.load()
+    since = reader.engine.fingerprint()
+
+    writer.put(record('b', n=2))
+    assert reader.engine.changes(since)[0] == {'b': record('b', n=2)}
+
+    writer.engine.compact()
+    writer.put(record('c', n=3))
+    assert reader.engine.changes(since) is None
+
+    misses = reader.cache_misses
+    reader.load()
+    assert reader.cache_misses == misses + 1
+    assert dict(reader.data) == {'a': record('a', n=1), 'b': record('b', n=2), 'c': record('c', n=3)}
@@ -0,0 +1,50 @@
+"""
+Signing and verification for OpenAI webhooks (Standard Webhooks scheme).
+
+The signature is base64(HMAC-SHA256(secret, "<webhook-id>.<webhook-timestamp>.<body>")),
+sent as "v1,<signature>" in the webhook-signature header (several may be space separated).
+"""
+
+import base64
+import hashlib
+import hmac
+import time
+from typing import Mapping
+
+# Reject deliveries whose timestamp is further than this from our clock, to stop replays
+WEBHOOK_TOLERANCE_SECONDS = 300
+
+class WebhookVerificationError(ValueError):
+    """Raised when a webhook delivery is missing headers, too old, or wrongly signed"""
+
+def _secret_key(secret: str) -> bytes:
+    if secret.startswith("whsec_"):
+        return base64.b64decode(secret[len("whsec_"):])
+    return secret.encode("utf-8")
+
+def sign(secret: str, webhook_id: str, timestamp: int, body: bytes) -> str:
+    """Signature header value for a delivery"""
+    signed_content = f"{webhook_id}.{timestamp}.".encode("utf-8") + body
+    digest = hmac.new(_secret_key(secret), signed_content, hashlib.sha256).digest()
+    return "v1," + base64.b64encode(digest).decode("utf-8")
+
+def verify(secret: str, headers: Mapping[str, str], body: bytes, tolerance: int = WEBHOOK_TOLERANCE_SECONDS):
+    """Check the webhook-id/webhook-timestamp/webhook-signature headers of a delivery"""
+    webhook_id = headers.get("webhook-id")
+    timestamp = headers.get("webhook-timestamp")
+    signatures = headers.get("webhook-signature")
+    if not webhook_id or not timestamp or not signatures:
+        raise WebhookVerificationError("Missing webhook signature headers")
+
+    try:
+        timestamp_value = int(timestamp)
+    except ValueError:
+        raise WebhookVerificationError("Invalid webhook timestamp")
+    if abs(time.time() - timestamp_value) > tolerance:
+        raise WebhookVerificationError("Webhook timestamp outside the allowed tolerance")
+
+    expected = sign(secret, webhook_id, timestamp_value, body)
+    for signature in signatures.split():
+        if hmac.compare_digest(signature, expected):
+            return
+    raise WebhookVerificationError("Webhook signature does not match")